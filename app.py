@@ -11,6 +11,10 @@ from rich.console import Console
 from rich.table import Table
 from rich import print as rprint
 
+from hh_permissions_tool.bitsets import RoleBitsets
+from hh_permissions_tool.catalog import RoleCatalog
+from hh_permissions_tool.cover import RoleCover, solve_cover
+
 # Initialize Typer app and console
 app = typer.Typer(
     name="gcp-iam",
@@ -32,8 +36,11 @@ class GCPPermissionHelper:
         # ... (all other services remain the same)
     }
 
-    def __init__(self):
+    def __init__(self, catalog_path: Optional[Path] = None):
         self.custom_roles: Dict[str, List[str]] = {}
+        self.catalog_path = catalog_path
+        self._catalog: Optional[RoleCatalog] = None
+        self._bitsets: Optional[RoleBitsets] = None
         self._load_env()
 
     def _load_env(self):
@@ -52,6 +59,25 @@ class GCPPermissionHelper:
             )
         return self.default_project
 
+    @property
+    def catalog(self) -> Optional[RoleCatalog]:
+        """The local role catalog, or None if it has not been synced."""
+        if self._catalog is None:
+            try:
+                self._catalog = RoleCatalog.load(self.catalog_path)
+            except FileNotFoundError:
+                return None
+        return self._catalog
+
+    @property
+    def bitsets(self) -> RoleBitsets:
+        """Bitsets of every catalog role; raises ValueError without a synced catalog."""
+        if self._bitsets is None:
+            if self.catalog is None:
+                raise ValueError("No role catalog found. Run `catalog sync` first")
+            self._bitsets = RoleBitsets.from_catalog(self.catalog)
+        return self._bitsets
+
     def list_available_services(self) -> List[str]:
         """List all available services."""
         return sorted(list(self.COMMON_SERVICES.keys()))
@@ -63,14 +89,26 @@ class GCPPermissionHelper:
         return sorted(list(self.COMMON_SERVICES[service].keys()))
 
     def generate_service_permissions(self, service: str, level: str = 'viewer') -> Set[str]:
-        """Generate permissions for a service and level."""
+        """Generate permissions for a service and level.
+        
+        Roles are expanded to their permissions using the role catalog; without
+        a synced catalog the role name itself is returned.
+        """
         if service not in self.COMMON_SERVICES:
             raise ValueError(f"Service {service} not found in common services")
             
         if level not in self.COMMON_SERVICES[service]:
             raise ValueError(f"Level {level} not found for service {service}")
             
-        return {self.COMMON_SERVICES[service][level]}
+        role = self.COMMON_SERVICES[service][level]
+        catalog = self.catalog
+        if catalog is None or role not in catalog:
+            return {role}
+        return set(catalog.permissions(role))
+
+    def cover_permissions(self, permissions: List[str], exact: bool = False) -> RoleCover:
+        """Find the fewest predefined roles granting every permission."""
+        return solve_cover(self.bitsets, permissions, exact=exact)
 
     def generate_terraform_config(self, project_id: str, role_name: str) -> str:
         """Generate Terraform configuration for a custom role."""
@@ -117,31 +155,146 @@ def list_roles(
         table = Table(title=f"Available Roles for {service}")
         table.add_column("Role Name", style="cyan")
         table.add_column("Full Role ID", style="green")
+        if helper.catalog is not None:
+            table.add_column("Permissions", style="yellow", justify="right")
         
         for role in roles:
             full_role = helper.COMMON_SERVICES[service][role]
-            table.add_row(role, full_role)
+            if helper.catalog is not None:
+                size = helper.bitsets.size(full_role) if full_role in helper.bitsets else 0
+                table.add_row(role, full_role, str(size))
+            else:
+                table.add_row(role, full_role)
         
         console.print(table)
     except ValueError as e:
         typer.echo(f"Error: {str(e)}", err=True)
         raise typer.Exit(code=1)
 
+@app.command()
+def roles_granting(
+    permission: str = typer.Argument(..., help="Permission, e.g. compute.instances.delete"),
+    catalog: Path = typer.Option(None, help="Role catalog file (default: the synced catalog)"),
+):
+    """List the roles that grant a permission."""
+    helper = GCPPermissionHelper(catalog)
+    try:
+        roles = helper.bitsets.roles_granting(permission)
+    except ValueError as e:
+        typer.echo(f"Error: {str(e)}", err=True)
+        raise typer.Exit(code=1)
+    
+    table = Table(title=f"Roles granting {permission}")
+    table.add_column("Role", style="cyan")
+    table.add_column("Permissions", style="yellow", justify="right")
+    for role in sorted(roles, key=helper.bitsets.size):
+        table.add_row(role, str(helper.bitsets.size(role)))
+    
+    console.print(table)
+
+@app.command()
+def compare_roles(
+    role: str = typer.Argument(..., help="Role ID, e.g. roles/compute.viewer"),
+    other: str = typer.Argument(..., help="Role ID to compare with"),
+    catalog: Path = typer.Option(None, help="Role catalog file (default: the synced catalog)"),
+):
+    """Compare the permissions of two roles."""
+    helper = GCPPermissionHelper(catalog)
+    try:
+        bitsets = helper.bitsets
+        for name in (role, other):
+            if name not in bitsets:
+                raise ValueError(f"Role {name} not found in the role catalog")
+    except ValueError as e:
+        typer.echo(f"Error: {str(e)}", err=True)
+        raise typer.Exit(code=1)
+    
+    if bitsets.is_subset(role, other) and bitsets.is_subset(other, role):
+        relation = f"grants the same permissions as {other}"
+    elif bitsets.is_subset(role, other):
+        relation = f"is a subset of {other}"
+    elif bitsets.is_superset(role, other):
+        relation = f"is a superset of {other}"
+    else:
+        relation = f"shares {bitsets.overlap(role, other)} permissions with {other}"
+    rprint(f"[cyan]{role}[/cyan] ({bitsets.size(role)} permissions) {relation}")
+    
+    for name, missing_from in ((role, other), (other, role)):
+        only = bitsets.difference(name, missing_from)
+        if only:
+            table = Table(title=f"Only in {name}")
+            table.add_column("Permission", style="green")
+            for permission in only:
+                table.add_row(permission)
+            console.print(table)
+
+@app.command()
+def cover(
+    permissions: List[str] = typer.Argument(..., help="Required permissions"),
+    exact: bool = typer.Option(False, help="Refine the greedy answer with an exact search"),
+    catalog: Path = typer.Option(None, help="Role catalog file (default: the synced catalog)"),
+):
+    """Find the fewest predefined roles that grant a set of permissions."""
+    helper = GCPPermissionHelper(catalog)
+    try:
+        result = helper.cover_permissions(permissions, exact)
+    except ValueError as e:
+        typer.echo(f"Error: {str(e)}", err=True)
+        raise typer.Exit(code=1)
+    
+    table = Table(title="Covering Roles")
+    table.add_column("Role", style="cyan")
+    table.add_column("Required Permissions", style="green", justify="right")
+    table.add_column("Permissions", style="yellow", justify="right")
+    required = set(permissions)
+    for role in result.roles:
+        granted = helper.catalog.permissions(role)
+        table.add_row(role, str(len(required.intersection(granted))), str(len(granted)))
+    console.print(table)
+    
+    rprint(
+        f"{len(result.roles)} role{'' if len(result.roles) == 1 else 's'}{' (minimal)' if result.exact else ''}, "
+        f"granting {result.excess} permissions beyond the required ones"
+    )
+    if result.uncovered:
+        rprint(f"[red]Not granted by any predefined role:[/red] {', '.join(result.uncovered)}")
+
 @app.command()
 def generate(
     service: str = typer.Argument(..., help="GCP service name"),
     level: str = typer.Option("viewer", help="Access level"),
     project_id: str = typer.Option(None, help="GCP project ID (overrides env)"),
     output: Path = typer.Option(None, help="Output file for Terraform config"),
+    catalog: Path = typer.Option(None, help="Role catalog file (default: the synced catalog)"),
+    permission: List[str] = typer.Option(None, help="Only grant these permissions (repeatable)"),
 ):
-    """Generate Terraform configuration for a service role."""
-    helper = GCPPermissionHelper()
+    """Generate Terraform configuration for a service role.
+    
+    With --permission, the custom role is limited to the given permissions of the service role,
+    and the fewest predefined roles granting them are suggested as an alternative.
+    """
+    helper = GCPPermissionHelper(catalog)
     
     try:
         project = project_id or helper.project_id
         permissions = helper.generate_service_permissions(service, level)
+        if permission:
+            missing = sorted(set(permission) - permissions)
+            if missing:
+                raise ValueError(f"Not granted by {service} {level}: {', '.join(missing)}")
+            permissions = set(permission)
         role_name = f"custom_{service}_{level}"
-        helper.custom_roles[role_name] = list(permissions)
+        helper.custom_roles[role_name] = sorted(permissions)
+        if helper.catalog is None:
+            typer.echo("Warning: no role catalog found, using role names. Run `catalog sync` to expand permissions.", err=True)
+        elif permission:
+            suggestion = helper.cover_permissions(sorted(permissions))
+            if suggestion.roles and not suggestion.uncovered:
+                typer.echo(
+                    f"Predefined roles granting the same permissions: {', '.join(suggestion.roles)} "
+                    f"({suggestion.excess} more permissions)",
+                    err=True,
+                )
         
         tf_config = helper.generate_terraform_config(project, role_name)
         
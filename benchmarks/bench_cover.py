@@ -0,0 +1,122 @@
+"""Measure the role cover solver on realistic permission sets.
+
+Uses the synced role catalog if one exists, or a synthetic catalog shaped
+like the predefined roles: per-service viewer/editor/admin roles, narrower
+per-resource roles and a few broad basic roles. Each sample asks for a mix
+of permissions from a handful of services, as a workload's role would.
+
+Usage:
+    poetry run python benchmarks/bench_cover.py --samples 200 --exact
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from loguru import logger
+
+from hh_permissions_tool.bitsets import RoleBitsets
+from hh_permissions_tool.catalog import RoleCatalog
+from hh_permissions_tool.cover import solve_cover
+
+READ_VERBS = ("get", "list", "getIamPolicy")
+WRITE_VERBS = ("create", "update", "delete")
+ADMIN_VERBS = ("setIamPolicy",)
+
+
+def synthetic_catalog(services: int, resources: int, seed: int) -> RoleCatalog:
+    """Build a catalog of predefined-looking roles."""
+    rng = random.Random(seed)
+    roles = {}
+    every_read, every_write = set(), set()
+    for service in range(services):
+        read, write, admin = set(), set(), set()
+        for resource in range(resources):
+            prefix = f"service{service}.resource{resource}"
+            resource_read = {f"{prefix}.{verb}" for verb in READ_VERBS}
+            resource_write = {f"{prefix}.{verb}" for verb in WRITE_VERBS}
+            roles[f"roles/service{service}.resource{resource}Viewer"] = resource_read
+            roles[f"roles/service{service}.resource{resource}Admin"] = resource_read | resource_write
+            read |= resource_read
+            write |= resource_write
+            admin |= {f"{prefix}.{verb}" for verb in ADMIN_VERBS}
+        roles[f"roles/service{service}.viewer"] = read
+        roles[f"roles/service{service}.editor"] = read | write
+        roles[f"roles/service{service}.admin"] = read | write | admin
+        every_read |= read
+        every_write |= write
+    roles["roles/viewer"] = every_read
+    roles["roles/editor"] = every_read | every_write
+
+    # Job-function roles spanning a few services
+    for job in range(services // 2):
+        permissions = set()
+        for service in rng.sample(range(services), 4):
+            permissions |= roles[f"roles/service{service}.editor"]
+        roles[f"roles/job{job}.operator"] = permissions
+    return RoleCatalog({role: tuple(sorted(permissions)) for role, permissions in roles.items()})
+
+
+def sample_permissions(catalog: RoleCatalog, rng: random.Random, services: int, size: int) -> list:
+    """Pick ``size`` permissions spread over ``services`` service prefixes."""
+    by_service = {}
+    for permission in catalog.all_permissions():
+        by_service.setdefault(permission.split(".", 1)[0], []).append(permission)
+    chosen = rng.sample(sorted(by_service), min(services, len(by_service)))
+    pool = [permission for service in chosen for permission in by_service[service]]
+    return rng.sample(pool, min(size, len(pool)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--catalog", help="catalog file (default: the synced catalog, else synthetic)")
+    parser.add_argument("--synthetic", action="store_true", help="always use a synthetic catalog")
+    parser.add_argument("--services", type=int, default=150, help="services in the synthetic catalog")
+    parser.add_argument("--resources", type=int, default=8, help="resource types per synthetic service")
+    parser.add_argument("--samples", type=int, default=100, help="permission sets to solve")
+    parser.add_argument("--size", type=int, default=40, help="permissions per set")
+    parser.add_argument("--spread", type=int, default=4, help="services per set")
+    parser.add_argument("--exact", action="store_true", help="also run the exact refinement")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    logger.remove()
+
+    catalog = None
+    if not args.synthetic:
+        try:
+            catalog = RoleCatalog.load(args.catalog)
+        except FileNotFoundError:
+            pass
+    if catalog is None:
+        catalog = synthetic_catalog(args.services, args.resources, args.seed)
+
+    start = time.perf_counter()
+    bitsets = RoleBitsets.from_catalog(catalog)
+    bitsets.roles_granting("")
+    print(
+        f"Catalog: {len(bitsets)} roles, {len(bitsets.universe)} permissions "
+        f"(indexed in {(time.perf_counter() - start) * 1000:.0f} ms)"
+    )
+
+    rng = random.Random(args.seed)
+    samples = [sample_permissions(catalog, rng, args.spread, args.size) for _ in range(args.samples)]
+    for exact in (False, True) if args.exact else (False,):
+        timings, sizes, proven = [], [], 0
+        for permissions in samples:
+            start = time.perf_counter()
+            result = solve_cover(bitsets, permissions, exact=exact)
+            timings.append(time.perf_counter() - start)
+            sizes.append(len(result.roles))
+            proven += result.exact
+        timings.sort()
+        print(
+            f"{'exact ' if exact else 'greedy'}: mean {statistics.mean(timings) * 1000:.2f} ms, "
+            f"p99 {timings[int(len(timings) * 0.99) - 1] * 1000:.2f} ms, max {timings[-1] * 1000:.2f} ms, "
+            f"mean {statistics.mean(sizes):.2f} roles"
+            + (f", {proven}/{len(samples)} proven minimal" if exact else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Measure the resource hierarchy crawler on a synthetic ~10k-node organization.
+
+The crawl runs against a local FakeIamServer once with a single worker and
+once with the requested concurrency, then times ancestry lookups for every
+project in the crawled tree.
+
+Usage:
+    poetry run python benchmarks/bench_hierarchy.py --depth 4 --folders 6 --projects 6 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import time
+
+from loguru import logger
+
+from hh_permissions_tool.fake_server import FakeIamServer, generate_hierarchy
+from hh_permissions_tool.hierarchy import crawl_hierarchy
+from hh_permissions_tool.session import TRANSPORT_ASYNC, GCPSession
+
+
+async def run_crawl(endpoint: str, root: str, concurrency: int):
+    """Crawl the fake organization and return the hierarchy and elapsed seconds."""
+    session = GCPSession(endpoint=endpoint)
+    start = time.perf_counter()
+    try:
+        hierarchy = await crawl_hierarchy(session, root, TRANSPORT_ASYNC, concurrency)
+    finally:
+        await session.aclose()
+    return hierarchy, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=4, help="folder nesting depth")
+    parser.add_argument("--folders", type=int, default=6, help="child folders per folder")
+    parser.add_argument("--projects", type=int, default=6, help="projects per folder")
+    parser.add_argument("--concurrency", type=int, default=64, help="list calls in flight for the parallel crawl")
+    parser.add_argument("--latency", type=float, default=0.005, help="simulated server latency in seconds")
+    args = parser.parse_args()
+    logger.remove()
+    
+    fake_org = generate_hierarchy(depth=args.depth, folders_per_folder=args.folders, projects_per_folder=args.projects)
+    print(f"Synthetic organization: {fake_org.folder_count} folders, {fake_org.project_count} projects")
+    
+    with FakeIamServer(latency=args.latency, hierarchy=fake_org) as server:
+        for concurrency in (1, args.concurrency):
+            requests_before = server.request_count
+            hierarchy, elapsed = asyncio.run(run_crawl(server.endpoint, fake_org.organization, concurrency))
+            requests = server.request_count - requests_before
+            print(
+                f"concurrency {concurrency:>4}: {len(hierarchy)} nodes in {elapsed:.2f}s "
+                f"({requests} RPCs, {requests / elapsed:.0f} RPC/s)"
+            )
+    
+    projects = [node.name for node in hierarchy.projects()]
+    start = time.perf_counter()
+    depth = sum(len(hierarchy.ancestors(name)) for name in projects)
+    elapsed = time.perf_counter() - start
+    print(
+        f"ancestry lookups: {len(projects)} projects in {elapsed * 1000:.2f} ms "
+        f"({elapsed / len(projects) * 1e9:.0f} ns each, mean depth {depth / len(projects):.1f})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Measure the memory footprint of binding records at org-sweep scale.
+
+Builds the same synthetic bindings once as the plain dict records used
+before and once as interned ``Binding`` records, each in a fresh process,
+and reports the resident memory growth per binding. Strings are decoded
+from bytes for every binding, as they are when read off the wire. Member
+lists are drawn from a pool of ``--member-lists`` combinations, since the
+same groups and users are granted roles across many projects.
+
+Usage:
+    poetry run python benchmarks/bench_memory.py --bindings 10000000
+"""
+
+import argparse
+import multiprocessing
+import random
+import resource
+import sys
+import time
+
+from hh_permissions_tool.policies import Binding
+
+BINDINGS_PER_PROJECT = 8
+MEMBERS_PER_BINDING = 3
+
+
+def max_rss_bytes() -> int:
+    """Peak resident set size of this process in bytes."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def build(kind: str, bindings: int, roles: int, members: int, member_lists: int, seed: int, results) -> None:
+    """Build ``bindings`` records of one kind and report the memory they use."""
+    rng = random.Random(seed)
+    role_pool = [f"roles/service{n % 40}.role{n}".encode() for n in range(roles)]
+    member_pool = [f"user:member{n}@example.com".encode() for n in range(members)]
+    list_pool = [rng.sample(member_pool, MEMBERS_PER_BINDING) for _ in range(member_lists)]
+    baseline = max_rss_bytes()
+    start = time.perf_counter()
+
+    records = []
+    for project in range(bindings // BINDINGS_PER_PROJECT):
+        resource_name = f"projects/project-{project}"
+        for role in rng.sample(role_pool, BINDINGS_PER_PROJECT):
+            wire_members = [member.decode() for member in rng.choice(list_pool)]
+            if kind == "dict":
+                records.append({"role": role.decode(), "members": wire_members, "resource": resource_name})
+            else:
+                records.append(Binding(role.decode(), wire_members, resource_name))
+
+    results.put((kind, len(records), max_rss_bytes() - baseline, time.perf_counter() - start))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bindings", type=int, default=10_000_000, help="bindings to build")
+    parser.add_argument("--roles", type=int, default=1_500, help="distinct roles")
+    parser.add_argument("--members", type=int, default=50_000, help="distinct members")
+    parser.add_argument("--member-lists", type=int, default=100_000, help="distinct member lists")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    results = multiprocessing.Queue()
+    for kind in ("dict", "binding"):
+        process = multiprocessing.Process(
+            target=build, args=(kind, args.bindings, args.roles, args.members, args.member_lists, args.seed, results)
+        )
+        process.start()
+        kind, count, used, elapsed = results.get()
+        process.join()
+        print(
+            f"{kind:>7}: {count} bindings, {used / 2**20:,.0f} MiB "
+            f"({used / count:.0f} bytes per binding), built in {elapsed:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
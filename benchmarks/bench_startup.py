@@ -0,0 +1,87 @@
+"""Measure CLI cold-start time and the imports behind it.
+
+Runs each command in a new interpreter and reports the median wall time,
+then reruns it under ``python -X importtime`` and lists the heaviest
+top-level imports, flagging any Google client library that was loaded.
+Commands that make no API call should not import one.
+
+Usage:
+    poetry run python benchmarks/bench_startup.py --runs 10
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+COMMANDS = {
+    "cli version": ["-m", "hh_permissions_tool.cli", "version"],
+    "cli --help": ["-m", "hh_permissions_tool.cli", "--help"],
+    "cli audit-gcp --help": ["-m", "hh_permissions_tool.cli", "audit-gcp", "--help"],
+    "app --help": [str(ROOT / "app.py"), "--help"],
+}
+
+# Modules that should only load once a command talks to an API
+HEAVY_PREFIXES = ("google.cloud", "google.api_core", "google.auth", "google.oauth2", "google.iam", "grpc")
+
+
+def run(arguments: List[str], *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, *arguments],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+
+
+def median_seconds(arguments: List[str], runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run(arguments)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def import_times(arguments: List[str]) -> List[Tuple[str, float]]:
+    """``(module, cumulative milliseconds)`` of every top-level import, slowest first."""
+    imports = []
+    for line in run(arguments, "-X", "importtime").stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented below the module that triggered them
+        if name.startswith("  "):
+            continue
+        imports.append((name.strip(), int(cumulative) / 1000))
+    return sorted(imports, key=lambda entry: entry[1], reverse=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="interpreter launches per command")
+    parser.add_argument("--top", type=int, default=5, help="heaviest imports listed per command")
+    args = parser.parse_args()
+
+    baseline = median_seconds(["-c", "pass"], args.runs)
+    print(f"{'bare interpreter':<24} {baseline * 1000:8.1f} ms")
+    for label, arguments in COMMANDS.items():
+        seconds = median_seconds(arguments, args.runs)
+        imports = import_times(arguments)
+        heavy = [name for name, _ in imports if name.startswith(HEAVY_PREFIXES)]
+        print(f"{label:<24} {seconds * 1000:8.1f} ms  (+{(seconds - baseline) * 1000:.1f} ms over bare)")
+        for name, milliseconds in imports[:args.top]:
+            print(f"    {milliseconds:8.1f} ms  {name}")
+        if heavy:
+            print(f"    loads API client libraries: {', '.join(heavy)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare GetIamPolicy throughput of the sync and async client transports.
+
+Both transports fetch the same synthetic projects from a local FakeIamServer
+through ``stream_project_permissions``, so the numbers reflect the client
+side of the fetch path rather than Google's API.
+
+Usage:
+    poetry run python benchmarks/bench_transport.py --projects 2000 --concurrency 500 --latency 0.02
+"""
+
+import argparse
+import asyncio
+import time
+
+from loguru import logger
+
+from hh_permissions_tool.cli import stream_project_permissions
+from hh_permissions_tool.fake_server import FakeIamServer, generate_org
+from hh_permissions_tool.session import TRANSPORT_ASYNC, TRANSPORT_SYNC, GCPSession
+
+
+async def run_transport(endpoint: str, transport: str, project_ids: list, concurrency: int) -> dict:
+    """Fetch every synthetic project once and return timing figures."""
+    session = GCPSession(endpoint=endpoint)
+    client = session.projects_client(transport)
+    errors = 0
+    
+    start = time.perf_counter()
+    try:
+        async for result in stream_project_permissions(client, project_ids, concurrency):
+            if result.error is not None:
+                errors += 1
+    finally:
+        await session.aclose()
+        session.close()
+    elapsed = time.perf_counter() - start
+    
+    return {
+        "transport": transport,
+        "requests": len(project_ids),
+        "errors": errors,
+        "seconds": elapsed,
+        "requests_per_second": len(project_ids) / elapsed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--projects", type=int, default=2000, help="number of GetIamPolicy calls per transport")
+    parser.add_argument("--concurrency", type=int, default=500, help="maximum requests in flight")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated server latency in seconds")
+    args = parser.parse_args()
+    logger.remove()
+    
+    fake_org = generate_org(args.projects)
+    project_ids = [project.project_id for children in fake_org.projects.values() for project in children]
+    with FakeIamServer(latency=args.latency, hierarchy=fake_org) as server:
+        print(f"Fake server on {server.endpoint}, latency {args.latency * 1000:.0f} ms, concurrency {args.concurrency}")
+        for transport in (TRANSPORT_SYNC, TRANSPORT_ASYNC):
+            stats = asyncio.run(run_transport(server.endpoint, transport, project_ids, args.concurrency))
+            print(
+                f"{stats['transport']:>5}: {stats['requests']} requests in {stats['seconds']:.2f}s "
+                f"({stats['requests_per_second']:.0f} req/s, {stats['errors']} errors)"
+            )
+
+
+if __name__ == "__main__":
+    main()
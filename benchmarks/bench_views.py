@@ -0,0 +1,77 @@
+"""Compare eager record conversion with lazy policy views.
+
+Builds synthetic ``Policy`` messages and times converting every binding to
+a record up front against counting and filtering through ``PolicyView``,
+which only converts the bindings that match.
+
+Usage:
+    poetry run python benchmarks/bench_views.py --policies 20000
+"""
+
+import argparse
+import random
+import time
+
+from google.iam.v1 import policy_pb2
+
+from hh_permissions_tool.policies import Binding, PolicyView, filter_bindings
+
+ROLES = 60
+
+
+def build_policies(count: int, bindings: int, members: int, seed: int) -> list:
+    """Serialized policies with ``bindings`` bindings of ``members`` members each."""
+    rng = random.Random(seed)
+    payloads = []
+    for project in range(count):
+        policy = policy_pb2.Policy(etag=b"etag")
+        for role in rng.sample(range(ROLES), bindings):
+            policy.bindings.add(
+                role=f"roles/service.role{role}",
+                members=[f"user:member{rng.randrange(20_000)}@example.com" for _ in range(members)],
+            )
+        payloads.append(policy.SerializeToString())
+    return payloads
+
+
+def timed(label: str, policies: list, operation) -> None:
+    start = time.perf_counter()
+    total = sum(operation(policy, f"projects/project-{index}") for index, policy in enumerate(policies))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed * 1000:8.1f} ms  ({total} results)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--policies", type=int, default=20_000, help="policies to process")
+    parser.add_argument("--bindings", type=int, default=10, help="bindings per policy")
+    parser.add_argument("--members", type=int, default=4, help="members per binding")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # Parse fresh messages, as they arrive from the API
+    policies = [policy_pb2.Policy.FromString(payload) for payload in build_policies(
+        args.policies, args.bindings, args.members, args.seed
+    )]
+    role = "roles/service.role7"
+    print(f"{len(policies)} policies, {args.bindings} bindings each")
+
+    timed("eager dicts", policies, lambda policy, resource: len([
+        {"role": binding.role, "members": list(binding.members), "resource": resource}
+        for binding in policy.bindings
+    ]))
+    timed("eager bindings", policies, lambda policy, resource: len([
+        Binding(binding.role, binding.members, resource) for binding in policy.bindings
+    ]))
+    timed("view count", policies, lambda policy, resource: len(PolicyView(policy, resource)))
+    timed("view member count", policies, lambda policy, resource: PolicyView(policy, resource).member_count())
+    timed("eager filter by role", policies, lambda policy, resource: len(filter_bindings(
+        [Binding(binding.role, binding.members, resource) for binding in policy.bindings], role
+    )))
+    timed("view filter by role", policies, lambda policy, resource: len(
+        filter_bindings(PolicyView(policy, resource), role)
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Benchmark suite for the fetch, transform and render paths and CLI startup.
+
+For each scale, an organization of that many projects is served by a
+FakeIamServer in its own process and every measurement runs in a fresh
+worker process, so peak RSS figures do not leak between runs:
+
+- fetch: crawl the organization and fetch every project policy through
+  ``get_org_permissions``; wall time, RPC throughput and peak RSS
+- transform: convert as many freshly parsed policies to binding records
+  and index them by member and role
+- render: draw the combined ``display_permissions_table`` into a buffer
+
+Startup runs ``cli.py version``, ``cli.py --help`` and ``app.py --help`` in
+new interpreters and keeps the median. Results are written as JSON;
+``--compare`` checks them against a saved baseline and exits non-zero if
+any metric got worse by more than ``--threshold``. A worker or server
+process that dies, or reports nothing within ``--timeout`` seconds, stops
+the suite with an error instead of hanging it.
+
+Usage:
+    poetry run python benchmarks/suite.py --output baseline.json
+    poetry run python benchmarks/suite.py --scales 1 100 10000 --compare baseline.json
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from loguru import logger
+
+SCALES = (1, 100, 10_000, 100_000)
+
+# Above this many projects the table is not rendered; Rich needs minutes for it
+RENDER_MAX_PROJECTS = 10_000
+
+# Metrics where a larger value is better; all others are better when smaller
+HIGHER_IS_BETTER = {"rpc_per_second"}
+
+# Timings below this many seconds are too noisy to compare
+MIN_COMPARABLE_SECONDS = 0.1
+
+# How often a process is checked for liveness while waiting for its report
+POLL_SECONDS = 1.0
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class BenchmarkError(RuntimeError):
+    """A benchmark process died or stopped responding."""
+
+
+def max_rss_mib() -> float:
+    """Peak resident set size of this process in MiB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (rss if sys.platform == "darwin" else rss * 1024) / 2**20
+
+
+def serve(projects: int, latency: float, bindings: int, members: int, connection) -> None:
+    """Serve a synthetic organization until asked to stop, then report the request count."""
+    from hh_permissions_tool.fake_server import FakeIamServer, generate_org
+
+    hierarchy = generate_org(projects)
+    with FakeIamServer(latency, bindings, members, hierarchy) as server:
+        connection.send((hierarchy.organization, server.endpoint))
+        connection.recv()
+        connection.send(server.request_count)
+
+
+def fetch(endpoint: str, organization: str, concurrency: int, connection) -> None:
+    """Audit the fake organization the way ``audit-org`` does."""
+    logger.remove()
+    from rich.console import Console
+
+    from hh_permissions_tool import cli
+    from hh_permissions_tool.session import configure_session, run_async
+
+    cli.console = Console(file=io.StringIO())
+    configure_session(endpoint)
+    start = time.perf_counter()
+    policies = run_async(cli.get_org_permissions(organization, concurrency))
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for policy in policies if policy.error is not None)
+    connection.send({"seconds": elapsed, "policies": len(policies), "failed": failed, "peak_rss_mib": max_rss_mib()})
+
+
+def transform_and_render(projects: int, bindings: int, members: int, render: bool, connection) -> None:
+    """Convert synthetic policies to records, index them and optionally render the table."""
+    logger.remove()
+    from google.iam.v1 import policy_pb2
+    from rich.console import Console
+
+    from hh_permissions_tool import cli
+    from hh_permissions_tool.index import PermissionIndex
+    from hh_permissions_tool.policies import policy_to_records
+
+    payloads = []
+    for project in range(projects):
+        policy = policy_pb2.Policy(etag=b"etag")
+        for role in range(bindings):
+            policy.bindings.add(
+                role=f"roles/fake.role{role}",
+                members=[f"user:member{(project + role + member) % 5000}@example.com" for member in range(members)],
+            )
+        payloads.append(policy.SerializeToString())
+
+    start = time.perf_counter()
+    records = []
+    for project, payload in enumerate(payloads):
+        records.extend(policy_to_records(policy_pb2.Policy.FromString(payload), f"projects/project-{project}"))
+    index = PermissionIndex.from_records(records)
+    measured = {
+        "transform": {
+            "seconds": time.perf_counter() - start,
+            "bindings": len(records),
+            "grants": len(index),
+            "peak_rss_mib": max_rss_mib(),
+        }
+    }
+
+    if render:
+        cli.console = Console(file=io.StringIO(), width=160)
+        start = time.perf_counter()
+        cli.display_permissions_table([record.to_dict() for record in records])
+        measured["render"] = {"seconds": time.perf_counter() - start, "rows": len(records)}
+    connection.send(measured)
+
+
+def receive(connection, process, timeout: float, name: str):
+    """Wait for the next message ``process`` sends on ``connection``.
+
+    Raises ``BenchmarkError`` if the process exits without sending one or
+    sends nothing within ``timeout`` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    while not connection.poll(POLL_SECONDS):
+        # It may have sent its report just before exiting
+        if process.exitcode is not None and not connection.poll():
+            break
+        if time.monotonic() > deadline:
+            raise BenchmarkError(f"{name} process reported nothing within {timeout:.0f}s")
+    try:
+        if connection.poll():
+            return connection.recv()
+    except EOFError:
+        pass
+    process.join(POLL_SECONDS)
+    raise BenchmarkError(f"{name} process exited with code {process.exitcode} before reporting")
+
+
+def stop(process) -> None:
+    """Wait briefly for ``process`` to exit, then terminate it."""
+    process.join(POLL_SECONDS * 5)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+
+
+def run_in_process(context, target, *args, timeout: float) -> dict:
+    """Run a measurement in a fresh process and return what it reports."""
+    parent_end, child_end = context.Pipe(duplex=False)
+    process = context.Process(target=target, args=(*args, child_end))
+    process.start()
+    # Only the child may hold the sending end, or its exit would go unnoticed
+    child_end.close()
+    try:
+        measured = receive(parent_end, process, timeout, target.__name__)
+    except BenchmarkError:
+        process.terminate()
+        process.join()
+        raise
+    stop(process)
+    return measured
+
+
+def measure_scale(context, projects: int, args) -> dict:
+    """Run every scaled benchmark for one organization size."""
+    measured = {}
+    parent_end, server_end = context.Pipe()
+    server = context.Process(target=serve, args=(projects, args.latency, args.bindings, args.members, server_end))
+    server.start()
+    server_end.close()
+    try:
+        organization, endpoint = receive(parent_end, server, args.timeout, "serve")
+        result = run_in_process(context, fetch, endpoint, organization, args.concurrency, timeout=args.timeout)
+        parent_end.send(None)
+        result["rpcs"] = receive(parent_end, server, args.timeout, "serve")
+        result["rpc_per_second"] = result["rpcs"] / result["seconds"]
+        measured[f"fetch/{projects}"] = result
+    finally:
+        stop(server)
+
+    result = run_in_process(
+        context,
+        transform_and_render,
+        projects,
+        args.bindings,
+        args.members,
+        projects <= args.render_max,
+        timeout=args.timeout,
+    )
+    for phase, figures in result.items():
+        measured[f"{phase}/{projects}"] = figures
+    return measured
+
+
+def measure_startup(runs: int) -> dict:
+    """Median wall time of a new interpreter running each command."""
+    commands = {
+        "startup/cli-version": [sys.executable, "-m", "hh_permissions_tool.cli", "version"],
+        "startup/cli-help": [sys.executable, "-m", "hh_permissions_tool.cli", "--help"],
+        "startup/app-help": [sys.executable, str(ROOT / "app.py"), "--help"],
+    }
+    measured = {}
+    for name, command in commands.items():
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            timings.append(time.perf_counter() - start)
+        measured[name] = {"seconds": statistics.median(timings)}
+    return measured
+
+
+def format_figure(key: str, value) -> str:
+    return f"{key} {value:,.3f}" if isinstance(value, float) else f"{key} {value:,}"
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Print every shared metric next to the baseline and return the regressions."""
+    regressions = []
+    for name in sorted(results.keys() & baseline.keys()):
+        for metric, value in results[name].items():
+            before = baseline[name].get(metric)
+            if metric not in ("seconds", "peak_rss_mib", *HIGHER_IS_BETTER) or not before:
+                continue
+            if metric == "seconds" and max(value, before) < MIN_COMPARABLE_SECONDS:
+                continue
+            change = value / before - 1
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = "REGRESSION" if worse > threshold else ""
+            print(f"{name:<22} {metric:<15} {before:12.3f} -> {value:12.3f} {change:+8.1%} {flag}")
+            if flag:
+                regressions.append((name, metric))
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES), help="organization sizes in projects")
+    parser.add_argument("--latency", type=float, default=0.01, help="simulated server latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=200, help="policy fetches in flight")
+    parser.add_argument("--bindings", type=int, default=5, help="bindings per policy")
+    parser.add_argument("--members", type=int, default=3, help="members per binding")
+    parser.add_argument("--render-max", type=int, default=RENDER_MAX_PROJECTS, help="largest scale to render")
+    parser.add_argument("--timeout", type=float, default=3600, help="seconds to wait for each process to report")
+    parser.add_argument("--startup-runs", type=int, default=5, help="interpreter launches per startup command")
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="baseline JSON file to check the results against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative change counted as a regression")
+    args = parser.parse_args()
+    logger.remove()
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for projects in args.scales:
+        try:
+            measured = measure_scale(context, projects, args)
+        except BenchmarkError as e:
+            sys.exit(f"Benchmark at {projects} projects failed: {e}")
+        for name, figures in measured.items():
+            print(f"{name:<22} " + ", ".join(format_figure(key, value) for key, value in figures.items()))
+        results.update(measured)
+    measured = measure_startup(args.startup_runs)
+    for name, figures in measured.items():
+        print(f"{name:<22} seconds {figures['seconds']:.3f}")
+    results.update(measured)
+
+    report = {
+        "meta": {
+            "created_at": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": args.latency,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        print(f"\nCompared with {args.compare}:")
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Bitset representation of roles for fast permission set algebra.
+
+Every permission in the catalog is assigned a bit position and every role
+becomes one Python integer with the bits of its permissions set. Subset,
+overlap and difference checks between roles are then single integer
+operations instead of set operations over thousands of strings.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from hh_permissions_tool.catalog import RoleCatalog
+
+
+def popcount(mask: int) -> int:
+    """Number of set bits in a mask."""
+    return bin(mask).count("1")
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Positions of the set bits in a mask, lowest first."""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+class PermissionUniverse:
+    """Assigns every known permission a bit position."""
+
+    def __init__(self, permissions: Iterable[str]):
+        self.permissions: List[str] = sorted(set(permissions))
+        self.positions: Dict[str, int] = {
+            permission: position for position, permission in enumerate(self.permissions)
+        }
+
+    def __len__(self) -> int:
+        return len(self.permissions)
+
+    def __contains__(self, permission: str) -> bool:
+        return permission in self.positions
+
+    def mask(self, permissions: Iterable[str]) -> int:
+        """Bitset of a set of permissions; raises ``KeyError`` for unknown permissions."""
+        mask = 0
+        for permission in permissions:
+            mask |= 1 << self.positions[permission]
+        return mask
+
+    def decode(self, mask: int) -> List[str]:
+        """Permissions of a bitset, sorted."""
+        return [self.permissions[position] for position in iter_bits(mask)]
+
+
+class RoleBitsets:
+    """Every role of a catalog as a bitset over a shared permission universe.
+
+    Besides pairwise comparisons, "which roles grant P" tests P's bit in
+    every role. Callers asking that for many permissions can first build a
+    grant index holding a bitset over roles for each permission, so each
+    lookup decodes one integer instead.
+    """
+
+    def __init__(self, universe: PermissionUniverse, masks: Dict[str, int]):
+        self.universe = universe
+        self.masks = masks
+        self.roles: List[str] = sorted(masks)
+        self._grants: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_catalog(cls, catalog: RoleCatalog) -> "RoleBitsets":
+        """Encode every role of a catalog."""
+        universe = PermissionUniverse(catalog.all_permissions())
+        masks = {role: universe.mask(permissions) for role, permissions in catalog.roles.items()}
+        return cls(universe, masks)
+
+    def __len__(self) -> int:
+        return len(self.masks)
+
+    def __contains__(self, role: str) -> bool:
+        return role in self.masks
+
+    def mask(self, role: str) -> int:
+        """Bitset of a role; raises ``KeyError`` for unknown roles."""
+        return self.masks[role]
+
+    def size(self, role: str) -> int:
+        """Number of permissions in a role."""
+        return popcount(self.masks[role])
+
+    def is_subset(self, role: str, other: str) -> bool:
+        """Whether every permission of ``role`` is also in ``other``."""
+        mask = self.masks[role]
+        return mask & self.masks[other] == mask
+
+    def is_superset(self, role: str, other: str) -> bool:
+        """Whether ``role`` includes every permission of ``other``."""
+        return self.is_subset(other, role)
+
+    def overlap(self, role: str, other: str) -> int:
+        """Number of permissions two roles have in common."""
+        return popcount(self.masks[role] & self.masks[other])
+
+    def difference(self, role: str, other: str) -> List[str]:
+        """Permissions of ``role`` that ``other`` does not include."""
+        return self.universe.decode(self.masks[role] & ~self.masks[other])
+
+    def subsets_of(self, role: str) -> List[str]:
+        """Other roles whose permissions are all included in ``role``."""
+        mask = self.masks[role]
+        return [name for name in self.roles if name != role and self.masks[name] & mask == self.masks[name]]
+
+    def supersets_of(self, role: str) -> List[str]:
+        """Other roles that include every permission of ``role``."""
+        mask = self.masks[role]
+        return [name for name in self.roles if name != role and self.masks[name] & mask == mask]
+
+    def roles_granting(self, permission: str) -> List[str]:
+        """Roles that include a permission, sorted by name."""
+        if self._grants is not None:
+            return [self.roles[position] for position in iter_bits(self._grants.get(permission, 0))]
+        position = self.universe.positions.get(permission)
+        if position is None:
+            return []
+        bit = 1 << position
+        return [name for name in self.roles if self.masks[name] & bit]
+
+    def build_grant_index(self) -> None:
+        """Index the roles granting each permission, to speed up many ``roles_granting`` calls.
+
+        Building the index walks every permission of every role, so it only
+        pays off when it is reused for many lookups.
+        """
+        if self._grants is not None:
+            return
+        grants = [0] * len(self.universe)
+        for position, role in enumerate(self.roles):
+            role_bit = 1 << position
+            for permission in iter_bits(self.masks[role]):
+                grants[permission] |= role_bit
+        self._grants = {
+            permission: grants[position]
+            for position, permission in enumerate(self.universe.permissions)
+        }
@@ -0,0 +1,189 @@
+"""Persistent on-disk cache of fetched IAM policies.
+
+Policies are stored in a small SQLite database together with their ``etag``
+and fetch time. Entries younger than the TTL are served without an API call;
+older entries are refetched, and if the ``etag`` is unchanged the stored
+binding records are reused instead of being converted again. The cache keeps
+at most ``max_entries`` policies and evicts the least recently used ones.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from loguru import logger
+
+from hh_permissions_tool.metrics import CACHE_LOOKUPS
+from hh_permissions_tool.policies import Binding, to_json_record
+
+# Serve cached policies without an API call for this many seconds
+DEFAULT_TTL = 3600
+
+# Maximum number of cached policies before least recently used ones are evicted
+DEFAULT_MAX_ENTRIES = 100_000
+
+# Commit pending writes after this many changes
+COMMIT_INTERVAL = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS policies (
+    resource TEXT PRIMARY KEY,
+    etag TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    bindings TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS policies_accessed_at ON policies (accessed_at);
+"""
+
+
+def default_cache_path() -> Path:
+    """Return the cache database path, honouring HH_PERMISSIONS_CACHE_DIR."""
+    cache_dir = os.getenv("HH_PERMISSIONS_CACHE_DIR")
+    if cache_dir:
+        return Path(cache_dir) / "policies.sqlite"
+    return Path.home() / ".cache" / "hh-permissions-tool" / "policies.sqlite"
+
+
+class CachedPolicy(NamedTuple):
+    """A policy stored in the cache."""
+
+    etag: str
+    fetched_at: float
+    bindings: List[Binding]
+
+
+class PolicyCache:
+    """SQLite-backed policy cache with TTL expiry and LRU eviction.
+
+    The cache tracks how many lookups it answered so callers can report a
+    hit ratio:
+
+    * ``hits`` - served from the cache without an API call
+    * ``revalidated`` - refetched, but the etag matched so the stored records were reused
+    * ``misses`` - not cached, or the policy changed
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.path = Path(path) if path else default_cache_path()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._pending = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        logger.debug(f"Opened policy cache at {self.path}")
+
+    @property
+    def lookups(self) -> int:
+        """Total number of cache lookups."""
+        return self.hits + self.revalidated + self.misses
+
+    @property
+    def hit_ratio(self) -> float:
+        """Share of lookups answered from cached records, with or without a refetch."""
+        if not self.lookups:
+            return 0.0
+        return (self.hits + self.revalidated) / self.lookups
+
+    def lookup(self, resource: str) -> Optional[CachedPolicy]:
+        """Return the cached policy of a resource, fresh or not."""
+        row = self._db.execute(
+            "SELECT etag, fetched_at, bindings FROM policies WHERE resource = ?",
+            (resource,),
+        ).fetchone()
+        if row is None:
+            return None
+        return CachedPolicy(row[0], row[1], [Binding.from_dict(record) for record in json.loads(row[2])])
+
+    def get_fresh(self, resource: str) -> Optional[CachedPolicy]:
+        """Return the cached policy if it is younger than the TTL.
+
+        Counts a hit when it is; callers then skip the API call.
+        """
+        cached = self.lookup(resource)
+        if cached is None or time.time() - cached.fetched_at > self.ttl:
+            return None
+        self.hits += 1
+        CACHE_LOOKUPS.labels("hit").inc()
+        self._touch(resource, fetched=False)
+        return cached
+
+    def revalidate(self, resource: str, etag: str) -> Optional[List[Binding]]:
+        """Return the cached records if the freshly fetched etag is unchanged.
+
+        Counts a revalidation when the etag matches and a miss otherwise.
+        """
+        cached = self.lookup(resource)
+        if cached is None or cached.etag != etag:
+            self.misses += 1
+            CACHE_LOOKUPS.labels("miss").inc()
+            return None
+        self.revalidated += 1
+        CACHE_LOOKUPS.labels("revalidated").inc()
+        self._touch(resource, fetched=True)
+        return cached.bindings
+
+    def put(self, resource: str, etag: str, bindings: List[Binding]) -> None:
+        """Store a freshly fetched policy."""
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO policies (resource, etag, fetched_at, accessed_at, bindings) VALUES (?, ?, ?, ?, ?)",
+            (resource, etag, now, now, json.dumps(bindings, separators=(",", ":"), default=to_json_record)),
+        )
+        self._changed()
+
+    def _touch(self, resource: str, fetched: bool) -> None:
+        now = time.time()
+        if fetched:
+            self._db.execute(
+                "UPDATE policies SET fetched_at = ?, accessed_at = ? WHERE resource = ?",
+                (now, now, resource),
+            )
+        else:
+            self._db.execute("UPDATE policies SET accessed_at = ? WHERE resource = ?", (now, resource))
+        self._changed()
+
+    def _changed(self) -> None:
+        self._pending += 1
+        if self._pending >= COMMIT_INTERVAL:
+            self._db.commit()
+            self._pending = 0
+
+    def evict(self) -> int:
+        """Drop least recently used policies beyond ``max_entries``.
+
+        Returns the number of evicted policies.
+        """
+        cursor = self._db.execute(
+            "DELETE FROM policies WHERE resource NOT IN "
+            "(SELECT resource FROM policies ORDER BY accessed_at DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        self._db.commit()
+        if cursor.rowcount:
+            logger.debug(f"Evicted {cursor.rowcount} policies from the cache")
+        return cursor.rowcount
+
+    def close(self) -> None:
+        """Commit pending writes, apply the size bound and close the database."""
+        self.evict()
+        self._db.close()
+
+    def __enter__(self) -> "PolicyCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,151 @@
+"""Catalog of the permissions contained in each IAM role.
+
+The catalog is synced once from the IAM API and stored locally, so audits
+and Terraform generation can expand roles to permissions without a request
+per role. On disk, every distinct permission is stored once in a sorted
+table and roles refer to it by position; the file is gzip-compressed JSON.
+"""
+
+import gzip
+import json
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Sequence, Set, Tuple
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from google.auth import credentials
+
+CATALOG_VERSION = 1
+
+# Parent of the predefined roles in ListRoles requests
+PREDEFINED_ROLES = ""
+
+# Roles requested per ListRoles page
+LIST_ROLES_PAGE_SIZE = 1000
+
+
+def default_catalog_path() -> Path:
+    """Return the catalog file path, honouring HH_PERMISSIONS_CACHE_DIR."""
+    cache_dir = os.getenv("HH_PERMISSIONS_CACHE_DIR")
+    if cache_dir:
+        return Path(cache_dir) / "roles.json.gz"
+    return Path.home() / ".cache" / "hh-permissions-tool" / "roles.json.gz"
+
+
+class RoleCatalog:
+    """Permissions of every known role, keyed by role name."""
+
+    def __init__(self, roles: Optional[Dict[str, Tuple[str, ...]]] = None, synced_at: Optional[float] = None):
+        self.roles = roles if roles is not None else {}
+        self.synced_at = synced_at
+
+    def __len__(self) -> int:
+        return len(self.roles)
+
+    def __contains__(self, role: str) -> bool:
+        return role in self.roles
+
+    def permissions(self, role: str) -> Tuple[str, ...]:
+        """Permissions included in a role; raises ``KeyError`` for unknown roles."""
+        return self.roles[role]
+
+    def expand(self, roles: Iterable[str]) -> Set[str]:
+        """Union of the permissions of several roles, skipping unknown ones."""
+        permissions: Set[str] = set()
+        for role in roles:
+            permissions.update(self.roles.get(role, ()))
+        return permissions
+
+    def all_permissions(self) -> Set[str]:
+        """Every permission included in at least one role."""
+        return self.expand(self.roles)
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "RoleCatalog":
+        """Load a catalog file written by ``save``."""
+        path = Path(path) if path else default_catalog_path()
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("version") != CATALOG_VERSION:
+            raise ValueError(f"Unsupported catalog version {data.get('version')} in {path}")
+
+        table = data["permissions"]
+        roles = {
+            role: tuple(table[position] for position in positions)
+            for role, positions in data["roles"].items()
+        }
+        logger.debug(f"Loaded {len(roles)} roles and {len(table)} permissions from {path}")
+        return cls(roles, data.get("synced_at"))
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        """Write the catalog to a file, replacing it atomically, and return its path."""
+        path = Path(path) if path else default_catalog_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = sorted(self.all_permissions())
+        positions = {permission: position for position, permission in enumerate(table)}
+        data = {
+            "version": CATALOG_VERSION,
+            "synced_at": self.synced_at,
+            "permissions": table,
+            "roles": {
+                role: sorted(positions[permission] for permission in permissions)
+                for role, permissions in sorted(self.roles.items())
+            },
+        }
+        tmp_path = path.with_name(path.name + ".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as file:
+            json.dump(data, file, separators=(",", ":"))
+        tmp_path.replace(path)
+        logger.info(f"Saved {len(self.roles)} roles and {len(table)} permissions to {path}")
+        return path
+
+    @classmethod
+    def from_fixture(cls, path: Path) -> "RoleCatalog":
+        """Build a catalog offline from a JSON fixture.
+
+        The fixture maps role names to permission lists, or is a list of
+        role objects with ``name`` and ``includedPermissions`` as returned by
+        ``gcloud iam roles describe --format=json``.
+        """
+        data = json.loads(Path(path).read_text())
+        if isinstance(data, dict):
+            roles = {role: tuple(sorted(permissions)) for role, permissions in data.items()}
+        else:
+            roles = {role["name"]: tuple(sorted(role.get("includedPermissions", []))) for role in data}
+        logger.info(f"Loaded {len(roles)} roles from fixture {path}")
+        return cls(roles, time.time())
+
+
+def sync_catalog(creds: Optional["credentials.Credentials"], parents: Sequence[str] = (PREDEFINED_ROLES,)) -> RoleCatalog:
+    """Fetch the permissions of every role under ``parents`` from the IAM API.
+
+    The empty parent lists predefined roles; ``organizations/ID`` and
+    ``projects/ID`` list custom roles. Requires the optional
+    ``google-cloud-iam`` dependency.
+    """
+    try:
+        from google.cloud import iam_admin_v1
+    except ImportError as e:
+        raise ImportError(
+            "Syncing the role catalog requires google-cloud-iam. Install it with: poetry install --extras catalog"
+        ) from e
+
+    client = iam_admin_v1.IAMClient(credentials=creds)
+    roles: Dict[str, Tuple[str, ...]] = {}
+    try:
+        for parent in parents:
+            request = iam_admin_v1.ListRolesRequest(
+                parent=parent,
+                view=iam_admin_v1.RoleView.FULL,
+                page_size=LIST_ROLES_PAGE_SIZE,
+            )
+            count = len(roles)
+            for role in client.list_roles(request=request):
+                roles[role.name] = tuple(sorted(role.included_permissions))
+            logger.info(f"Synced {len(roles) - count} roles from {parent or 'predefined roles'}")
+    finally:
+        client.transport.close()
+    return RoleCatalog(roles, time.time())
@@ -1,8 +1,11 @@
 """Command line interface for the HH Permissions Tool."""
 
+import datetime
 import os
+import sys
+import time
 from pathlib import Path
-from typing import Optional, List
+from typing import TYPE_CHECKING, AsyncIterable, AsyncIterator, Iterable, List, Optional, Sequence, TextIO, Union
 import asyncio
 
 import rich_click as click
@@ -10,23 +13,63 @@ from dotenv import load_dotenv
 from loguru import logger
 from rich.console import Console
 from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.table import Table
-from rich.traceback import install
 from rich.prompt import Confirm
-from google.cloud import asset_v1, resourcemanager_v3
-from google.cloud.asset_v1 import Asset
-from google.api_core import exceptions
-from google.iam.v1 import iam_policy_pb2
-from google.oauth2 import service_account
-from google.auth import credentials
+
+from hh_permissions_tool.bitsets import RoleBitsets
+from hh_permissions_tool.cache import DEFAULT_TTL, PolicyCache
+from hh_permissions_tool.catalog import PREDEFINED_ROLES, RoleCatalog, sync_catalog
+from hh_permissions_tool.diff import ADDED, GrantChange, diff_runs, unreadable_resources
+from hh_permissions_tool.effective import EffectivePolicyResolver
+from hh_permissions_tool.hierarchy import ResourceHierarchy, crawl_hierarchy, resolve_project_ancestry
+from hh_permissions_tool.incremental import PolicySnapshot, SnapshotChanges
+from hh_permissions_tool.index import Grant, PermissionIndex
+from hh_permissions_tool.merkle import hierarchy_parents
+from hh_permissions_tool.metrics import FETCH_QUEUE_DEPTH, REGISTRY, record_policy, rpc_name, track_rpc
+from hh_permissions_tool.output import FORMAT_NDJSON, FORMAT_PARQUET, FORMAT_TABLE, NDJSONWriter, ParquetWriter
+from hh_permissions_tool.policies import (
+    Binding,
+    PolicyResult,
+    encode_etag,
+    filter_bindings,
+    get_iam_policy,
+    policy_to_records,
+)
+from hh_permissions_tool.profiling import Profiler, enable_profiling, phase
+from hh_permissions_tool.session import (
+    ENDPOINT_ENV,
+    TRANSPORT_ASYNC,
+    TRANSPORT_SYNC,
+    configure_session,
+    get_session,
+    is_async_client,
+    run_async,
+)
+from hh_permissions_tool.store import SnapshotStore
+
+if TYPE_CHECKING:
+    from google.cloud import asset_v1, resourcemanager_v3
+
+def show_traceback(*exc_info) -> None:
+    """Install the rich traceback handler on the first uncaught exception and show it.
+
+    Rich's traceback module pulls in syntax highlighting, which is only
+    worth loading once there is a traceback to highlight.
+    """
+    from rich.traceback import install
+
+    install(show_locals=True)
+    sys.excepthook(*exc_info)
 
 # Install rich traceback handler
-install(show_locals=True)
+sys.excepthook = show_traceback
 
 # Initialize rich console
 console = Console()
 
+# Log messages and prompts never go to stdout, which may carry NDJSON records
+err_console = Console(stderr=True)
+
 # Configure rich-click
 click.rich_click.USE_RICH_MARKUP = True
 click.rich_click.USE_MARKDOWN = True
@@ -52,11 +95,15 @@ def setup_logging(log_level: str = "INFO") -> None:
     """Configure logging settings."""
     logger.remove()  # Remove default handler
     logger.add(
-        sink=lambda msg: console.print(msg, highlight=False),
+        sink=lambda msg: err_console.print(msg, highlight=False),
         level=log_level,
         format="<dim>{time:YYYY-MM-DD HH:mm:ss}</dim> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
     )
 
+def has_credentials() -> bool:
+    """Whether API calls can be made: credentials are configured or a local endpoint is used."""
+    return bool(get_session().endpoint or os.getenv("GOOGLE_APPLICATION_CREDENTIALS"))
+
 def load_environment(env_file: Optional[str] = None) -> None:
     """Load environment variables from .env file."""
     if env_file:
@@ -70,21 +117,80 @@ def load_environment(env_file: Optional[str] = None) -> None:
     else:
         logger.warning(f"No environment file found at {env_path}")
 
-async def get_project_permissions(project_id: str) -> List[dict]:
+# Default number of in-flight GetIamPolicy requests for organization-wide audits
+DEFAULT_CONCURRENCY = 50
+
+# Policy retrieval backends for organization-wide audits
+BACKEND_RESOURCE_MANAGER = "resource-manager"
+BACKEND_ASSET_INVENTORY = "asset-inventory"
+
+# Asset types whose policies match what Projects.GetIamPolicy returns
+PROJECT_ASSET_TYPES = ["cloudresourcemanager.googleapis.com/Project"]
+
+# Largest page size accepted by SearchAllIamPolicies
+ASSET_SEARCH_PAGE_SIZE = 500
+
+ProjectsClientType = Union["resourcemanager_v3.ProjectsClient", "resourcemanager_v3.ProjectsAsyncClient"]
+AssetClientType = Union["asset_v1.AssetServiceClient", "asset_v1.AssetServiceAsyncClient"]
+
+async def fetch_project_policy(
+    client: ProjectsClientType,
+    project_id: str,
+    cache: Optional[PolicyCache] = None,
+) -> PolicyResult:
+    """Fetch the IAM policy of a project.
+
+    With a ``cache``, fresh entries are returned without an API call and
+    unchanged etags reuse the cached records. API errors are propagated to
+    the caller.
+    """
+    project_name = f"projects/{project_id}"
+    if cache is not None:
+        cached = cache.get_fresh(project_name)
+        if cached is not None:
+            return PolicyResult(project_name, cached.bindings, cached.etag)
+    
+    policy = await get_iam_policy(client, project_name)
+    etag = encode_etag(policy.etag)
+    
+    if cache is not None:
+        records = cache.revalidate(project_name, etag)
+        if records is not None:
+            return PolicyResult(project_name, records, etag)
+    
+    records = policy_to_records(policy, project_name)
+    if cache is not None:
+        cache.put(project_name, etag, records)
+    return PolicyResult(project_name, records, etag)
+
+async def get_project_permissions(
+    project_id: str,
+    transport: str = TRANSPORT_ASYNC,
+    cache: Optional[PolicyCache] = None,
+) -> List[Binding]:
     """Get IAM permissions for a Google Cloud project."""
+    result = await get_project_policy(project_id, transport, cache)
+    return result.bindings
+
+async def get_project_policy(
+    project_id: str,
+    transport: str = TRANSPORT_ASYNC,
+    cache: Optional[PolicyCache] = None,
+    effective: bool = False,
+) -> PolicyResult:
+    """Get the IAM policy of a Google Cloud project, reporting failures on the console.
+
+    With ``effective``, bindings inherited from ancestor folders and the
+    organization are included.
+    """
+    from google.api_core import exceptions
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+
+    resource = f"projects/{project_id}"
     try:
-        # Load credentials from the service account file
-        creds_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-        credentials = service_account.Credentials.from_service_account_file(
-            creds_path,
-            scopes=['https://www.googleapis.com/auth/cloud-platform']
-        )
-        
-        # Create IAM client with explicit credentials
-        client = resourcemanager_v3.ProjectsClient(credentials=credentials)
-        
-        # Format the project name
-        project_name = f"projects/{project_id}"
+        # Reuse the process-wide client and credentials
+        session = get_session()
+        client = session.projects_client(transport)
         
         with Progress(
             SpinnerColumn(),
@@ -94,45 +200,384 @@ async def get_project_permissions(project_id: str) -> List[dict]:
             task = progress.add_task("[cyan]Analyzing project permissions...", total=None)
             
             try:
-                # Get project IAM policy
-                request = iam_policy_pb2.GetIamPolicyRequest(
-                    resource=project_name
-                )
-                
-                policy = await asyncio.to_thread(
-                    client.get_iam_policy,
-                    request=request
-                )
-                
-                # Process and format the results
-                results = []
-                for binding in policy.bindings:
-                    results.append({
-                        "role": binding.role,
-                        "members": list(binding.members),
-                        "resource": project_name
-                    })
-                
+                result = await fetch_project_policy(client, project_id, cache)
+                if effective:
+                    hierarchy = await resolve_project_ancestry(session, project_id, transport)
+                    result = await EffectivePolicyResolver(session, hierarchy, transport).resolve(result)
                 progress.update(task, completed=True)
-                return results
+                record_policy(result)
+                return result
                 
             except exceptions.PermissionDenied as e:
                 logger.error(f"Permission denied: {str(e)}")
                 console.print("[red]Error:[/red] Insufficient permissions. Please ensure your service account has the 'roles/viewer' role.")
-                return []
+                return PolicyResult(resource, [], error=e)
             except exceptions.NotFound as e:
                 logger.error(f"Project not found: {str(e)}")
                 console.print(f"[red]Error:[/red] Project {project_id} not found.")
-                return []
+                return PolicyResult(resource, [], error=e)
             except Exception as e:
                 logger.error(f"Error analyzing permissions: {str(e)}")
                 console.print("[red]Error:[/red] Failed to analyze permissions. Check if required APIs are enabled.")
-                return []
+                return PolicyResult(resource, [], error=e)
                 
     except Exception as e:
         logger.error(f"Failed to initialize client: {str(e)}")
         console.print("[red]Error:[/red] Failed to initialize Google Cloud client. Check your service account credentials.")
-        return []
+        return PolicyResult(resource, [], error=e)
+
+async def stream_project_permissions(
+    client: ProjectsClientType,
+    project_ids: Union[Iterable[str], AsyncIterable[str]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    cache: Optional[PolicyCache] = None,
+    resolver: Optional[EffectivePolicyResolver] = None,
+) -> AsyncIterator[PolicyResult]:
+    """Fetch project IAM policies concurrently, yielding each result as it completes.
+
+    At most ``concurrency`` requests are in flight at any time. Per-project
+    failures are reported through ``PolicyResult.error`` instead of aborting
+    the whole run. ``project_ids`` may be an async iterable, so fetching
+    starts while IDs are still being read; an error raised by it is
+    re-raised once the IDs read before it have been fetched. With a
+    ``resolver``, each policy is extended by the bindings the project
+    inherits, looking up its ancestry if needed.
+    """
+    pending: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    completed: asyncio.Queue = asyncio.Queue()
+    done = object()
+    feed_errors: List[Exception] = []
+    
+    async def enqueue(project_id: str) -> None:
+        await pending.put(project_id)
+        FETCH_QUEUE_DEPTH.set(pending.qsize())
+    
+    async def feed() -> None:
+        try:
+            if isinstance(project_ids, AsyncIterable):
+                async for project_id in project_ids:
+                    await enqueue(project_id)
+            else:
+                for project_id in project_ids:
+                    await enqueue(project_id)
+        except Exception as e:
+            feed_errors.append(e)
+        for _ in range(concurrency):
+            await pending.put(done)
+    
+    async def work() -> None:
+        while True:
+            project_id = await pending.get()
+            FETCH_QUEUE_DEPTH.set(pending.qsize())
+            if project_id is done:
+                break
+            resource = f"projects/{project_id}"
+            try:
+                result = await fetch_project_policy(client, project_id, cache)
+                if resolver is not None:
+                    result = await resolver.resolve_project(result)
+            except Exception as e:
+                result = PolicyResult(resource, [], error=e)
+            await completed.put(result)
+        await completed.put(done)
+    
+    tasks = [asyncio.create_task(feed())]
+    tasks.extend(asyncio.create_task(work()) for _ in range(concurrency))
+    try:
+        active_workers = concurrency
+        while active_workers:
+            result = await completed.get()
+            if result is done:
+                active_workers -= 1
+                continue
+            yield result
+        if feed_errors:
+            raise feed_errors[0]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def asset_resource_name(full_name: str) -> str:
+    """Convert a Cloud Asset full resource name into a Resource Manager name.
+
+    ``//cloudresourcemanager.googleapis.com/projects/p`` becomes ``projects/p``;
+    names of other services are returned unchanged.
+    """
+    prefix = "//cloudresourcemanager.googleapis.com/"
+    if full_name.startswith(prefix):
+        return full_name[len(prefix):]
+    return full_name
+
+async def _iter_pages(client, method: str, request):
+    """Yield the response pages of a paged search, e.g. ``search_all_iam_policies``, from a sync or async client.
+
+    Pages are requested one call at a time by following the page token, so
+    each call can be timed on its own.
+    """
+    api = rpc_name(method)
+    while True:
+        with phase(f"rpc {api}"), track_rpc(api):
+            if is_async_client(client):
+                page = await getattr(client, method)(request=request)
+            else:
+                page = await asyncio.to_thread(getattr(client, method), request=request)
+        yield page
+        if not page.next_page_token:
+            return
+        request.page_token = page.next_page_token
+
+async def search_iam_policies(
+    client: AssetClientType,
+    scope: str,
+    asset_types: Optional[Sequence[str]] = None,
+) -> AsyncIterator[PolicyResult]:
+    """Yield every IAM policy in an organization, folder or project scope.
+
+    Policies are read through Cloud Asset Inventory's SearchAllIamPolicies,
+    which pages through the whole scope in a few large calls instead of one
+    GetIamPolicy request per project. Defaults to project policies so the
+    records match those of ``get_project_permissions``.
+    """
+    from google.cloud import asset_v1
+
+    request = asset_v1.SearchAllIamPoliciesRequest(
+        scope=scope,
+        asset_types=list(asset_types if asset_types is not None else PROJECT_ASSET_TYPES),
+        page_size=ASSET_SEARCH_PAGE_SIZE,
+    )
+    
+    async for page in _iter_pages(client, "search_all_iam_policies", request):
+        logger.debug(f"Received {len(page.results)} IAM policies from Cloud Asset Inventory")
+        for result in page.results:
+            resource = asset_resource_name(result.resource)
+            yield PolicyResult(resource, policy_to_records(result.policy, resource), encode_etag(result.policy.etag))
+
+async def iter_org_permissions(
+    parent: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    backend: str = BACKEND_RESOURCE_MANAGER,
+    transport: str = TRANSPORT_ASYNC,
+    cache: Optional[PolicyCache] = None,
+    hierarchy: Optional[ResourceHierarchy] = None,
+    effective: bool = False,
+) -> AsyncIterator[PolicyResult]:
+    """Yield the IAM policy of every project under an organization or folder as it arrives.
+
+    The Resource Manager backend audits the projects of ``hierarchy``,
+    crawling it first if none is given. With ``effective``, each project's
+    bindings include those inherited from its ancestors, whose policies are
+    fetched once and shared. ``cache`` and ``effective`` only apply to this
+    backend.
+    """
+    from rich.progress import BarColumn, MofNCompleteColumn, Progress, SpinnerColumn, TextColumn
+
+    session = get_session()
+    
+    async with session.keep_fresh():
+        if backend == BACKEND_ASSET_INVENTORY:
+            found = 0
+            with console.status(f"[cyan]Searching IAM policies under {parent}...[/cyan]"):
+                asset_client = session.asset_client(transport)
+                async for result in search_iam_policies(asset_client, parent):
+                    found += 1
+                    record_policy(result)
+                    yield result
+            logger.info(f"Found {found} IAM policies under {parent}")
+            return
+        
+        if hierarchy is None:
+            with console.status(f"[cyan]Crawling resource hierarchy under {parent}...[/cyan]"):
+                hierarchy = await crawl_hierarchy(session, parent, transport, concurrency)
+        project_ids = [node.project_id for node in hierarchy.projects()]
+        logger.info(f"Found {len(project_ids)} projects in {len(hierarchy.folders())} folders under {parent}")
+        
+        client = session.projects_client(transport)
+        resolver = EffectivePolicyResolver(session, hierarchy, transport) if effective else None
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            MofNCompleteColumn(),
+            console=console,
+        ) as progress:
+            task = progress.add_task("[cyan]Fetching IAM policies...", total=len(project_ids))
+            async for result in stream_project_permissions(client, project_ids, concurrency, cache):
+                if result.error is not None:
+                    logger.warning(f"Failed to fetch policy for {result.resource}: {result.error}")
+                elif resolver is not None:
+                    result = await resolver.resolve(result)
+                record_policy(result)
+                progress.advance(task)
+                yield result
+        if resolver is not None:
+            logger.info(f"Fetched {resolver.fetch_count} inherited folder and organization policies")
+
+async def crawl_org_hierarchy(
+    parent: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    transport: str = TRANSPORT_ASYNC,
+) -> ResourceHierarchy:
+    """Crawl the folders and projects under an organization or folder."""
+    session = get_session()
+    async with session.keep_fresh():
+        with console.status(f"[cyan]Crawling resource hierarchy under {parent}...[/cyan]"), phase("hierarchy crawl"):
+            return await crawl_hierarchy(session, parent, transport, concurrency)
+
+async def get_org_permissions(
+    parent: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    backend: str = BACKEND_RESOURCE_MANAGER,
+    transport: str = TRANSPORT_ASYNC,
+    cache: Optional[PolicyCache] = None,
+    effective: bool = False,
+    hierarchy: Optional[ResourceHierarchy] = None,
+) -> List[PolicyResult]:
+    """Get IAM permissions for every project under an organization or folder."""
+    return [
+        result
+        async for result in iter_org_permissions(
+            parent, concurrency, backend, transport, cache, hierarchy, effective
+        )
+    ]
+
+def label_query(labels: Sequence[str]) -> str:
+    """SearchProjects query matching every ``key=value`` label; a bare ``key`` matches any value."""
+    terms = []
+    for label in labels:
+        key, _, value = label.partition("=")
+        terms.append(f"labels.{key.strip()}:{value.strip() or '*'}")
+    return " ".join(terms)
+
+async def search_project_ids(query: str, transport: str = TRANSPORT_ASYNC) -> AsyncIterator[str]:
+    """Yield the ID of every active project matching a SearchProjects query, a page at a time."""
+    from google.cloud import resourcemanager_v3
+
+    client = get_session().projects_client(transport)
+    request = resourcemanager_v3.SearchProjectsRequest(query=query)
+    async for page in _iter_pages(client, "search_projects", request):
+        for project in page.projects:
+            if project.state == resourcemanager_v3.Project.State.ACTIVE:
+                yield project.project_id
+
+async def read_project_ids(stream: TextIO) -> AsyncIterator[str]:
+    """Yield the project IDs of a text stream, one per line, as each line arrives.
+
+    Lines are read in a worker thread, so policies of the IDs already read
+    are fetched while the reader waits on a slow pipe. Blank lines and
+    ``#`` comments are skipped.
+    """
+    while True:
+        line = await asyncio.to_thread(stream.readline)
+        if not line:
+            return
+        project_id = line.split("#", 1)[0].strip()
+        if project_id:
+            yield project_id
+
+async def iter_batch_permissions(
+    project_ids: AsyncIterable[str],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    transport: str = TRANSPORT_ASYNC,
+    cache: Optional[PolicyCache] = None,
+    effective: bool = False,
+) -> AsyncIterator[PolicyResult]:
+    """Yield the IAM policy of every listed project as it arrives.
+
+    Fetching starts with the first ID, before the list is exhausted. With
+    ``effective``, the ancestry of each project is looked up and every
+    folder and organization policy is fetched once for the whole batch.
+    """
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+
+    session = get_session()
+    async with session.keep_fresh():
+        client = session.projects_client(transport)
+        resolver = EffectivePolicyResolver(session, ResourceHierarchy(), transport) if effective else None
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            TextColumn("{task.completed}"),
+            console=console,
+        ) as progress:
+            task = progress.add_task("[cyan]Fetching IAM policies...", total=None)
+            async for result in stream_project_permissions(client, project_ids, concurrency, cache, resolver):
+                if result.error is not None:
+                    logger.warning(f"Failed to fetch policy for {result.resource}: {result.error}")
+                record_policy(result)
+                progress.advance(task)
+                yield result
+        if resolver is not None:
+            logger.info(f"Fetched {resolver.fetch_count} inherited folder and organization policies")
+
+async def write_org_records(
+    writer: Union[NDJSONWriter, ParquetWriter],
+    results: AsyncIterator[PolicyResult],
+    snapshot: Optional[PolicySnapshot] = None,
+    role: Optional[str] = None,
+    member: Optional[str] = None,
+    prune: bool = True,
+) -> SnapshotChanges:
+    """Write binding records as each policy arrives.
+
+    With a ``snapshot``, only policies that changed since it are written and
+    the snapshot is updated along the way; with ``prune``, resources missing
+    from ``results`` are dropped from it. ``role`` and ``member`` limit the
+    written bindings; the snapshot still records complete policies.
+    """
+    changed = []
+    unchanged = 0
+    seen = set()
+    async for result in results:
+        seen.add(result.resource)
+        if snapshot is None:
+            writer.write(filter_bindings(result.bindings, role, member))
+        elif snapshot.update(result):
+            writer.write(filter_bindings(result.bindings, role, member))
+            changed.append(result._replace(bindings=[]))
+        elif result.error is None:
+            unchanged += 1
+    
+    removed = snapshot.prune(seen) if snapshot is not None and prune else []
+    return SnapshotChanges(changed, removed, unchanged)
+
+async def record_results(
+    results: AsyncIterator[PolicyResult],
+    store: SnapshotStore,
+    run_id: int,
+) -> AsyncIterator[PolicyResult]:
+    """Add each result to an open snapshot store run as it passes through."""
+    async for result in results:
+        store.add(run_id, result)
+        yield result
+
+def show_cache_stats(cache: PolicyCache) -> None:
+    """Print how many policies were served from the cache."""
+    console.print(
+        f"[bold]Cache:[/bold] {cache.hits} hits, {cache.revalidated} revalidated, {cache.misses} misses "
+        f"([cyan]{cache.hit_ratio:.1%}[/cyan] hit ratio)"
+    )
+
+def display_snapshot_changes(
+    changes: SnapshotChanges,
+    role: Optional[str] = None,
+    member: Optional[str] = None,
+) -> None:
+    """Display the bindings of changed resources and summarize the rest."""
+    permissions = [
+        record for result in changes.changed for record in filter_bindings(result.bindings, role, member)
+    ]
+    if permissions:
+        display_permissions_table(permissions)
+    for resource in changes.removed:
+        console.print(f"[red]Removed:[/red] {resource}")
+    show_change_summary(changes)
+
+def show_change_summary(changes: SnapshotChanges) -> None:
+    """Print how many resources changed since the last snapshot."""
+    console.print(
+        f"[bold]{len(changes.changed)} changed[/bold], {len(changes.removed)} removed, "
+        f"{changes.unchanged} unchanged since the last snapshot"
+    )
 
 def display_permissions_table(permissions: List[dict]):
     """Display permissions in a formatted table."""
@@ -146,14 +591,76 @@ def display_permissions_table(permissions: List[dict]):
     table.add_column("Members", style="green")
     table.add_column("Resource", style="yellow", no_wrap=True)
     
+    # Effective permissions name the ancestor that granted inherited bindings
+    inherited = any("inherited_from" in perm for perm in permissions)
+    if inherited:
+        table.add_column("Inherited From", style="blue", no_wrap=True)
+    
     for perm in permissions:
-        table.add_row(
+        row = [
             perm["role"],
             "\n".join(perm["members"]),
             perm["resource"]
-        )
+        ]
+        if inherited:
+            row.append(perm.get("inherited_from", ""))
+        table.add_row(*row)
     
-    console.print(table)
+    with phase("render"):
+        console.print(table)
+
+def display_grants_table(grants: List[Grant], title: str):
+    """Display individual grants in a formatted table."""
+    table = Table(
+        title=f"[bold blue]{title}[/bold blue]",
+        show_header=True,
+        header_style="bold magenta"
+    )
+    
+    table.add_column("Member", style="green")
+    table.add_column("Role", style="cyan", no_wrap=True)
+    table.add_column("Resource", style="yellow", no_wrap=True)
+    
+    inherited = any(grant.inherited_from for grant in grants)
+    if inherited:
+        table.add_column("Inherited From", style="blue", no_wrap=True)
+    
+    for grant in sorted(grants, key=lambda grant: (grant.resource, grant.role, grant.member)):
+        row = [grant.member, grant.role, grant.resource]
+        if inherited:
+            row.append(grant.inherited_from)
+        table.add_row(*row)
+    
+    with phase("render"):
+        console.print(table)
+
+def display_grant_changes(changes: List[GrantChange], title: str):
+    """Display added and removed grants in a formatted table."""
+    table = Table(
+        title=f"[bold blue]{title}[/bold blue]",
+        show_header=True,
+        header_style="bold magenta"
+    )
+    
+    table.add_column("", no_wrap=True)
+    table.add_column("Resource", style="yellow", no_wrap=True)
+    table.add_column("Role", style="cyan", no_wrap=True)
+    table.add_column("Member")
+    
+    inherited = any(change.grant.inherited_from for change in changes)
+    if inherited:
+        table.add_column("Inherited From", style="blue", no_wrap=True)
+    
+    for change in changes:
+        grant = change.grant
+        marker = "[green]+[/green]" if change.change == ADDED else "[red]-[/red]"
+        row = [marker, grant.resource, grant.role, grant.member]
+        if inherited:
+            row.append(grant.inherited_from)
+        table.add_row(*row)
+    
+    with phase("render"):
+        console.print(table)
 
 @click.group()
 @click.option(
@@ -167,50 +674,1022 @@ def display_permissions_table(permissions: List[dict]):
     default="INFO",
     help="Set the logging level",
 )
-def cli(env_file: Optional[str], log_level: str) -> None:
+@click.option(
+    "--endpoint",
+    help=f"Send API calls to this host:port instead of Google, e.g. a local fake server (or set {ENDPOINT_ENV})",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Time each phase of the run (credentials, clients, RPCs, conversion, rendering) and print a summary",
+)
+@click.option(
+    "--profile-cpu",
+    is_flag=True,
+    help="Also run cProfile and list the most expensive functions; implies --profile",
+)
+@click.option(
+    "--profile-memory",
+    is_flag=True,
+    help="Also trace allocations with tracemalloc and list the largest; implies --profile",
+)
+@click.option(
+    "--profile-output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Write the profile as JSON, plus a .pstats file with --profile-cpu; implies --profile",
+)
+@click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Write Prometheus text-format metrics to this file when the run ends, e.g. for node_exporter's textfile collector",
+)
+@click.option(
+    "--metrics-port",
+    type=click.IntRange(0, 65535),
+    help="Serve Prometheus metrics at http://127.0.0.1:PORT/metrics while the run lasts",
+)
+@click.pass_context
+def cli(
+    ctx: click.Context,
+    env_file: Optional[str],
+    log_level: str,
+    endpoint: Optional[str],
+    profile: bool,
+    profile_cpu: bool,
+    profile_memory: bool,
+    profile_output: Optional[Path],
+    metrics_file: Optional[Path],
+    metrics_port: Optional[int],
+) -> None:
     """[bold blue]HH Permissions Tool[/bold blue] - Manage and audit permissions effectively.
     
     This tool helps you manage and analyze permissions across your cloud infrastructure.
     """
-    show_welcome_message()
+    if profile or profile_cpu or profile_memory or profile_output:
+        profiler = enable_profiling(profile_cpu, profile_memory)
+        ctx.call_on_close(lambda: show_profile(profiler, profile_output))
+    # Keep piped output (e.g. NDJSON into jq) free of decoration
+    if console.is_terminal:
+        show_welcome_message()
     setup_logging(log_level)
     load_environment(env_file)
+    session = configure_session(endpoint or os.getenv(ENDPOINT_ENV))
+    # Close the shared sync clients' channels when the command finishes
+    ctx.call_on_close(session.close)
+    if metrics_port is not None:
+        logger.info(f"Serving metrics at {REGISTRY.serve(metrics_port)}")
+        ctx.call_on_close(REGISTRY.stop_serving)
+    if metrics_file:
+        ctx.call_on_close(lambda: REGISTRY.write(metrics_file))
     logger.info("HH Permissions Tool started")
 
+def show_profile(profiler: Profiler, output: Optional[Path] = None) -> None:
+    """Print the phase timings of the run and optionally save the whole profile."""
+    profiler.stop()
+    table = Table(title=f"[bold blue]Profile[/bold blue] ({profiler.elapsed:.2f}s wall time)", header_style="bold magenta")
+    table.add_column("Phase", style="cyan")
+    table.add_column("Calls", justify="right")
+    table.add_column("Total (s)", justify="right")
+    table.add_column("Mean (ms)", justify="right")
+    table.add_column("Max (ms)", justify="right")
+    for name, calls, total, longest in profiler.summary():
+        table.add_row(name, str(calls), f"{total:.3f}", f"{total / calls * 1000:.2f}", f"{longest * 1000:.2f}")
+    console.print(table)
+    
+    functions = profiler.top_functions()
+    if functions:
+        table = Table(title="[bold blue]Most expensive functions[/bold blue]", header_style="bold magenta")
+        table.add_column("Function", style="cyan")
+        table.add_column("Calls", justify="right")
+        table.add_column("Own (s)", justify="right")
+        table.add_column("Cumulative (s)", justify="right")
+        for name, calls, own, cumulative in functions:
+            table.add_row(name, str(calls), f"{own:.3f}", f"{cumulative:.3f}")
+        console.print(table)
+    
+    allocations = profiler.top_allocations()
+    if allocations:
+        table = Table(title="[bold blue]Largest live allocations[/bold blue]", header_style="bold magenta")
+        table.add_column("Line", style="cyan")
+        table.add_column("KiB", justify="right")
+        table.add_column("Blocks", justify="right")
+        for line, size, count in allocations:
+            table.add_row(line, f"{size / 1024:,.1f}", str(count))
+        console.print(table)
+    
+    if output:
+        for path in profiler.save(output):
+            console.print(f"[green]Wrote profile to {path}[/green]")
+
+def transport_option(function):
+    """Add the shared --transport option to a command."""
+    return click.option(
+        "--transport",
+        type=click.Choice([TRANSPORT_ASYNC, TRANSPORT_SYNC]),
+        default=TRANSPORT_ASYNC,
+        show_default=True,
+        help="Use asyncio-native Google clients, or blocking clients in worker threads",
+    )(function)
+
+def cache_options(function):
+    """Add the shared --cache and --cache-ttl options to a command."""
+    function = click.option(
+        "--cache-ttl",
+        type=click.IntRange(min=0),
+        default=DEFAULT_TTL,
+        show_default=True,
+        help="Seconds a cached policy is served without refetching it",
+    )(function)
+    return click.option(
+        "--cache/--no-cache",
+        "use_cache",
+        default=False,
+        help="Serve unchanged policies from the local policy cache",
+    )(function)
+
+def incremental_option(function):
+    """Add the shared --incremental option to a command."""
+    return click.option(
+        "--incremental",
+        type=click.Path(dir_okay=False, path_type=Path),
+        help="Only report policies that changed since this snapshot file, then update it",
+    )(function)
+
+def effective_option(function):
+    """Add the shared --effective option to a command."""
+    return click.option(
+        "--effective",
+        is_flag=True,
+        help="Include bindings inherited from ancestor folders and the organization",
+    )(function)
+
+def store_option(function):
+    """Add the shared --store option to a command."""
+    return click.option(
+        "--store/--no-store",
+        "use_store",
+        default=True,
+        show_default=True,
+        help="Record the audit in the local snapshot store for the `snapshots` commands",
+    )(function)
+
+def yes_option(function):
+    """Add the shared --yes option to a command."""
+    return click.option(
+        "--yes",
+        "-y",
+        "assume_yes",
+        is_flag=True,
+        help="Audit without asking for confirmation, e.g. from scripts and CI",
+    )(function)
+
+def confirm_audit(question: str, assume_yes: bool) -> None:
+    """Ask before starting an audit unless ``assume_yes``; exit with status 1 if not confirmed.
+
+    Without a terminal on standard input there is no one to ask, so the
+    command fails instead of reading an answer from piped input.
+    """
+    if assume_yes:
+        return
+    if not sys.stdin.isatty():
+        err_console.print("[red]Error:[/red] Cannot ask for confirmation without a terminal. Pass --yes to audit without prompting.")
+        sys.exit(1)
+    if not Confirm.ask(question, console=err_console):
+        err_console.print("Aborted.")
+        sys.exit(1)
+
+def filter_options(function):
+    """Add the shared --role and --member filters to a command."""
+    function = click.option(
+        "--member",
+        help="Only report bindings that include this member, e.g. user:alice@example.com",
+    )(function)
+    return click.option(
+        "--role",
+        help="Only report bindings of this role, e.g. roles/owner",
+    )(function)
+
+def output_options(function):
+    """Add the shared --format and --output options to a command."""
+    function = click.option(
+        "--output",
+        type=click.Path(dir_okay=False, allow_dash=True, path_type=Path),
+        default="-",
+        help="File for ndjson or parquet output; '-' writes ndjson to stdout",
+    )(function)
+    return click.option(
+        "--format",
+        "output_format",
+        type=click.Choice([FORMAT_TABLE, FORMAT_NDJSON, FORMAT_PARQUET]),
+        default=FORMAT_TABLE,
+        show_default=True,
+        help="Render a table at the end, stream one JSON record per binding, or write a columnar Parquet file",
+    )(function)
+
+def open_record_writer(output_format: str, output: Path) -> Union[NDJSONWriter, ParquetWriter]:
+    """Open the writer for a streaming output format.
+
+    Console output moves to stderr when records are written to stdout.
+    """
+    if output_format == FORMAT_PARQUET:
+        if str(output) == "-":
+            raise ValueError("Parquet output cannot be written to stdout. Please provide --output.")
+        return ParquetWriter(output)
+    if str(output) == "-":
+        console.stderr = True
+    return NDJSONWriter.open(output)
+
 @cli.command()
 @click.option(
     "--project-id",
     help="Google Cloud Project ID to audit",
     envvar="GOOGLE_CLOUD_PROJECT",
 )
-def audit_gcp(project_id: str):
+@click.option(
+    "--project-file",
+    type=click.File("r"),
+    help="Audit every project ID in this file, one per line, without prompting; '-' reads standard input",
+)
+@click.option(
+    "--label",
+    "labels",
+    multiple=True,
+    metavar="KEY[=VALUE]",
+    help="Audit every active project with this label, without prompting; repeat to require several labels",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=DEFAULT_CONCURRENCY,
+    show_default=True,
+    help="Maximum number of IAM policy requests in flight with --project-file or --label",
+)
+@transport_option
+@cache_options
+@incremental_option
+@output_options
+@effective_option
+@filter_options
+@store_option
+@yes_option
+def audit_gcp(
+    project_id: str,
+    project_file: Optional[TextIO],
+    labels: Sequence[str],
+    concurrency: int,
+    transport: str,
+    use_cache: bool,
+    cache_ttl: int,
+    incremental: Optional[Path],
+    output_format: str,
+    output: Path,
+    effective: bool,
+    role: Optional[str],
+    member: Optional[str],
+    use_store: bool,
+    assume_yes: bool,
+):
     """[green]Audit Google Cloud Platform permissions[/green]
     
     This command analyzes IAM permissions in your Google Cloud project and displays them in a formatted table.
+    
+    With `--effective` the bindings the project inherits from its folders and organization are included.
+    
+    `--role` and `--member` limit the report to matching bindings.
+    
+    The command asks for confirmation first and exits with status 1 if it is declined; `--yes` skips the question, which is required when standard input is not a terminal. Invalid options and failed audits also exit with status 1.
+    
+    Batch mode audits many projects without prompting: `--project-file` reads project IDs from a file or, with `-`, from standard input, and `--label env=prod` selects every project with matching labels. Fetching starts as soon as the first ID is read, so the command can consume the output of another tool as it is produced; `--format ndjson` also writes each policy as it arrives.
     """
+    if project_file is not None or labels:
+        if project_file is not None and labels:
+            console.print("[red]Error:[/red] Provide either --project-file or --label, not both.")
+            sys.exit(1)
+        if click.get_current_context().get_parameter_source("project_id") == click.ParameterSource.COMMANDLINE:
+            console.print("[red]Error:[/red] --project-id cannot be combined with --project-file or --label.")
+            sys.exit(1)
+        if not has_credentials():
+            console.print("[red]Error:[/red] Google Cloud credentials not found. Please set GOOGLE_APPLICATION_CREDENTIALS environment variable.")
+            sys.exit(1)
+        writer = None
+        if output_format != FORMAT_TABLE:
+            try:
+                writer = open_record_writer(output_format, output)
+            except (ImportError, ValueError) as e:
+                console.print(f"[red]Error:[/red] {e}")
+                sys.exit(1)
+        if labels:
+            scope = label_query(labels)
+            project_ids = search_project_ids(scope, transport)
+        else:
+            scope = project_file.name
+            project_ids = read_project_ids(project_file)
+        cache = PolicyCache(ttl=cache_ttl) if use_cache else None
+        audit_project_batch(
+            project_ids, scope, concurrency, transport, cache, incremental, writer, effective, role, member, use_store
+        )
+        return
+    
     if not project_id:
         console.print("[red]Error:[/red] Project ID is required. Please provide it via --project-id or GOOGLE_CLOUD_PROJECT environment variable.")
-        return
+        sys.exit(1)
     
-    if not os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
+    if not has_credentials():
         console.print("[red]Error:[/red] Google Cloud credentials not found. Please set GOOGLE_APPLICATION_CREDENTIALS environment variable.")
-        return
+        sys.exit(1)
     
     # Confirm before proceeding
-    if not Confirm.ask(f"[yellow]Do you want to audit permissions for project[/yellow] [bold cyan]{project_id}[/bold cyan]?"):
-        return
+    confirm_audit(
+        f"[yellow]Do you want to audit permissions for project[/yellow] [bold cyan]{project_id}[/bold cyan]?",
+        assume_yes,
+    )
+    
+    writer = None
+    if output_format != FORMAT_TABLE:
+        try:
+            writer = open_record_writer(output_format, output)
+        except (ImportError, ValueError) as e:
+            console.print(f"[red]Error:[/red] {e}")
+            sys.exit(1)
     
+    cache = PolicyCache(ttl=cache_ttl) if use_cache else None
     try:
         # Run the async function
-        permissions = asyncio.run(get_project_permissions(project_id))
+        result = run_async(get_project_policy(project_id, transport, cache, effective))
+        permissions = filter_bindings(result.bindings, role, member)
+        if use_store and result.error is None:
+            with SnapshotStore() as store:
+                store.record_run(result.resource, [result])
         
-        if permissions:
+        if incremental:
+            snapshot = PolicySnapshot.load(incremental)
+            changes = snapshot.merge([result])
+            snapshot.save(incremental)
+            if writer is not None:
+                writer.write(filter_bindings(changes.bindings, role, member))
+            else:
+                display_snapshot_changes(changes, role, member)
+        elif writer is not None:
+            writer.write(permissions)
+        elif permissions:
             display_permissions_table(permissions)
         else:
             console.print("[yellow]No permissions found for this project.[/yellow]")
     except Exception as e:
         logger.error(f"Failed to run audit: {str(e)}")
         console.print("[red]Failed to run permissions audit. Please check your credentials and project configuration.[/red]")
+        sys.exit(1)
+    finally:
+        if cache is not None:
+            show_cache_stats(cache)
+            cache.close()
+        if writer is not None:
+            writer.close()
+
+def audit_project_batch(
+    project_ids: AsyncIterable[str],
+    scope: str,
+    concurrency: int,
+    transport: str,
+    cache: Optional[PolicyCache],
+    incremental: Optional[Path],
+    writer: Optional[Union[NDJSONWriter, ParquetWriter]] = None,
+    effective: bool = False,
+    role: Optional[str] = None,
+    member: Optional[str] = None,
+    use_store: bool = False,
+) -> None:
+    """Audit a batch of projects while their IDs are read.
+
+    Records are streamed to ``writer`` if given, or shown in one combined
+    table. Runs are stored under ``scope``. Unlike organization audits, the
+    incremental snapshot keeps projects that are not part of this batch.
+    """
+    async def collect(results: AsyncIterator[PolicyResult]) -> List[PolicyResult]:
+        return [result async for result in results]
+    
+    snapshot = PolicySnapshot.load(incremental) if incremental else None
+    store = SnapshotStore() if use_store else None
+    results = []
+    try:
+        stream = iter_batch_permissions(project_ids, concurrency, transport, cache, effective)
+        if store is not None:
+            run_id = store.begin_run(scope)
+            stream = record_results(stream, store, run_id)
+        if writer is not None:
+            changes = run_async(write_org_records(writer, stream, snapshot, role, member, prune=False))
+        else:
+            results = run_async(collect(stream))
+            if snapshot is not None:
+                changes = snapshot.merge(results)
+        if store is not None:
+            store.finish_run(run_id)
+    except Exception as e:
+        logger.error(f"Failed to run audit: {str(e)}")
+        console.print("[red]Failed to run batch audit. Please check your credentials and the project list.[/red]")
+        sys.exit(1)
+    finally:
+        if cache is not None:
+            cache.close()
+        if store is not None:
+            store.close()
+        if writer is not None:
+            writer.close()
+    
+    if snapshot is not None:
+        snapshot.save(incremental)
+        if writer is None:
+            display_snapshot_changes(changes, role, member)
+        else:
+            show_change_summary(changes)
+    elif writer is None:
+        permissions = [
+            record for result in results for record in filter_bindings(result.bindings, role, member)
+        ]
+        if permissions:
+            display_permissions_table(permissions)
+        else:
+            console.print("[yellow]No permissions found for the listed projects.[/yellow]")
+        failed = sum(1 for result in results if result.error is not None)
+        console.print(
+            f"[bold]Audited {len(results) - failed} of {len(results)} projects[/bold] "
+            f"([cyan]{len(permissions)}[/cyan] bindings)"
+        )
+    if writer is not None:
+        logger.info(f"Wrote {writer.count} records")
+    if cache is not None:
+        show_cache_stats(cache)
+
+@cli.command()
+@click.option(
+    "--organization-id",
+    help="Google Cloud organization ID whose projects should be audited",
+    envvar="GOOGLE_CLOUD_ORGANIZATION",
+)
+@click.option(
+    "--folder-id",
+    help="Google Cloud folder ID whose projects should be audited",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=DEFAULT_CONCURRENCY,
+    show_default=True,
+    help="Maximum number of IAM policy requests in flight",
+)
+@click.option(
+    "--backend",
+    type=click.Choice([BACKEND_RESOURCE_MANAGER, BACKEND_ASSET_INVENTORY]),
+    default=BACKEND_RESOURCE_MANAGER,
+    show_default=True,
+    help="Fetch policies per project via Resource Manager, or in bulk via Cloud Asset Inventory",
+)
+@transport_option
+@cache_options
+@incremental_option
+@output_options
+@effective_option
+@filter_options
+@store_option
+@yes_option
+def audit_org(
+    organization_id: Optional[str],
+    folder_id: Optional[str],
+    concurrency: int,
+    backend: str,
+    transport: str,
+    use_cache: bool,
+    cache_ttl: int,
+    incremental: Optional[Path],
+    output_format: str,
+    output: Path,
+    effective: bool,
+    role: Optional[str],
+    member: Optional[str],
+    use_store: bool,
+    assume_yes: bool,
+):
+    """[green]Audit permissions for every project in an organization or folder[/green]
+    
+    This command enumerates all active projects under the given organization or folder, fetches their IAM policies concurrently and displays them in one combined table.
+    
+    With `--format ndjson` one JSON record per binding is written as soon as each policy arrives, keeping memory use flat. `--format parquet` writes one row per member to a columnar file instead.
+    
+    With `--effective` each project also shows the bindings inherited from its folders and organization; every ancestor policy is fetched only once.
+    
+    With `--incremental` only the policies whose etag changed since the previous snapshot are analyzed and displayed.
+    
+    `--role` and `--member` limit the report to matching bindings; they are applied to the policies as returned by the API, so other bindings are never converted.
+    
+    With `--backend asset-inventory` the policies are read in bulk through Cloud Asset Inventory instead, which requires the Cloud Asset API to be enabled.
+    
+    The command asks for confirmation first and exits with status 1 if it is declined; pass `--yes` to run it from scripts, CI or cron, where standard input is not a terminal. Invalid options and failed audits also exit with status 1.
+    """
+    if bool(organization_id) == bool(folder_id):
+        console.print("[red]Error:[/red] Provide exactly one of --organization-id (or GOOGLE_CLOUD_ORGANIZATION) and --folder-id.")
+        sys.exit(1)
+    
+    if not has_credentials():
+        console.print("[red]Error:[/red] Google Cloud credentials not found. Please set GOOGLE_APPLICATION_CREDENTIALS environment variable.")
+        sys.exit(1)
+    
+    if effective and backend != BACKEND_RESOURCE_MANAGER:
+        console.print("[red]Error:[/red] --effective requires the resource-manager backend.")
+        sys.exit(1)
+    
+    parent = f"organizations/{organization_id}" if organization_id else f"folders/{folder_id}"
+    
+    # Confirm before proceeding
+    confirm_audit(
+        f"[yellow]Do you want to audit permissions for all projects under[/yellow] [bold cyan]{parent}[/bold cyan]?",
+        assume_yes,
+    )
+    
+    if output_format != FORMAT_TABLE:
+        try:
+            writer = open_record_writer(output_format, output)
+        except (ImportError, ValueError) as e:
+            console.print(f"[red]Error:[/red] {e}")
+            sys.exit(1)
+        cache = PolicyCache(ttl=cache_ttl) if use_cache else None
+        stream_org_records(
+            writer, parent, concurrency, backend, transport, cache, incremental, effective, role, member, use_store
+        )
+        return
+    
+    cache = PolicyCache(ttl=cache_ttl) if use_cache else None    
+    hierarchy = None
+    try:
+        if backend == BACKEND_RESOURCE_MANAGER:
+            hierarchy = run_async(crawl_org_hierarchy(parent, concurrency, transport))
+        results = run_async(get_org_permissions(parent, concurrency, backend, transport, cache, effective, hierarchy))
+    except Exception as e:
+        logger.error(f"Failed to run audit: {str(e)}")
+        console.print("[red]Failed to run organization audit. Please check your credentials and organization configuration.[/red]")
+        sys.exit(1)
+    finally:
+        if cache is not None:
+            cache.close()
+    
+    failed = [result for result in results if result.error is not None]
+    if use_store:
+        with SnapshotStore() as store:
+            store.record_run(parent, results, hierarchy_parents(hierarchy) if hierarchy is not None else None)
+    
+    if incremental:
+        snapshot = PolicySnapshot.load(incremental)
+        changes = snapshot.merge(results, prune=True)
+        snapshot.save(incremental)
+        display_snapshot_changes(changes, role, member)
+    else:
+        permissions = [
+            record for result in results for record in filter_bindings(result.bindings, role, member)
+        ]
+        if permissions:
+            display_permissions_table(permissions)
+        else:
+            console.print(f"[yellow]No permissions found under {parent}.[/yellow]")
+        
+        console.print(
+            f"[bold]Audited {len(results) - len(failed)} of {len(results)} resources[/bold] "
+            f"([cyan]{len(permissions)}[/cyan] bindings)"
+        )
+    if failed:
+        console.print(f"[yellow]Failed to fetch {len(failed)} project policies. Run with --log-level WARNING or lower for details.[/yellow]")
+    if cache is not None:
+        show_cache_stats(cache)
+
+def stream_org_records(
+    writer: Union[NDJSONWriter, ParquetWriter],
+    parent: str,
+    concurrency: int,
+    backend: str,
+    transport: str,
+    cache: Optional[PolicyCache],
+    incremental: Optional[Path],
+    effective: bool = False,
+    role: Optional[str] = None,
+    member: Optional[str] = None,
+    use_store: bool = False,
+) -> None:
+    """Run an organization audit that streams records to a writer instead of rendering a table."""
+    snapshot = PolicySnapshot.load(incremental) if incremental else None
+    store = SnapshotStore() if use_store else None
+    try:
+        hierarchy = None
+        if backend == BACKEND_RESOURCE_MANAGER:
+            hierarchy = run_async(crawl_org_hierarchy(parent, concurrency, transport))
+        results = iter_org_permissions(parent, concurrency, backend, transport, cache, hierarchy, effective)
+        if store is not None:
+            run_id = store.begin_run(parent)
+            results = record_results(results, store, run_id)
+        changes = run_async(write_org_records(writer, results, snapshot, role, member))
+        if store is not None:
+            store.finish_run(run_id, hierarchy_parents(hierarchy) if hierarchy is not None else None)
+    except Exception as e:
+        logger.error(f"Failed to run audit: {str(e)}")
+        console.print("[red]Failed to run organization audit. Please check your credentials and organization configuration.[/red]")
+        sys.exit(1)
+    finally:
+        if cache is not None:
+            cache.close()
+        if store is not None:
+            store.close()
+        writer.close()
+    
+    if snapshot is not None:
+        snapshot.save(incremental)
+        show_change_summary(changes)
+    logger.info(f"Wrote {writer.count} records")
+    if cache is not None:
+        show_cache_stats(cache)
+
+@cli.command()
+@click.argument(
+    "snapshot",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    required=False,
+)
+@click.option(
+    "--run",
+    "run_id",
+    type=int,
+    help="Recorded audit run to query instead of a snapshot file (default: the latest run)",
+)
+@click.option(
+    "--member",
+    help="Show everything this member has, e.g. user:alice@example.com",
+)
+@click.option(
+    "--role",
+    help="Show who has this role, e.g. roles/owner",
+)
+@click.option(
+    "--permission",
+    help="Show who has a role granting this permission, e.g. compute.instances.delete",
+)
+@click.option(
+    "--resource",
+    help="Only show grants on resources starting with this prefix",
+)
+@click.option(
+    "--catalog",
+    "catalog_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Role catalog used by --permission (default: the synced catalog)",
+)
+def query(
+    snapshot: Optional[Path],
+    run_id: Optional[int],
+    member: Optional[str],
+    role: Optional[str],
+    permission: Optional[str],
+    resource: Optional[str],
+    catalog_path: Optional[Path],
+):
+    """[green]Query a saved snapshot[/green] without re-auditing
+    
+    Answers "what does this member have" (`--member`), "who has this role" (`--role`) and
+    "who has this permission" (`--permission`) from a snapshot file written by `--incremental`,
+    or without SNAPSHOT from a run in the snapshot store, which needs nothing loaded up front.
+    The options can be combined to narrow the answer. `--permission` needs a synced role catalog.
+    The reported time covers loading the catalog and the snapshot as well as the lookup.
+    """
+    if not member and not role and not permission:
+        console.print("[red]Error:[/red] Please provide --member, --role or --permission.")
+        return
+    if snapshot is not None and run_id is not None:
+        console.print("[red]Error:[/red] Please provide either SNAPSHOT or --run, not both.")
+        return
+    
+    if member:
+        title = f"Access of {member}"
+    elif role:
+        title = f"Members with {role}"
+    else:
+        title = f"Members with {permission}"
+    
+    started = time.perf_counter()
+    roles: List[Optional[str]] = [role]
+    if permission:
+        try:
+            granting_roles = RoleBitsets.from_catalog(RoleCatalog.load(catalog_path)).roles_granting(permission)
+        except FileNotFoundError:
+            console.print("[red]Error:[/red] No role catalog found. Run `catalog sync` first.")
+            return
+        roles = [granting for granting in granting_roles if role is None or granting == role]
+    
+    if snapshot is not None:
+        loading = time.perf_counter()
+        try:
+            index = PermissionIndex.from_records(PolicySnapshot.load(snapshot).bindings())
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load snapshot {snapshot}: {str(e)}")
+            console.print(f"[red]Error:[/red] Could not read snapshot {snapshot}.")
+            return
+        logger.debug(f"Indexed {len(index)} grants in {(time.perf_counter() - loading) * 1000:.1f} ms")
+        grants = [
+            grant
+            for granting in roles
+            for grant in (
+                index.member_access(member, granting, resource) if member else index.who_has(granting, resource)
+            )
+        ]
+    else:
+        with SnapshotStore() as store:
+            run = store.get_run(run_id) if run_id is not None else store.latest_run()
+            if run is None or not run.complete:
+                console.print("[red]Error:[/red] No matching audit run found. Pass a snapshot file or run an audit first.")
+                return
+            grants = [grant for granting in roles for grant in store.query(run.id, member, granting, resource)]
+        title = f"{title} in run {run.id} of {run.scope}"
+    elapsed = time.perf_counter() - started
+    
+    if grants:
+        display_grants_table(grants, title)
+    else:
+        console.print("[yellow]No matching grants found.[/yellow]")
+    console.print(
+        f"[bold]{len(grants)} grants[/bold] found in [cyan]{elapsed * 1000:.2f} ms[/cyan]"
+    )
+
+@cli.group()
+def snapshots():
+    """[green]List, query and prune recorded audit runs[/green]"""
+
+@snapshots.command("list")
+@click.option(
+    "--scope",
+    help="Only list runs of this resource, e.g. organizations/123456789012",
+)
+def snapshots_list(scope: Optional[str]):
+    """[green]List recorded audit runs[/green], newest first"""
+    with SnapshotStore() as store:
+        runs = store.runs(scope)
+    
+    if not runs:
+        console.print("[yellow]No audit runs recorded yet.[/yellow]")
+        return
+    
+    table = Table(
+        title="[bold blue]Recorded Audit Runs[/bold blue]",
+        show_header=True,
+        header_style="bold magenta"
+    )
+    table.add_column("Run", style="cyan", justify="right")
+    table.add_column("Started", style="green")
+    table.add_column("Scope", style="yellow", no_wrap=True)
+    table.add_column("Resources", justify="right")
+    table.add_column("Failed", justify="right")
+    table.add_column("Grants", justify="right")
+    
+    for run in runs:
+        started = datetime.datetime.fromtimestamp(run.started_at).strftime("%Y-%m-%d %H:%M:%S")
+        table.add_row(str(run.id), started, run.scope, str(run.resources), str(run.failed), str(run.grants))
+    
+    with phase("render"):
+        console.print(table)
+
+@snapshots.command("query")
+@click.option(
+    "--run",
+    "run_id",
+    type=int,
+    help="Run to query (default: the latest run)",
+)
+@click.option(
+    "--scope",
+    help="Query the latest run of this resource instead of the latest run overall",
+)
+@click.option(
+    "--member",
+    help="Only show grants of this member, e.g. user:alice@example.com",
+)
+@click.option(
+    "--role",
+    help="Only show grants of this role, e.g. roles/owner",
+)
+@click.option(
+    "--resource",
+    help="Only show grants on resources starting with this prefix",
+)
+def snapshots_query(
+    run_id: Optional[int],
+    scope: Optional[str],
+    member: Optional[str],
+    role: Optional[str],
+    resource: Optional[str],
+):
+    """[green]Query the grants of a recorded audit run[/green]
+    
+    Answers "what did this member have" and "who had this role" for any recorded run without calling the API.
+    """
+    with SnapshotStore() as store:
+        run = store.get_run(run_id) if run_id is not None else store.latest_run(scope)
+        if run is None or not run.complete:
+            console.print("[red]Error:[/red] No matching audit run found. Run `snapshots list` to see recorded runs.")
+            return
+        
+        started = time.perf_counter()
+        grants = store.query(run.id, member, role, resource)
+        elapsed = time.perf_counter() - started
+    
+    if grants:
+        display_grants_table(grants, f"Grants in run {run.id} of {run.scope}")
+    else:
+        console.print("[yellow]No matching grants found.[/yellow]")
+    console.print(
+        f"[bold]{len(grants)} grants[/bold] found in [cyan]{elapsed * 1000:.2f} ms[/cyan]"
+    )
+
+@snapshots.command("prune")
+@click.option(
+    "--keep",
+    type=click.IntRange(min=0),
+    help="Keep only this many of the newest runs",
+)
+@click.option(
+    "--older-than",
+    type=click.FloatRange(min=0),
+    help="Delete runs older than this many days",
+)
+def snapshots_prune(keep: Optional[int], older_than: Optional[float]):
+    """[green]Delete old audit runs[/green] from the snapshot store"""
+    if keep is None and older_than is None:
+        console.print("[red]Error:[/red] Please provide --keep, --older-than or both.")
+        return
+    
+    with SnapshotStore() as store:
+        pruned = store.prune(keep, older_than * 86400 if older_than is not None else None)
+    console.print(f"[bold]Pruned {pruned} runs[/bold]")
+
+@cli.command()
+@click.argument("old_run", type=int, required=False)
+@click.argument("new_run", type=int, required=False)
+@click.option(
+    "--scope",
+    help="Compare the two latest runs of this resource, e.g. organizations/123456789012",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice([FORMAT_TABLE, FORMAT_NDJSON]),
+    default=FORMAT_TABLE,
+    show_default=True,
+    help="Render a table, or stream one JSON record per changed grant",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, allow_dash=True, path_type=Path),
+    default="-",
+    help="File for ndjson output; '-' writes to stdout",
+)
+def diff(
+    old_run: Optional[int],
+    new_run: Optional[int],
+    scope: Optional[str],
+    output_format: str,
+    output: Path,
+):
+    """[green]Show what changed between two recorded audit runs[/green]
+    
+    Reports the members added to and removed from each role on each resource. Without run IDs the two latest runs (of `--scope`, if given) are compared.
+    
+    Both runs are compared top-down through their content hashes, skipping every folder, project and role that did not change; only the grants of changed roles are read from the snapshot store and merged in sorted order. Use `--format ndjson` for very large diffs.
+    
+    Resources whose policy failed to fetch in either run are skipped and counted, so a transient API error does not read as revoked access.
+    """
+    with SnapshotStore() as store:
+        if old_run is None and new_run is None:
+            runs = store.runs(scope)[:2]
+            if len(runs) < 2:
+                console.print("[red]Error:[/red] Need at least two recorded runs to compare. Run `snapshots list` to see them.")
+                return
+            new, old = runs
+        elif old_run is not None and new_run is not None:
+            old, new = store.get_run(old_run), store.get_run(new_run)
+            if old is None or new is None or not (old.complete and new.complete):
+                console.print("[red]Error:[/red] Run not found. Run `snapshots list` to see recorded runs.")
+                return
+        else:
+            console.print("[red]Error:[/red] Provide both run IDs, or none to compare the two latest runs.")
+            return
+        
+        if old.scope != new.scope:
+            logger.warning(f"Comparing runs of different scopes: {old.scope} and {new.scope}")
+        
+        unreadable = unreadable_resources(store, old.id, new.id)
+        changes = diff_runs(store, old.id, new.id)
+        if output_format == FORMAT_NDJSON:
+            writer = open_record_writer(FORMAT_NDJSON, output)
+            added = removed = 0
+            try:
+                for change in changes:
+                    writer.write([change.to_dict()])
+                    if change.change == ADDED:
+                        added += 1
+                    else:
+                        removed += 1
+            finally:
+                writer.close()
+        else:
+            changes = list(changes)
+            added = sum(1 for change in changes if change.change == ADDED)
+            removed = len(changes) - added
+            if changes:
+                display_grant_changes(changes, f"Changes from run {old.id} to run {new.id}")
+    
+    console.print(
+        f"[bold]{added} grants added[/bold], [bold]{removed} removed[/bold] "
+        f"between run {old.id} and run {new.id}"
+    )
+    if unreadable:
+        console.print(
+            f"[yellow]Skipped {len(unreadable)} resources whose policy failed to fetch in one of the runs, "
+            f"e.g. {unreadable[0]}.[/yellow]"
+        )
+
+@cli.group()
+def catalog():
+    """[green]Manage the local role-to-permission catalog[/green]"""
+
+def catalog_path_option(function):
+    """Add the shared --path option to a catalog command."""
+    return click.option(
+        "--path",
+        type=click.Path(dir_okay=False, path_type=Path),
+        help="Catalog file (default: roles.json.gz in the cache directory)",
+    )(function)
+
+@catalog.command("sync")
+@click.option(
+    "--organization-id",
+    multiple=True,
+    help="Also sync the custom roles of this organization (repeatable)",
+)
+@click.option(
+    "--project-id",
+    multiple=True,
+    help="Also sync the custom roles of this project (repeatable)",
+)
+@click.option(
+    "--fixture",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Build the catalog offline from a JSON fixture instead of the IAM API",
+)
+@catalog_path_option
+def catalog_sync(organization_id: Sequence[str], project_id: Sequence[str], fixture: Optional[Path], path: Optional[Path]):
+    """[green]Sync the permissions of every role[/green] into the local catalog
+    
+    Predefined roles are always synced; custom roles are synced for each `--organization-id` and `--project-id`.
+    """
+    from google.api_core import exceptions
+
+    try:
+        if fixture:
+            role_catalog = RoleCatalog.from_fixture(fixture)
+        else:
+            parents = [PREDEFINED_ROLES]
+            parents += [f"organizations/{org_id}" for org_id in organization_id]
+            parents += [f"projects/{pid}" for pid in project_id]
+            with console.status("[bold blue]Syncing roles..."):
+                role_catalog = sync_catalog(get_session().credentials, parents)
+        saved_path = role_catalog.save(path)
+    except ImportError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        return
+    except exceptions.PermissionDenied:
+        console.print("[red]Error:[/red] Permission denied. Please check your credentials and IAM permissions.")
+        return
+    except Exception as e:
+        logger.error(f"Failed to sync role catalog: {str(e)}")
+        console.print("[red]Failed to sync the role catalog. Please check your credentials.[/red]")
+        return
+    
+    console.print(
+        f"[bold]Synced {len(role_catalog)} roles[/bold] "
+        f"([cyan]{len(role_catalog.all_permissions())}[/cyan] permissions) to {saved_path}"
+    )
+
+@catalog.command("show")
+@click.argument("role")
+@catalog_path_option
+def catalog_show(role: str, path: Optional[Path]):
+    """[green]List the permissions of a role[/green] from the local catalog"""
+    try:
+        role_catalog = RoleCatalog.load(path)
+    except FileNotFoundError:
+        console.print("[red]Error:[/red] No role catalog found. Run `catalog sync` first.")
+        return
+    
+    if role not in role_catalog:
+        console.print(f"[yellow]Role {role} is not in the catalog.[/yellow]")
+        return
+    
+    permissions = role_catalog.permissions(role)
+    for permission in permissions:
+        console.print(permission)
+    console.print(f"[bold]{len(permissions)} permissions[/bold] in {role}")
 
 @cli.command()
 def version():
@@ -0,0 +1,165 @@
+"""Find the fewest predefined roles that grant a set of permissions.
+
+This is a set-cover problem over the role catalog. A greedy pass picks the
+role covering the most missing permissions until everything is covered,
+then drops roles made redundant by later picks. The optional exact pass is
+a depth-first branch and bound seeded with the greedy answer; it stops
+after ``time_limit`` seconds and keeps the best cover found so far.
+"""
+
+import time
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from hh_permissions_tool.bitsets import RoleBitsets, iter_bits, popcount
+
+# Seconds the exact pass may search before settling for its best cover
+DEFAULT_TIME_LIMIT = 0.5
+
+
+class RoleCover(NamedTuple):
+    """Roles covering a set of required permissions."""
+
+    roles: List[str]
+    uncovered: List[str]
+    excess: int
+    exact: bool = False
+
+
+def is_predefined(role: str) -> bool:
+    """Whether a role is a predefined role rather than a custom one."""
+    return role.startswith("roles/")
+
+def _candidates(bitsets: RoleBitsets, required: int, predefined_only: bool) -> Dict[str, int]:
+    """Map roles granting any required permission to the required permissions they grant.
+
+    Roles granting a strict subset of another candidate's required
+    permissions can never improve a cover and are dropped, as are larger
+    roles granting exactly the same required permissions as a smaller one.
+    """
+    # One lookup per required permission, so index the grants once for every cover
+    bitsets.build_grant_index()
+    names = set()
+    for position in iter_bits(required):
+        names.update(bitsets.roles_granting(bitsets.universe.permissions[position]))
+    if predefined_only:
+        names = {name for name in names if is_predefined(name)}
+
+    by_coverage: Dict[int, str] = {}
+    for name in sorted(names, key=lambda name: (bitsets.size(name), name)):
+        by_coverage.setdefault(bitsets.mask(name) & required, name)
+
+    coverages = sorted(by_coverage, key=popcount, reverse=True)
+    kept: Dict[str, int] = {}
+    for index, coverage in enumerate(coverages):
+        if not any(coverage & other == coverage for other in coverages[:index]):
+            kept[by_coverage[coverage]] = coverage
+    return kept
+
+def greedy_cover(bitsets: RoleBitsets, candidates: Dict[str, int], required: int) -> List[str]:
+    """Cover ``required`` by repeatedly picking the role that covers the most of the rest.
+
+    Ties go to the role granting fewer permissions overall.
+    """
+    chosen: List[str] = []
+    missing = required
+    while missing:
+        best = max(
+            candidates,
+            key=lambda name: (popcount(candidates[name] & missing), -bitsets.size(name)),
+        )
+        if not candidates[best] & missing:
+            break
+        chosen.append(best)
+        missing &= ~candidates[best]
+
+    # A role picked early may be fully covered by later picks
+    for name in list(chosen):
+        rest = 0
+        for other in chosen:
+            if other != name:
+                rest |= candidates[other]
+        if candidates[name] & required & ~rest == 0:
+            chosen.remove(name)
+    return chosen
+
+def exact_cover(
+    candidates: Dict[str, int],
+    required: int,
+    best: List[str],
+    time_limit: float = DEFAULT_TIME_LIMIT,
+) -> Tuple[List[str], bool]:
+    """Search for a cover with fewer roles than ``best``.
+
+    Branches on the missing permission granted by the fewest candidates.
+    Returns the smallest cover found and whether the search completed.
+    """
+    best = list(best)
+    deadline = time.perf_counter() + time_limit
+    by_permission: Dict[int, List[str]] = {}
+    for name, coverage in candidates.items():
+        for position in iter_bits(coverage):
+            by_permission.setdefault(position, []).append(name)
+
+    def search(chosen: List[str], missing: int) -> bool:
+        nonlocal best
+        if time.perf_counter() > deadline:
+            return False
+        if not missing:
+            if len(chosen) < len(best):
+                best = list(chosen)
+            return True
+        if len(chosen) + 1 >= len(best):
+            return True
+
+        # Lower bound: no role covers more than the largest remaining coverage
+        largest = max(popcount(candidates[name] & missing) for name in candidates)
+        if len(chosen) + -(-popcount(missing) // largest) >= len(best):
+            return True
+
+        position = min(iter_bits(missing), key=lambda bit: len(by_permission[bit]))
+        options = sorted(by_permission[position], key=lambda name: -popcount(candidates[name] & missing))
+        for name in options:
+            chosen.append(name)
+            complete = search(chosen, missing & ~candidates[name])
+            chosen.pop()
+            if not complete:
+                return False
+        return True
+
+    complete = search([], required)
+    return best, complete
+
+def solve_cover(
+    bitsets: RoleBitsets,
+    permissions: Iterable[str],
+    exact: bool = False,
+    predefined_only: bool = True,
+    time_limit: float = DEFAULT_TIME_LIMIT,
+) -> RoleCover:
+    """Find a small set of roles granting every permission in ``permissions``.
+
+    Permissions no candidate role grants are reported as ``uncovered``;
+    ``excess`` counts the permissions the chosen roles grant beyond the
+    required ones. With ``exact``, the result is marked ``exact`` only if
+    the search proved it minimal within ``time_limit`` seconds.
+    """
+    permissions = set(permissions)
+    uncovered = sorted(permission for permission in permissions if permission not in bitsets.universe)
+    required = bitsets.universe.mask(permissions.difference(uncovered))
+    candidates = _candidates(bitsets, required, predefined_only)
+
+    reachable = 0
+    for coverage in candidates.values():
+        reachable |= coverage
+    uncovered += bitsets.universe.decode(required & ~reachable)
+    required &= reachable
+
+    roles = greedy_cover(bitsets, candidates, required)
+    proven = False
+    if exact and roles:
+        roles, proven = exact_cover(candidates, required, roles, time_limit)
+
+    granted = 0
+    for name in roles:
+        granted |= bitsets.mask(name)
+    return RoleCover(sorted(roles), sorted(uncovered), popcount(granted & ~required), proven)
@@ -0,0 +1,137 @@
+"""Streaming comparison of the grants of two audit runs.
+
+Both runs are read in (resource, role, member, origin) order and walked in
+step like the merge phase of a merge sort, so memory use stays constant
+however many grants the runs hold. Rows are compared as plain tuples and
+only changed grants are turned into ``Grant`` records.
+
+Runs with content hashes are first compared top-down through their hash
+trees: subtrees, resources and roles whose hashes agree are skipped, and
+only the grants of the roles that changed are merged.
+
+Resources whose policy could not be fetched in either run are left out:
+a failed fetch stores no grants, which would otherwise read as every
+grant on the resource being revoked.
+"""
+
+from typing import Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from hh_permissions_tool.index import Grant
+from hh_permissions_tool.store import SnapshotStore
+
+ADDED = "added"
+REMOVED = "removed"
+
+
+class GrantChange(NamedTuple):
+    """A grant present in only one of two runs."""
+
+    change: str
+    grant: Grant
+
+    def to_dict(self) -> dict:
+        """The change as a flat, JSON-serializable record."""
+        record = {"change": self.change, **self.grant._asdict()}
+        if not record["inherited_from"]:
+            del record["inherited_from"]
+        return record
+
+
+GrantKey = Tuple[str, str, str, str]
+
+
+def _change(change: str, key: GrantKey) -> GrantChange:
+    resource, role, member, inherited_from = key
+    return GrantChange(change, Grant(member, role, resource, inherited_from))
+
+def diff_grants(old: Iterator[GrantKey], new: Iterator[GrantKey]) -> Iterator[GrantChange]:
+    """Yield the grants removed from ``old`` and added in ``new``.
+
+    Both inputs are ``(resource, role, member, inherited_from)`` tuples in
+    ascending order, as ``SnapshotStore.iter_grant_keys`` returns them.
+    """
+    old_key = next(old, None)
+    new_key = next(new, None)
+    while old_key is not None and new_key is not None:
+        if old_key == new_key:
+            old_key = next(old, None)
+            new_key = next(new, None)
+        elif old_key < new_key:
+            yield _change(REMOVED, old_key)
+            old_key = next(old, None)
+        else:
+            yield _change(ADDED, new_key)
+            new_key = next(new, None)
+
+    while old_key is not None:
+        yield _change(REMOVED, old_key)
+        old_key = next(old, None)
+    while new_key is not None:
+        yield _change(ADDED, new_key)
+        new_key = next(new, None)
+
+def changed_resources(store: SnapshotStore, old_run: int, new_run: int) -> Optional[List[str]]:
+    """Resources whose grants differ between two runs, sorted.
+
+    Descends both hash trees together, only into nodes whose hashes
+    differ. Returns None if either run was recorded without hashes.
+    """
+    old_root = store.root_node(old_run)
+    new_root = store.root_node(new_run)
+    if old_root is None or new_root is None:
+        return None
+
+    changed: Set[str] = set()
+    pending = [(old_root[0], new_root[0])] if old_root[1] != new_root[1] else []
+    while pending:
+        old_name, new_name = pending.pop()
+        old_hash = store.resource_hash(old_run, old_name) if old_name is not None else None
+        new_hash = store.resource_hash(new_run, new_name) if new_name is not None else None
+        if old_hash != new_hash:
+            changed.update(name for name, digest in ((old_name, old_hash), (new_name, new_hash)) if digest is not None)
+
+        old_children = store.child_nodes(old_run, old_name) if old_name is not None else {}
+        new_children = store.child_nodes(new_run, new_name) if new_name is not None else {}
+        for name in old_children.keys() | new_children.keys():
+            if old_children.get(name) != new_children.get(name):
+                pending.append((
+                    name if name in old_children else None,
+                    name if name in new_children else None,
+                ))
+    return sorted(changed)
+
+def unreadable_resources(store: SnapshotStore, old_run: int, new_run: int) -> List[str]:
+    """Resources whose policy could not be fetched in either run, sorted."""
+    return sorted(store.failed_resources(old_run) | store.failed_resources(new_run))
+
+def diff_runs(store: SnapshotStore, old_run: int, new_run: int) -> Iterator[GrantChange]:
+    """Yield the grants removed and added between two stored runs, in key order.
+
+    Only the roles whose binding hashes differ on the changed resources are
+    merged; runs without hashes are merged in full. Resources listed by
+    ``unreadable_resources`` are skipped.
+    """
+    skipped = set(unreadable_resources(store, old_run, new_run))
+    resources = changed_resources(store, old_run, new_run)
+    if resources is None:
+        yield from diff_grants(
+            (key for key in store.iter_grant_keys(old_run) if key[0] not in skipped),
+            (key for key in store.iter_grant_keys(new_run) if key[0] not in skipped),
+        )
+        return
+
+    for resource in resources:
+        if resource in skipped:
+            continue
+        old_hashes = store.binding_hashes(old_run, resource)
+        new_hashes = store.binding_hashes(new_run, resource)
+        roles = {
+            role
+            for role, inherited_from in old_hashes.keys() | new_hashes.keys()
+            if old_hashes.get((role, inherited_from)) != new_hashes.get((role, inherited_from))
+        }
+        for role in sorted(roles):
+            yield from diff_grants(
+                store.iter_grant_keys(old_run, resource, role),
+                store.iter_grant_keys(new_run, resource, role),
+            )
@@ -0,0 +1,107 @@
+"""Effective (inherited) IAM permissions across the resource hierarchy.
+
+A project's effective access is the union of its own bindings and those of
+every ancestor folder and the organization. Ancestor policies are fetched
+once and shared by every project below them.
+"""
+
+import asyncio
+import hashlib
+from typing import Dict, Sequence
+
+from loguru import logger
+
+from hh_permissions_tool.hierarchy import ResourceHierarchy, resolve_project_ancestry
+from hh_permissions_tool.policies import Binding, PolicyResult, encode_etag, get_iam_policy, policy_to_records
+from hh_permissions_tool.session import TRANSPORT_ASYNC, GCPSession
+
+# Default number of ancestor GetIamPolicy requests in flight
+DEFAULT_ANCESTOR_CONCURRENCY = 16
+
+
+def effective_policy(project: PolicyResult, ancestors: Sequence[PolicyResult]) -> PolicyResult:
+    """Combine a project's policy with its ancestors' policies.
+
+    Inherited records keep the project as their ``resource`` and name the
+    granting ancestor in ``inherited_from``. The etag is derived from every
+    contributing etag, so it changes whenever any of the policies change.
+    """
+    records = list(project.bindings)
+    for ancestor in ancestors:
+        for record in ancestor.bindings:
+            records.append(Binding(record["role"], record["members"], project.resource, ancestor.resource))
+
+    digest = hashlib.sha256()
+    for result in (project, *ancestors):
+        digest.update(f"{result.resource}={result.etag};".encode())
+    return PolicyResult(project.resource, records, digest.hexdigest()[:16], project.error)
+
+
+class EffectivePolicyResolver:
+    """Compute effective policies of projects with memoized ancestor policies.
+
+    Each folder or organization policy is requested at most once, however
+    many projects share the ancestor; concurrent requests for the same
+    ancestor wait on the same fetch. Ancestors whose policy cannot be read
+    contribute no bindings and are logged once.
+    """
+
+    def __init__(
+        self,
+        session: GCPSession,
+        hierarchy: ResourceHierarchy,
+        transport: str = TRANSPORT_ASYNC,
+        concurrency: int = DEFAULT_ANCESTOR_CONCURRENCY,
+    ):
+        self.session = session
+        self.hierarchy = hierarchy
+        self.transport = transport
+        self._policies: Dict[str, asyncio.Future] = {}
+        self._limit = asyncio.Semaphore(concurrency)
+
+    @property
+    def fetch_count(self) -> int:
+        """Number of ancestor policies requested so far."""
+        return len(self._policies)
+
+    async def _fetch(self, name: str) -> PolicyResult:
+        if name.startswith("organizations/"):
+            client = self.session.organizations_client(self.transport)
+        else:
+            client = self.session.folders_client(self.transport)
+        try:
+            async with self._limit:
+                policy = await get_iam_policy(client, name)
+            return PolicyResult(name, policy_to_records(policy, name), encode_etag(policy.etag))
+        except Exception as e:
+            logger.warning(f"Failed to fetch inherited policy of {name}: {e}")
+            return PolicyResult(name, [], error=e)
+
+    async def ancestor_policy(self, name: str) -> PolicyResult:
+        """Return the policy of a folder or organization, fetching it on first use."""
+        future = self._policies.get(name)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(name))
+            self._policies[name] = future
+        return await future
+
+    async def resolve(self, project: PolicyResult) -> PolicyResult:
+        """Return the effective policy of a fetched project policy."""
+        project_id = project.resource.split("/", 1)[1]
+        ancestors = self.hierarchy.project_ancestors(project_id)
+        ancestor_results = await asyncio.gather(*(self.ancestor_policy(name) for name in ancestors))
+        return effective_policy(project, ancestor_results)
+
+    async def resolve_project(self, project: PolicyResult) -> PolicyResult:
+        """Like ``resolve``, looking up the ancestry of projects missing from the hierarchy first.
+
+        For projects audited from a list rather than a crawl. A project
+        whose ancestry cannot be read keeps only its own bindings.
+        """
+        project_id = project.resource.split("/", 1)[1]
+        if not self.hierarchy.has_project(project_id):
+            try:
+                await resolve_project_ancestry(self.session, project_id, self.transport, self.hierarchy)
+            except Exception as e:
+                logger.warning(f"Failed to look up the ancestors of {project.resource}: {e}")
+        return await self.resolve(project)
@@ -0,0 +1,517 @@
+"""Local stand-in for the Google Cloud IAM RPCs used by the HH Permissions Tool.
+
+The server speaks real gRPC, so the regular Google client libraries can be
+pointed at it through an endpoint override. It is meant for benchmarks and
+offline experiments, not for validating Google's API semantics.
+
+Run it standalone and point the CLI at it with ``--endpoint``::
+
+    python -m hh_permissions_tool.fake_server --projects 1000 --port 8470
+    python -m hh_permissions_tool.cli --endpoint 127.0.0.1:8470 audit-org --organization-id 1000
+"""
+
+import argparse
+import asyncio
+import random
+import threading
+import zlib
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+import grpc
+from google.cloud import asset_v1, resourcemanager_v3
+from google.iam.v1 import iam_policy_pb2, policy_pb2
+
+PROJECTS_SERVICE = "google.cloud.resourcemanager.v3.Projects"
+FOLDERS_SERVICE = "google.cloud.resourcemanager.v3.Folders"
+ORGANIZATIONS_SERVICE = "google.cloud.resourcemanager.v3.Organizations"
+ASSET_SERVICE = "google.cloud.asset.v1.AssetService"
+
+PROJECT_ASSET_TYPE = "cloudresourcemanager.googleapis.com/Project"
+
+# Page size used when a list request does not set one
+DEFAULT_PAGE_SIZE = 100
+
+# Seconds FakeIamServer.start waits for the server thread to bind its port
+START_TIMEOUT = 10.0
+
+# Values of the ``env`` label given to generated projects in turn
+ENVIRONMENTS = ("prod", "staging", "dev")
+
+
+class FakeHierarchy(NamedTuple):
+    """Folders and projects of a synthetic organization, keyed by parent name."""
+
+    organization: str
+    folders: Dict[str, List[resourcemanager_v3.Folder]]
+    projects: Dict[str, List[resourcemanager_v3.Project]]
+
+    @property
+    def folder_count(self) -> int:
+        return sum(len(children) for children in self.folders.values())
+
+    @property
+    def project_count(self) -> int:
+        return sum(len(children) for children in self.projects.values())
+
+
+def generate_hierarchy(
+    organization_id: str = "1000",
+    depth: int = 3,
+    folders_per_folder: int = 5,
+    projects_per_folder: int = 10,
+    max_projects: Optional[int] = None,
+) -> FakeHierarchy:
+    """Build a balanced synthetic organization.
+
+    Every organization and folder node has ``folders_per_folder`` child
+    folders down to ``depth`` levels and ``projects_per_folder`` projects,
+    until ``max_projects`` projects exist. Projects are labelled with an
+    ``env`` from ``ENVIRONMENTS`` in turn.
+    """
+    organization = f"organizations/{organization_id}"
+    folders = defaultdict(list)
+    projects = defaultdict(list)
+    counter = 0
+    project_count = 0
+
+    level = [organization]
+    for current_depth in range(depth + 1):
+        next_level = []
+        for parent in level:
+            for _ in range(projects_per_folder):
+                if max_projects is not None and project_count >= max_projects:
+                    break
+                project_count += 1
+                counter += 1
+                projects[parent].append(resourcemanager_v3.Project(
+                    name=f"projects/{counter}",
+                    project_id=f"fake-project-{counter}",
+                    parent=parent,
+                    display_name=f"Fake project {counter}",
+                    state=resourcemanager_v3.Project.State.ACTIVE,
+                    labels={"env": ENVIRONMENTS[project_count % len(ENVIRONMENTS)]},
+                ))
+            if current_depth == depth:
+                continue
+            for _ in range(folders_per_folder):
+                counter += 1
+                folder = resourcemanager_v3.Folder(
+                    name=f"folders/{counter}",
+                    parent=parent,
+                    display_name=f"Fake folder {counter}",
+                    state=resourcemanager_v3.Folder.State.ACTIVE,
+                )
+                folders[parent].append(folder)
+                next_level.append(folder.name)
+        level = next_level
+
+    return FakeHierarchy(organization, dict(folders), dict(projects))
+
+def generate_org(
+    project_count: int,
+    folders_per_folder: int = 5,
+    projects_per_folder: int = 10,
+    organization_id: str = "1000",
+) -> FakeHierarchy:
+    """Build a synthetic organization with exactly ``project_count`` projects.
+
+    The tree is made just deep enough to hold them, so a small count yields
+    a flat organization and a large one a deep folder tree.
+    """
+    depth, capacity, width = 0, projects_per_folder, 1
+    while capacity < project_count:
+        depth += 1
+        width *= folders_per_folder
+        capacity += width * projects_per_folder
+    return generate_hierarchy(organization_id, depth, folders_per_folder, projects_per_folder, project_count)
+
+def _paginate(items: list, page_size: int, page_token: str):
+    """Return one page of ``items`` and the token of the next page."""
+    start = int(page_token) if page_token else 0
+    end = start + (page_size or DEFAULT_PAGE_SIZE)
+    next_token = str(end) if end < len(items) else ""
+    return items[start:end], next_token
+
+
+class FakeIamServer:
+    """In-process gRPC server for the Resource Manager and Asset RPCs used by the tool.
+
+    Every resource gets an IAM policy of ``bindings_per_policy`` synthetic
+    bindings with ``members_per_binding`` members each. Folder and project
+    listings, project searches and SearchAllIamPolicies are served from
+    ``hierarchy``.
+    ``latency`` seconds, plus up to ``jitter`` more, are added to every
+    response to mimic a remote API.
+
+    Resources outside ``hierarchy`` do not exist: every call naming one
+    fails with NOT_FOUND, as GetIamPolicy of a deleted project does.
+
+    Errors are injected two ways: an ``error_rate`` fraction of resources,
+    picked by a hash of their name, always fail GetIamPolicy with
+    PERMISSION_DENIED and are left out of searches, and an
+    ``unavailable_rate`` fraction of all calls fail with UNAVAILABLE at
+    random.
+
+    The server runs its own event loop on a background thread, so it can be
+    used from synchronous code and from a separate asyncio loop alike::
+
+        with FakeIamServer(latency=0.02) as server:
+            session = GCPSession(endpoint=server.endpoint)
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        bindings_per_policy: int = 5,
+        members_per_binding: int = 3,
+        hierarchy: Optional[FakeHierarchy] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        unavailable_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.unavailable_rate = unavailable_rate
+        self.bindings_per_policy = bindings_per_policy
+        self.members_per_binding = members_per_binding
+        self.hierarchy = hierarchy or FakeHierarchy("organizations/1000", {}, {})
+        self._folders_by_name = {
+            folder.name: folder for children in self.hierarchy.folders.values() for folder in children
+        }
+        self._projects_by_name = {}
+        for children in self.hierarchy.projects.values():
+            for project in children:
+                self._projects_by_name[project.name] = project
+                self._projects_by_name[f"projects/{project.project_id}"] = project
+        self.host = host
+        self.port = port
+        self.request_count = 0
+        self.error_count = 0
+        self._random = random.Random(seed)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_error: Optional[BaseException] = None
+
+    @property
+    def endpoint(self) -> str:
+        """Address to pass as the client endpoint override."""
+        return f"{self.host}:{self.port}"
+
+    def build_policy(self, resource: str) -> policy_pb2.Policy:
+        """Build the synthetic IAM policy returned for a resource."""
+        name = resource.rsplit("/", 1)[-1]
+        bindings = [
+            policy_pb2.Binding(
+                role=f"roles/fake.role{i}",
+                members=[f"user:member{j}@{name}.example.com" for j in range(self.members_per_binding)],
+            )
+            for i in range(self.bindings_per_policy)
+        ]
+        return policy_pb2.Policy(version=1, etag=name.encode(), bindings=bindings)
+
+    def exists(self, resource: str) -> bool:
+        """Whether ``resource`` names the organization or one of its folders or projects."""
+        return (
+            resource == self.hierarchy.organization
+            or resource in self._folders_by_name
+            or resource in self._projects_by_name
+        )
+
+    def is_denied(self, resource: str) -> bool:
+        """Whether ``resource`` is one of the resources whose policy always fails."""
+        if not self.error_rate:
+            return False
+        # crc32 is stable across processes, unlike hash()
+        return zlib.crc32(resource.encode()) % 10_000 < self.error_rate * 10_000
+
+    def project_results(self, scope: str) -> List[resourcemanager_v3.Project]:
+        """Projects below an organization, folder or project scope, depth-first."""
+        if scope in self._projects_by_name:
+            return [self._projects_by_name[scope]]
+        projects = []
+        pending = [scope]
+        while pending:
+            parent = pending.pop()
+            projects.extend(self.hierarchy.projects.get(parent, []))
+            pending.extend(folder.name for folder in reversed(self.hierarchy.folders.get(parent, [])))
+        return projects
+
+    def _folder_ancestors(self, project: resourcemanager_v3.Project) -> List[str]:
+        folders = []
+        parent = project.parent
+        while parent in self._folders_by_name:
+            folders.append(parent)
+            parent = self._folders_by_name[parent].parent
+        return folders
+
+    async def _respond(self, context) -> None:
+        self.request_count += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self._random.random() * self.jitter)
+        if self.unavailable_rate and self._random.random() < self.unavailable_rate:
+            self.error_count += 1
+            await context.abort(grpc.StatusCode.UNAVAILABLE, "Injected transient failure")
+
+    async def _get_iam_policy(self, request: iam_policy_pb2.GetIamPolicyRequest, context) -> policy_pb2.Policy:
+        await self._respond(context)
+        if not self.exists(request.resource):
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"Resource {request.resource} not found")
+        if self.is_denied(request.resource):
+            self.error_count += 1
+            await context.abort(grpc.StatusCode.PERMISSION_DENIED, f"Injected denial for {request.resource}")
+        return self.build_policy(request.resource)
+
+    async def _search_all_iam_policies(self, request: asset_v1.SearchAllIamPoliciesRequest, context):
+        await self._respond(context)
+        if request.asset_types and PROJECT_ASSET_TYPE not in request.asset_types:
+            return asset_v1.SearchAllIamPoliciesResponse()
+        projects = [
+            project
+            for project in self.project_results(request.scope)
+            if not self.is_denied(f"projects/{project.project_id}")
+        ]
+        page, next_token = _paginate(projects, request.page_size, request.page_token)
+        return asset_v1.SearchAllIamPoliciesResponse(
+            results=[
+                asset_v1.IamPolicySearchResult(
+                    resource=f"//cloudresourcemanager.googleapis.com/projects/{project.project_id}",
+                    asset_type=PROJECT_ASSET_TYPE,
+                    project=project.name,
+                    folders=self._folder_ancestors(project),
+                    organization=self.hierarchy.organization,
+                    policy=self.build_policy(f"projects/{project.project_id}"),
+                )
+                for project in page
+            ],
+            next_page_token=next_token,
+        )
+
+    async def _list_folders(self, request: resourcemanager_v3.ListFoldersRequest, context):
+        await self._respond(context)
+        folders, next_token = _paginate(self.hierarchy.folders.get(request.parent, []), request.page_size, request.page_token)
+        return resourcemanager_v3.ListFoldersResponse(folders=folders, next_page_token=next_token)
+
+    async def _list_projects(self, request: resourcemanager_v3.ListProjectsRequest, context):
+        await self._respond(context)
+        projects, next_token = _paginate(self.hierarchy.projects.get(request.parent, []), request.page_size, request.page_token)
+        return resourcemanager_v3.ListProjectsResponse(projects=projects, next_page_token=next_token)
+
+    async def _search_projects(self, request: resourcemanager_v3.SearchProjectsRequest, context):
+        # Only ``labels.KEY:VALUE`` terms are understood; ``*`` matches any value
+        await self._respond(context)
+        labels = dict(
+            term[len("labels."):].split(":", 1) for term in request.query.split() if term.startswith("labels.")
+        )
+        projects = [
+            project
+            for project in self.project_results(self.hierarchy.organization)
+            if all(key in project.labels and value in ("*", project.labels[key]) for key, value in labels.items())
+        ]
+        page, next_token = _paginate(projects, request.page_size, request.page_token)
+        return resourcemanager_v3.SearchProjectsResponse(projects=page, next_page_token=next_token)
+
+    async def _get_project(self, request: resourcemanager_v3.GetProjectRequest, context):
+        await self._respond(context)
+        project = self._projects_by_name.get(request.name)
+        if project is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"Project {request.name} not found")
+        return project
+
+    async def _get_folder(self, request: resourcemanager_v3.GetFolderRequest, context):
+        await self._respond(context)
+        folder = self._folders_by_name.get(request.name)
+        if folder is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"Folder {request.name} not found")
+        return folder
+
+    async def _get_organization(self, request: resourcemanager_v3.GetOrganizationRequest, context):
+        await self._respond(context)
+        if request.name != self.hierarchy.organization:
+            await context.abort(grpc.StatusCode.NOT_FOUND, f"Organization {request.name} not found")
+        return resourcemanager_v3.Organization(
+            name=request.name,
+            display_name="fake.example.com",
+            state=resourcemanager_v3.Organization.State.ACTIVE,
+        )
+
+    @staticmethod
+    def _unary(handler, request_cls, response_cls):
+        """Wrap a handler for proto-plus request and response types."""
+        return grpc.unary_unary_rpc_method_handler(
+            handler,
+            request_deserializer=request_cls.deserialize,
+            response_serializer=response_cls.serialize,
+        )
+
+    def _handlers(self):
+        get_iam_policy = grpc.unary_unary_rpc_method_handler(
+            self._get_iam_policy,
+            request_deserializer=iam_policy_pb2.GetIamPolicyRequest.FromString,
+            response_serializer=policy_pb2.Policy.SerializeToString,
+        )
+        return [
+            grpc.method_handlers_generic_handler(
+                PROJECTS_SERVICE,
+                {
+                    "GetIamPolicy": get_iam_policy,
+                    "ListProjects": self._unary(
+                        self._list_projects,
+                        resourcemanager_v3.ListProjectsRequest,
+                        resourcemanager_v3.ListProjectsResponse,
+                    ),
+                    "GetProject": self._unary(
+                        self._get_project,
+                        resourcemanager_v3.GetProjectRequest,
+                        resourcemanager_v3.Project,
+                    ),
+                    "SearchProjects": self._unary(
+                        self._search_projects,
+                        resourcemanager_v3.SearchProjectsRequest,
+                        resourcemanager_v3.SearchProjectsResponse,
+                    ),
+                },
+            ),
+            grpc.method_handlers_generic_handler(
+                FOLDERS_SERVICE,
+                {
+                    "GetIamPolicy": get_iam_policy,
+                    "ListFolders": self._unary(
+                        self._list_folders,
+                        resourcemanager_v3.ListFoldersRequest,
+                        resourcemanager_v3.ListFoldersResponse,
+                    ),
+                    "GetFolder": self._unary(
+                        self._get_folder,
+                        resourcemanager_v3.GetFolderRequest,
+                        resourcemanager_v3.Folder,
+                    ),
+                },
+            ),
+            grpc.method_handlers_generic_handler(
+                ORGANIZATIONS_SERVICE,
+                {
+                    "GetIamPolicy": get_iam_policy,
+                    "GetOrganization": self._unary(
+                        self._get_organization,
+                        resourcemanager_v3.GetOrganizationRequest,
+                        resourcemanager_v3.Organization,
+                    ),
+                },
+            ),
+            grpc.method_handlers_generic_handler(
+                ASSET_SERVICE,
+                {
+                    "SearchAllIamPolicies": self._unary(
+                        self._search_all_iam_policies,
+                        asset_v1.SearchAllIamPoliciesRequest,
+                        asset_v1.SearchAllIamPoliciesResponse,
+                    ),
+                },
+            ),
+        ]
+
+    async def _serve(self, started: threading.Event) -> None:
+        self._stopping = asyncio.Event()
+        server = grpc.aio.server()
+        try:
+            server.add_generic_rpc_handlers(self._handlers())
+            self.port = server.add_insecure_port(self.endpoint)
+            await server.start()
+        except BaseException as error:
+            # start() raises this in the calling thread
+            self._start_error = error
+            return
+        finally:
+            started.set()
+        await self._stopping.wait()
+        await server.stop(grace=None)
+
+    def start(self) -> "FakeIamServer":
+        """Start serving on a background thread and wait until it is ready.
+
+        Raises whatever stopped the server from starting, or ``TimeoutError``
+        if it is not ready within ``START_TIMEOUT`` seconds.
+        """
+        started = threading.Event()
+        self._start_error = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_until_complete,
+            args=(self._serve(started),),
+            daemon=True,
+        )
+        self._thread.start()
+        if not started.wait(START_TIMEOUT):
+            raise TimeoutError(f"Fake IAM server did not start within {START_TIMEOUT} seconds")
+        if self._start_error is not None:
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+            raise self._start_error
+        return self
+
+    def stop(self) -> None:
+        """Stop the server and its background thread."""
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+            self._thread.join()
+            self._loop.close()
+        self._stopping = None
+        self._loop = None
+        self._thread = None
+
+    def __enter__(self) -> "FakeIamServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a synthetic organization for the HH Permissions Tool")
+    parser.add_argument("--projects", type=int, default=1000, help="projects in the organization")
+    parser.add_argument("--folders-per-folder", type=int, default=5, help="child folders per folder")
+    parser.add_argument("--projects-per-folder", type=int, default=10, help="projects per folder")
+    parser.add_argument("--bindings", type=int, default=5, help="bindings per policy")
+    parser.add_argument("--members", type=int, default=3, help="members per binding")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many more seconds per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of resources denied")
+    parser.add_argument("--unavailable-rate", type=float, default=0.0, help="fraction of calls failing transiently")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8470)
+    args = parser.parse_args()
+
+    hierarchy = generate_org(args.projects, args.folders_per_folder, args.projects_per_folder)
+    server = FakeIamServer(
+        latency=args.latency,
+        bindings_per_policy=args.bindings,
+        members_per_binding=args.members,
+        hierarchy=hierarchy,
+        host=args.host,
+        port=args.port,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        unavailable_rate=args.unavailable_rate,
+    )
+    with server:
+        print(
+            f"Serving {hierarchy.organization} with {hierarchy.folder_count} folders and "
+            f"{hierarchy.project_count} projects on {server.endpoint}; press Ctrl+C to stop"
+        )
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    print(f"Served {server.request_count} requests ({server.error_count} injected errors)")
+
+
+if __name__ == "__main__":
+    main()
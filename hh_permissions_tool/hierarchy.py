@@ -0,0 +1,250 @@
+"""Resource hierarchy crawler for organizations, folders and projects.
+
+The crawler lists folders and projects breadth-first with many list calls
+in flight at once, and records each node's chain of ancestors as it is
+discovered so later ancestry lookups are dictionary reads.
+"""
+
+import asyncio
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from loguru import logger
+
+from hh_permissions_tool.metrics import rpc_name, track_rpc
+from hh_permissions_tool.profiling import phase
+from hh_permissions_tool.session import TRANSPORT_ASYNC, GCPSession, is_async_client
+
+# Default number of list calls in flight while crawling
+DEFAULT_CRAWL_CONCURRENCY = 32
+
+KIND_ORGANIZATION = "organization"
+KIND_FOLDER = "folder"
+KIND_PROJECT = "project"
+
+
+class ResourceNode(NamedTuple):
+    """An organization, folder or project in the resource hierarchy."""
+
+    name: str
+    kind: str
+    parent: Optional[str] = None
+    display_name: str = ""
+    project_id: str = ""
+
+
+class ResourceHierarchy:
+    """Nodes of a resource hierarchy with memoized ancestry.
+
+    Ancestry is computed when a node is added, from its parent's cached
+    ancestry, so a node's parent must be added before the node itself.
+    Nodes whose parent is unknown are treated as roots. Folders and
+    organizations being looked up are kept as futures, so concurrent
+    ancestry lookups share one call per ancestor.
+    """
+
+    def __init__(self):
+        self.nodes: Dict[str, ResourceNode] = {}
+        self.children: Dict[str, List[str]] = {}
+        self._ancestry: Dict[str, Tuple[str, ...]] = {}
+        self._project_ids: Dict[str, str] = {}
+        self._lookups: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.nodes
+
+    def add(self, node: ResourceNode) -> None:
+        """Add a node and cache its ancestry; adding a known node again has no effect."""
+        if node.name in self.nodes:
+            return
+        self.nodes[node.name] = node
+        self.children.setdefault(node.name, [])
+        if node.parent in self.nodes:
+            self.children[node.parent].append(node.name)
+            self._ancestry[node.name] = (node.parent,) + self._ancestry[node.parent]
+        else:
+            self._ancestry[node.name] = ()
+        if node.project_id:
+            self._project_ids[node.project_id] = node.name
+
+    def ancestors(self, name: str) -> Tuple[str, ...]:
+        """Names of a node's ancestors, nearest first."""
+        return self._ancestry[name]
+
+    def project_ancestors(self, project_id: str) -> Tuple[str, ...]:
+        """Ancestors of a project given its project ID, nearest first.
+
+        Projects outside the hierarchy have no known ancestors.
+        """
+        name = self._project_ids.get(project_id)
+        return self._ancestry[name] if name is not None else ()
+
+    def has_project(self, project_id: str) -> bool:
+        """Whether a project with this project ID is in the hierarchy."""
+        return project_id in self._project_ids
+
+    def projects(self) -> List[ResourceNode]:
+        """All project nodes in discovery order."""
+        return [node for node in self.nodes.values() if node.kind == KIND_PROJECT]
+
+    def folders(self) -> List[ResourceNode]:
+        """All folder nodes in discovery order."""
+        return [node for node in self.nodes.values() if node.kind == KIND_FOLDER]
+
+    def descendants(self, name: str) -> List[str]:
+        """Names of every node below ``name``, breadth-first."""
+        result = []
+        pending = deque(self.children.get(name, []))
+        while pending:
+            child = pending.popleft()
+            result.append(child)
+            pending.extend(self.children.get(child, []))
+        return result
+
+
+async def _list(client, method: str, parent: str) -> list:
+    """Collect every item of a paged list call, e.g. ``list_folders``, from a sync or async client.
+
+    Pages are requested one call at a time by following the page token, so
+    each call is counted and timed on its own.
+    """
+    api = rpc_name(method)
+    field = method[len("list_"):]
+    items = []
+    request = {"parent": parent}
+    while True:
+        with phase(f"rpc {api}"), track_rpc(api):
+            if is_async_client(client):
+                page = await getattr(client, method)(request=request)
+            else:
+                page = await asyncio.to_thread(getattr(client, method), request=request)
+        # The pager exposes the first response's fields without another call
+        items.extend(getattr(page, field))
+        if not page.next_page_token:
+            return items
+        request = {"parent": parent, "page_token": page.next_page_token}
+
+async def _get(client, method: str, name: str):
+    """Call a Get RPC, e.g. ``get_project``, on a sync or async client."""
+    api = rpc_name(method)
+    with phase(f"rpc {api}"), track_rpc(api):
+        if is_async_client(client):
+            return await getattr(client, method)(name=name)
+        return await asyncio.to_thread(getattr(client, method), name=name)
+
+async def _get_node(session: GCPSession, name: str, transport: str) -> ResourceNode:
+    """Look up a folder or organization by name."""
+    if name.startswith("folders/"):
+        folder = await _get(session.folders_client(transport), "get_folder", name)
+        return ResourceNode(folder.name, KIND_FOLDER, folder.parent, folder.display_name)
+    organization = await _get(session.organizations_client(transport), "get_organization", name)
+    return ResourceNode(organization.name, KIND_ORGANIZATION, None, organization.display_name)
+
+async def _lookup_node(session: GCPSession, name: str, transport: str, hierarchy: ResourceHierarchy) -> ResourceNode:
+    """Look up a folder or organization once per hierarchy, sharing the call with concurrent lookups."""
+    future = hierarchy._lookups.get(name)
+    if future is None:
+        future = asyncio.ensure_future(_get_node(session, name, transport))
+        hierarchy._lookups[name] = future
+    return await future
+
+async def _resolve_root(session: GCPSession, root: str, transport: str, hierarchy: ResourceHierarchy) -> None:
+    """Add the crawl root and, for a folder, its chain of ancestors up to the organization.
+
+    Ancestors already in ``hierarchy``, or being looked up for it, are not
+    looked up again. If an ancestor cannot be read, the chain starts at the
+    last readable node.
+    """
+    chain = []
+    name = root
+    try:
+        while name.startswith(("folders/", "organizations/")) and name not in hierarchy:
+            node = await _lookup_node(session, name, transport, hierarchy)
+            chain.append(node)
+            name = node.parent or ""
+    except Exception as e:
+        logger.warning(f"Failed to resolve ancestors of {root} at {name}: {e}")
+
+    for node in reversed(chain):
+        hierarchy.add(node)
+    if root not in hierarchy:
+        kind = KIND_ORGANIZATION if root.startswith("organizations/") else KIND_FOLDER
+        hierarchy.add(ResourceNode(root, kind))
+
+async def resolve_project_ancestry(
+    session: GCPSession,
+    project_id: str,
+    transport: str = TRANSPORT_ASYNC,
+    hierarchy: Optional[ResourceHierarchy] = None,
+) -> ResourceHierarchy:
+    """Build the hierarchy of a single project: its ancestors and the project itself.
+
+    With ``hierarchy``, the project is added to it instead, reusing the
+    ancestors it already holds.
+    """
+    if hierarchy is None:
+        hierarchy = ResourceHierarchy()
+    project = await _get(session.projects_client(transport), "get_project", f"projects/{project_id}")
+    if project.parent:
+        await _resolve_root(session, project.parent, transport, hierarchy)
+    hierarchy.add(ResourceNode(project.name, KIND_PROJECT, project.parent, project.display_name, project.project_id))
+    return hierarchy
+
+async def crawl_hierarchy(
+    session: GCPSession,
+    root: str,
+    transport: str = TRANSPORT_ASYNC,
+    concurrency: int = DEFAULT_CRAWL_CONCURRENCY,
+) -> ResourceHierarchy:
+    """Crawl every active folder and project below an organization or folder.
+
+    Folders are listed breadth-first by ``concurrency`` workers, so each
+    folder's children are listed as soon as the folder is discovered. For a
+    folder root, its ancestors are looked up first so ancestry lookups
+    reach up to the organization. Folders that cannot be listed are logged
+    and skipped.
+    """
+    from google.cloud import resourcemanager_v3
+
+    hierarchy = ResourceHierarchy()
+    await _resolve_root(session, root, transport, hierarchy)
+
+    folders_client = session.folders_client(transport)
+    projects_client = session.projects_client(transport)
+    pending: asyncio.Queue = asyncio.Queue()
+    pending.put_nowait(root)
+
+    async def work() -> None:
+        while True:
+            parent = await pending.get()
+            try:
+                folders, projects = await asyncio.gather(
+                    _list(folders_client, "list_folders", parent),
+                    _list(projects_client, "list_projects", parent),
+                )
+                for folder in folders:
+                    if folder.state == resourcemanager_v3.Folder.State.ACTIVE:
+                        hierarchy.add(ResourceNode(folder.name, KIND_FOLDER, parent, folder.display_name))
+                        pending.put_nowait(folder.name)
+                for project in projects:
+                    if project.state == resourcemanager_v3.Project.State.ACTIVE:
+                        hierarchy.add(ResourceNode(
+                            project.name, KIND_PROJECT, parent, project.display_name, project.project_id
+                        ))
+            except Exception as e:
+                logger.warning(f"Failed to list children of {parent}: {e}")
+            finally:
+                pending.task_done()
+
+    workers = [asyncio.create_task(work()) for _ in range(concurrency)]
+    try:
+        await pending.join()
+    finally:
+        for worker in workers:
+            worker.cancel()
+
+    logger.debug(f"Crawled {len(hierarchy)} nodes below {root}")
+    return hierarchy
@@ -0,0 +1,124 @@
+"""Incremental audits against a previous policy snapshot.
+
+A snapshot is a JSON file holding the ``etag`` and binding records of every
+audited resource. Merging a new run into it singles out the resources whose
+etag changed, so only those have to be analyzed and rendered again.
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from loguru import logger
+
+from hh_permissions_tool.policies import Binding, to_json_record
+
+SNAPSHOT_VERSION = 1
+
+
+class SnapshotEntry(NamedTuple):
+    """The recorded policy of one resource."""
+
+    etag: str
+    bindings: List[Binding]
+
+
+class SnapshotChanges(NamedTuple):
+    """What changed between a snapshot and a new audit run."""
+
+    changed: List
+    removed: List[str]
+    unchanged: int
+
+    @property
+    def bindings(self) -> List[Binding]:
+        """Binding records of the changed resources."""
+        return [record for result in self.changed for record in result.bindings]
+
+
+class PolicySnapshot:
+    """Policies of a set of resources, keyed by resource name."""
+
+    def __init__(self, policies: Optional[Dict[str, SnapshotEntry]] = None, created_at: Optional[float] = None):
+        self.policies = policies if policies is not None else {}
+        self.created_at = created_at
+
+    @classmethod
+    def load(cls, path: Path) -> "PolicySnapshot":
+        """Load a snapshot file; a missing file yields an empty snapshot."""
+        path = Path(path)
+        if not path.exists():
+            logger.info(f"No snapshot at {path}, starting a new one")
+            return cls()
+
+        data = json.loads(path.read_text())
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {data.get('version')} in {path}")
+        policies = {
+            resource: SnapshotEntry(entry["etag"], [Binding.from_dict(record) for record in entry["bindings"]])
+            for resource, entry in data["policies"].items()
+        }
+        logger.info(f"Loaded snapshot of {len(policies)} policies from {path}")
+        return cls(policies, data.get("created_at"))
+
+    def save(self, path: Path) -> None:
+        """Write the snapshot to a file, replacing it atomically."""
+        path = Path(path)
+        self.created_at = time.time()
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "created_at": self.created_at,
+            "policies": {
+                resource: {"etag": entry.etag, "bindings": entry.bindings}
+                for resource, entry in self.policies.items()
+            },
+        }
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(json.dumps(data, separators=(",", ":"), default=to_json_record))
+        tmp_path.replace(path)
+        logger.info(f"Saved snapshot of {len(self.policies)} policies to {path}")
+
+    def update(self, result) -> bool:
+        """Merge one fetched ``PolicyResult`` and return whether it changed.
+
+        Resources whose etag is unchanged keep their recorded bindings.
+        Failed fetches leave the recorded policy in place.
+        """
+        if result.error is not None:
+            return False
+        previous = self.policies.get(result.resource)
+        if previous is not None and result.etag and previous.etag == result.etag:
+            return False
+        self.policies[result.resource] = SnapshotEntry(result.etag, result.bindings)
+        return True
+
+    def prune(self, seen: Set[str]) -> List[str]:
+        """Drop every resource not in ``seen`` and return the dropped names."""
+        removed = sorted(resource for resource in self.policies if resource not in seen)
+        for resource in removed:
+            del self.policies[resource]
+        return removed
+
+    def merge(self, results: Iterable, prune: bool = False) -> SnapshotChanges:
+        """Merge fetched ``PolicyResult`` objects into the snapshot.
+
+        With ``prune``, resources that were not part of ``results`` at all
+        are dropped from the snapshot and reported as removed.
+        """
+        changed = []
+        unchanged = 0
+        seen = set()
+        for result in results:
+            seen.add(result.resource)
+            if self.update(result):
+                changed.append(result)
+            elif result.error is None:
+                unchanged += 1
+
+        removed = self.prune(seen) if prune else []
+        return SnapshotChanges(changed, removed, unchanged)
+
+    def bindings(self) -> List[Binding]:
+        """Binding records of every resource in the snapshot."""
+        return [record for entry in self.policies.values() for record in entry.bindings]
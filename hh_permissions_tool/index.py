@@ -0,0 +1,70 @@
+"""Inverted indexes over binding records for access-review queries.
+
+Binding records list the members of a role on a resource. Access reviews ask
+the reverse questions - what does a member have, who has a role - so the
+index flattens records into one grant per member and files each grant under
+its member and its role.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+
+class Grant(NamedTuple):
+    """One member holding one role on one resource."""
+
+    member: str
+    role: str
+    resource: str
+    inherited_from: str = ""
+
+
+class PermissionIndex:
+    """Member -> grants and role -> grants maps built from binding records.
+
+    Both maps share the same ``Grant`` tuples, so the index holds each grant
+    once however it is looked up.
+    """
+
+    def __init__(self):
+        self.by_member: Dict[str, List[Grant]] = defaultdict(list)
+        self.by_role: Dict[str, List[Grant]] = defaultdict(list)
+        self._count = 0
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "PermissionIndex":
+        """Build an index from ``role``/``members``/``resource`` records."""
+        index = cls()
+        for record in records:
+            index.add(record)
+        return index
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, record: dict) -> None:
+        """Index every member of a binding record."""
+        role = record["role"]
+        resource = record["resource"]
+        inherited_from = record.get("inherited_from", "")
+        for member in record["members"]:
+            grant = Grant(member, role, resource, inherited_from)
+            self.by_member[member].append(grant)
+            self.by_role[role].append(grant)
+            self._count += 1
+
+    def member_access(self, member: str, role: Optional[str] = None, resource: Optional[str] = None) -> List[Grant]:
+        """Everything a member has, optionally narrowed to a role or resource prefix."""
+        grants = self.by_member.get(member, [])
+        return [
+            grant for grant in grants
+            if (role is None or grant.role == role)
+            and (resource is None or grant.resource.startswith(resource))
+        ]
+
+    def who_has(self, role: str, resource: Optional[str] = None) -> List[Grant]:
+        """Every member holding a role, optionally narrowed to a resource prefix."""
+        grants = self.by_role.get(role, [])
+        if resource is None:
+            return list(grants)
+        return [grant for grant in grants if grant.resource.startswith(resource)]
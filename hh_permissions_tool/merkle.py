@@ -0,0 +1,112 @@
+"""Content hashes of audit runs, rolled up the resource hierarchy.
+
+A binding hashes its role, origin and sorted members; a resource hashes
+its binding hashes; a folder or organization hashes the names and hashes
+of its children. Equal hashes mean equal grants, so two runs can be
+compared top-down and every subtree whose hash agrees is skipped whole.
+"""
+
+import hashlib
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from hh_permissions_tool.hierarchy import KIND_PROJECT, ResourceHierarchy
+
+# Digest size in bytes; stored as hex
+DIGEST_SIZE = 16
+
+BindingKey = Tuple[str, str]
+
+
+def _digest(parts: Iterable[str]) -> str:
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def binding_hashes(bindings: Iterable) -> Dict[BindingKey, str]:
+    """Hash the members of each ``(role, inherited_from)`` pair of a resource.
+
+    Bindings repeating a role are merged first, so the hashes describe the
+    grants a run stores rather than how the policy happened to list them.
+    """
+    members: Dict[BindingKey, set] = {}
+    for record in bindings:
+        key = (record["role"], record.get("inherited_from", ""))
+        members.setdefault(key, set()).update(record["members"])
+    return {
+        key: _digest((key[0], key[1], *sorted(names)))
+        for key, names in members.items()
+    }
+
+def resource_hash(hashes: Mapping[BindingKey, str]) -> str:
+    """Hash a resource from the hashes of its bindings."""
+    return _digest(hashes[key] for key in sorted(hashes))
+
+def roll_up(
+    root: str,
+    parents: Mapping[str, str],
+    resource_hashes: Mapping[str, str],
+) -> Dict[str, Tuple[Optional[str], str]]:
+    """Hash every node from ``root`` down, mapping each to ``(parent, hash)``.
+
+    ``parents`` maps resources and folders to their parent; resources
+    without a known path to ``root`` hang directly below it. A node's hash
+    covers its own resource hash, if it has one, and the names and hashes
+    of its children, so it changes whenever anything below it changes.
+    """
+    def reaches_root(name: str) -> bool:
+        seen = set()
+        while name != root:
+            if name in seen or name not in parents:
+                return False
+            seen.add(name)
+            name = parents[name]
+        return True
+
+    parent_of: Dict[str, str] = {}
+    for resource in resource_hashes:
+        if resource == root:
+            continue
+        if not reaches_root(resource):
+            parent_of[resource] = root
+            continue
+        # Link the resource and its not yet linked ancestors
+        name = resource
+        while name != root and name not in parent_of:
+            parent_of[name] = parents[name]
+            name = parents[name]
+
+    children: Dict[str, List[str]] = {}
+    for name, parent in parent_of.items():
+        children.setdefault(parent, []).append(name)
+
+    nodes: Dict[str, Tuple[Optional[str], str]] = {}
+    order = [root]
+    for name in order:
+        order.extend(sorted(children.get(name, ())))
+    for name in reversed(order):
+        below = children.get(name)
+        own = resource_hashes.get(name)
+        if below:
+            node_hash = _digest((own or "", *(f"{child}={nodes[child][1]}" for child in sorted(below))))
+        elif own is not None:
+            node_hash = own
+        else:
+            node_hash = _digest(())
+        nodes[name] = (parent_of.get(name), node_hash)
+    return nodes
+
+def hierarchy_parents(hierarchy: ResourceHierarchy) -> Dict[str, str]:
+    """Parent of every node, naming projects ``projects/<id>`` as audit results do."""
+    def resource_name(name: str) -> str:
+        node = hierarchy.nodes.get(name)
+        if node is not None and node.kind == KIND_PROJECT and node.project_id:
+            return f"projects/{node.project_id}"
+        return name
+
+    return {
+        resource_name(node.name): node.parent
+        for node in hierarchy.nodes.values()
+        if node.parent is not None
+    }
@@ -0,0 +1,320 @@
+"""Prometheus-style operational metrics of audit runs.
+
+A small in-process registry of counters, gauges and histograms, rendered
+in the Prometheus text exposition format. The fetch path updates the
+metrics below unconditionally; they are plain locked number updates.
+``--metrics-file`` dumps them when a run ends (e.g. for node_exporter's
+textfile collector) and ``--metrics-port`` serves them over HTTP while the
+run lasts.
+"""
+
+import contextlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from a fast cache-like answer to a stalled call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_sample(name: str, labels: Dict[str, str], value: float) -> str:
+    if labels:
+        rendered = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+        name = f"{name}{{{rendered}}}"
+    return f"{name} {float(value)!r}"
+
+
+class _Value:
+    """One labelled series of a counter or gauge."""
+
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _Buckets:
+    """One labelled series of a histogram."""
+
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for index, bound in enumerate(self.bounds):
+                if value <= bound:
+                    self.counts[index] += 1
+                    break
+
+
+class Metric:
+    """A named metric with zero or more labels; ``labels()`` selects one series."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_series(self):
+        return _Value()
+
+    def labels(self, *values: str):
+        """The series for these label values, created on first use."""
+        series = self._series.get(values)
+        if series is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} takes labels {self.label_names}, got {values}")
+            with self._lock:
+                series = self._series.setdefault(values, self._new_series())
+        return series
+
+    def samples(self) -> Iterator[Sample]:
+        for values, series in list(self._series.items()):
+            yield self.name, dict(zip(self.label_names, values)), series.value
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increase the unlabelled series."""
+        self.labels().inc(amount)
+
+    @property
+    def value(self) -> float:
+        """Sum over every series."""
+        return sum(series.value for series in list(self._series.values()))
+
+
+class Gauge(Metric):
+    """A value that goes up and down, or is computed when collected."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the unlabelled value with ``function`` every time it is collected."""
+        self._function = function
+
+    def samples(self) -> Iterator[Sample]:
+        if self._function is not None:
+            yield self.name, {}, self._function()
+            return
+        yield from super().samples()
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> Iterator[Sample]:
+        for values, series in list(self._series.items()):
+            labels = dict(zip(self.label_names, values))
+            cumulative = 0
+            for bound, count in zip(series.bounds, series.counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": repr(bound)}, cumulative
+            yield f"{self.name}_bucket", {**labels, "le": "+Inf"}, series.count
+            yield f"{self.name}_sum", labels, series.sum
+            yield f"{self.name}_count", labels, series.count
+
+
+class MetricsRegistry:
+    """The metrics of a process, rendered together."""
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self._server: Optional["ThreadingHTTPServer"] = None
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(_format_sample(*sample) for sample in metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path) -> None:
+        """Write the metrics to a file, replacing it atomically so scrapers never read half a file."""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> str:
+        """Serve ``/metrics`` from a background thread and return its URL."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}/metrics"
+
+    def stop_serving(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+REGISTRY = MetricsRegistry()
+STARTED = time.monotonic()
+
+RPC_REQUESTS = REGISTRY.register(Counter(
+    "hh_rpc_requests_total", "API calls made, by method.", ["api"]
+))
+RPC_ERRORS = REGISTRY.register(Counter(
+    "hh_rpc_errors_total", "API calls that failed, by method and exception type.", ["api", "error"]
+))
+RPC_LATENCY = REGISTRY.register(Histogram(
+    "hh_rpc_latency_seconds", "API call latency in seconds, by method.", ["api"]
+))
+RPC_IN_FLIGHT = REGISTRY.register(Gauge(
+    "hh_rpc_in_flight", "API calls currently awaiting a response."
+))
+FETCH_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "hh_fetch_queue_depth", "Project IDs queued for a policy fetch worker."
+))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "hh_cache_lookups_total", "Policy cache lookups, by result (hit, revalidated or miss).", ["result"]
+))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    "hh_cache_hit_ratio", "Share of policy cache lookups answered without a full fetch."
+))
+POLICIES = REGISTRY.register(Counter(
+    "hh_policies_processed_total", "IAM policies processed, by outcome (ok or error).", ["outcome"]
+))
+BINDINGS = REGISTRY.register(Counter(
+    "hh_bindings_processed_total", "Role bindings processed."
+))
+BINDINGS_RATE = REGISTRY.register(Gauge(
+    "hh_bindings_per_second", "Role bindings processed per second since the run started."
+))
+UPTIME = REGISTRY.register(Gauge(
+    "hh_run_duration_seconds", "Seconds since the run started."
+))
+
+
+def _hit_ratio() -> float:
+    hits = sum(CACHE_LOOKUPS.labels(result).value for result in ("hit", "revalidated"))
+    lookups = CACHE_LOOKUPS.value
+    return hits / lookups if lookups else 0.0
+
+CACHE_HIT_RATIO.set_function(_hit_ratio)
+UPTIME.set_function(lambda: time.monotonic() - STARTED)
+BINDINGS_RATE.set_function(lambda: BINDINGS.value / max(time.monotonic() - STARTED, 1e-9))
+
+
+def rpc_name(method: str) -> str:
+    """The RPC behind a client method, e.g. ``GetIamPolicy`` for ``get_iam_policy``."""
+    return "".join(part.title() for part in method.split("_"))
+
+@contextlib.contextmanager
+def track_rpc(api: str):
+    """Count, time and classify the failures of one API call."""
+    RPC_REQUESTS.labels(api).inc()
+    RPC_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        RPC_ERRORS.labels(api, type(e).__name__).inc()
+        raise
+    finally:
+        RPC_LATENCY.labels(api).observe(time.perf_counter() - start)
+        RPC_IN_FLIGHT.dec()
+
+def record_policy(result) -> None:
+    """Count a processed policy result and its bindings."""
+    if result.error is not None:
+        POLICIES.labels("error").inc()
+    else:
+        POLICIES.labels("ok").inc()
+        BINDINGS.inc(len(result.bindings))
@@ -0,0 +1,125 @@
+"""Machine-readable output formats for audit results."""
+
+import json
+import sys
+from pathlib import Path
+from typing import Iterable, List, TextIO
+
+from hh_permissions_tool.policies import to_json_record
+
+# Output formats accepted by the audit commands
+FORMAT_TABLE = "table"
+FORMAT_NDJSON = "ndjson"
+FORMAT_PARQUET = "parquet"
+
+# Flattened rows buffered per Parquet row group
+DEFAULT_ROW_GROUP_SIZE = 1_000_000
+
+
+class NDJSONWriter:
+    """Write binding records as newline-delimited JSON, one line per binding.
+
+    The stream is flushed after every batch so downstream tools such as
+    ``jq`` see each policy as soon as it has been fetched.
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.count = 0
+
+    @classmethod
+    def open(cls, path: Path) -> "NDJSONWriter":
+        """Open a writer for a file path, or stdout for ``-``."""
+        if str(path) == "-":
+            return cls(sys.stdout)
+        return cls(open(path, "w", encoding="utf-8"))
+
+    def write(self, records: Iterable[dict]) -> int:
+        """Write a batch of records and return how many were written."""
+        lines = [json.dumps(record, separators=(",", ":"), default=to_json_record) + "\n" for record in records]
+        if lines:
+            self.stream.writelines(lines)
+            self.stream.flush()
+            self.count += len(lines)
+        return len(lines)
+
+    def close(self) -> None:
+        """Close the underlying file unless it is stdout."""
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+
+class ParquetWriter:
+    """Write binding records to a Parquet file, one row per member.
+
+    Records are flattened into ``role``, ``member``, ``resource`` and
+    ``inherited_from`` columns, each dictionary-encoded since a few thousand
+    distinct strings repeat across millions of rows. ``inherited_from`` names
+    the folder or organization granting an inherited binding and is empty
+    for direct grants. Rows are buffered and written in row groups of
+    ``row_group_size`` so memory stays bounded.
+
+    Requires the optional ``pyarrow`` dependency.
+    """
+
+    def __init__(self, path: Path, row_group_size: int = DEFAULT_ROW_GROUP_SIZE):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                "Parquet output requires pyarrow. Install it with: poetry install --extras parquet"
+            ) from e
+
+        self._pa = pa
+        self.path = Path(path)
+        self.row_group_size = row_group_size
+        self.count = 0
+        self.schema = pa.schema([
+            ("role", pa.dictionary(pa.int32(), pa.string())),
+            ("member", pa.dictionary(pa.int32(), pa.string())),
+            ("resource", pa.dictionary(pa.int32(), pa.string())),
+            ("inherited_from", pa.dictionary(pa.int32(), pa.string())),
+        ])
+        self._writer = pq.ParquetWriter(self.path, self.schema, compression="zstd")
+        self._roles: List[str] = []
+        self._members: List[str] = []
+        self._resources: List[str] = []
+        self._origins: List[str] = []
+
+    def write(self, records: Iterable[dict]) -> int:
+        """Buffer a batch of records, flushing full row groups, and return the row count."""
+        rows = 0
+        for record in records:
+            for member in record["members"]:
+                self._roles.append(record["role"])
+                self._members.append(member)
+                self._resources.append(record["resource"])
+                self._origins.append(record.get("inherited_from", ""))
+                rows += 1
+        self.count += rows
+        if len(self._roles) >= self.row_group_size:
+            self.flush()
+        return rows
+
+    def flush(self) -> None:
+        """Write buffered rows as one row group."""
+        if not self._roles:
+            return
+        pa = self._pa
+        batch = pa.record_batch(
+            [
+                pa.array(self._roles, pa.string()).dictionary_encode(),
+                pa.array(self._members, pa.string()).dictionary_encode(),
+                pa.array(self._resources, pa.string()).dictionary_encode(),
+                pa.array(self._origins, pa.string()).dictionary_encode(),
+            ],
+            schema=self.schema,
+        )
+        self._writer.write_batch(batch, row_group_size=len(self._roles))
+        self._roles, self._members, self._resources, self._origins = [], [], [], []
+
+    def close(self) -> None:
+        """Flush remaining rows and finalize the file."""
+        self.flush()
+        self._writer.close()
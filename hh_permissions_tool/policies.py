@@ -0,0 +1,206 @@
+"""IAM policy records shared by the fetch backends."""
+
+import asyncio
+import base64
+import sys
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from hh_permissions_tool.metrics import track_rpc
+from hh_permissions_tool.profiling import phase
+from hh_permissions_tool.session import is_async_client
+
+if TYPE_CHECKING:
+    from google.iam.v1 import policy_pb2
+
+
+BINDING_FIELDS = ("role", "members", "resource", "inherited_from")
+
+# Member tuples shared by every binding with the same members
+_member_tuples: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def intern_members(members: Iterable[str]) -> Tuple[str, ...]:
+    """Return the shared tuple of interned member strings for a member list."""
+    key = tuple(members)
+    shared = _member_tuples.get(key)
+    if shared is None:
+        shared = tuple(map(sys.intern, key))
+        _member_tuples[shared] = shared
+    return shared
+
+
+class Binding:
+    """One role binding of a resource, as a compact record.
+
+    Role, member and resource strings are interned and identical member
+    lists share one tuple, so a binding costs one small slotted object no
+    matter how often its strings repeat across projects. Bindings support
+    read-only mapping access (``binding["role"]``, ``get``, ``in`` and
+    ``dict(binding)``) and stand in for the plain record dicts;
+    ``inherited_from`` is only a key when it is set.
+    """
+
+    __slots__ = BINDING_FIELDS
+
+    def __init__(self, role: str, members: Iterable[str], resource: str, inherited_from: str = ""):
+        self.role = sys.intern(role)
+        self.members = intern_members(members)
+        self.resource = sys.intern(resource)
+        self.inherited_from = sys.intern(inherited_from) if inherited_from else ""
+
+    @classmethod
+    def from_dict(cls, record: dict) -> "Binding":
+        """Build a binding from a record dict, e.g. one loaded from JSON."""
+        return cls(record["role"], record["members"], record["resource"], record.get("inherited_from", ""))
+
+    def keys(self) -> Tuple[str, ...]:
+        return BINDING_FIELDS if self.inherited_from else BINDING_FIELDS[:3]
+
+    def __getitem__(self, key: str):
+        if key not in self.keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.keys()
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.keys() else default
+
+    def to_dict(self) -> dict:
+        """The binding as a plain, JSON-serializable record dict."""
+        record = {"role": self.role, "members": list(self.members), "resource": self.resource}
+        if self.inherited_from:
+            record["inherited_from"] = self.inherited_from
+        return record
+
+    def _key(self) -> Tuple:
+        return (self.role, self.members, self.resource, self.inherited_from)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Binding):
+            return self._key() == other._key()
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __repr__(self) -> str:
+        return f"Binding({self.to_dict()!r})"
+
+
+class PolicyView(Sequence):
+    """Lazy sequence of ``Binding`` records over a ``Policy`` message.
+
+    The message is kept as returned by the API and a binding's strings are
+    only copied out when it is read. Counting and filtering run on the
+    message itself, so bindings that are filtered out are never converted.
+    Once the whole view has been iterated the records are kept and the
+    message is dropped, so the view holds only one copy of the bindings.
+    """
+
+    __slots__ = ("policy", "resource", "_records")
+
+    def __init__(self, policy: "policy_pb2.Policy", resource: str):
+        self.policy: Optional["policy_pb2.Policy"] = policy
+        self.resource = resource
+        self._records: Optional[List[Binding]] = None
+
+    def __len__(self) -> int:
+        if self._records is not None:
+            return len(self._records)
+        return len(self.policy.bindings)
+
+    def __getitem__(self, index):
+        if self._records is not None:
+            return self._records[index]
+        if isinstance(index, slice):
+            return [self._convert(binding) for binding in self.policy.bindings[index]]
+        return self._convert(self.policy.bindings[index])
+
+    def __iter__(self) -> Iterator[Binding]:
+        if self._records is None:
+            with phase("record conversion"):
+                self._records = [self._convert(binding) for binding in self.policy.bindings]
+            self.policy = None
+        return iter(self._records)
+
+    def __repr__(self) -> str:
+        return f"PolicyView({self.resource!r}, {len(self)} bindings)"
+
+    def _convert(self, binding) -> Binding:
+        return Binding(binding.role, binding.members, self.resource)
+
+    def member_count(self) -> int:
+        """Number of role grants, counting each member of each binding."""
+        return sum(len(binding.members) for binding in self._bindings())
+
+    def roles(self) -> List[str]:
+        """Roles bound in the policy."""
+        return [binding.role for binding in self._bindings()]
+
+    def filter(self, role: Optional[str] = None, member: Optional[str] = None) -> List[Binding]:
+        """Records of the bindings of ``role`` and/or including ``member``."""
+        matches = [
+            binding for binding in self._bindings()
+            if (role is None or binding.role == role) and (member is None or member in binding.members)
+        ]
+        if self._records is not None:
+            return matches
+        return [self._convert(binding) for binding in matches]
+
+    def _bindings(self):
+        """The records once converted, otherwise the message's bindings."""
+        return self._records if self._records is not None else self.policy.bindings
+
+
+def filter_bindings(bindings: Sequence[Binding], role: Optional[str] = None, member: Optional[str] = None) -> Sequence[Binding]:
+    """Bindings of ``role`` and/or including ``member``; views filter without converting."""
+    if role is None and member is None:
+        return bindings
+    if isinstance(bindings, PolicyView):
+        return bindings.filter(role, member)
+    return [
+        binding for binding in bindings
+        if (role is None or binding["role"] == role) and (member is None or member in binding["members"])
+    ]
+
+def to_json_record(binding):
+    """``json.dumps`` fallback that serializes bindings and policy views."""
+    if isinstance(binding, Binding):
+        return binding.to_dict()
+    if isinstance(binding, PolicyView):
+        return list(binding)
+    raise TypeError(f"Object of type {type(binding).__name__} is not JSON serializable")
+
+
+class PolicyResult(NamedTuple):
+    """Outcome of fetching the IAM policy of a single resource."""
+
+    resource: str
+    bindings: Sequence[Binding]
+    etag: str = ""
+    error: Optional[Exception] = None
+
+
+def policy_to_records(policy, resource: str) -> PolicyView:
+    """Wrap an IAM policy as a lazy sequence of role/members/resource records."""
+    return PolicyView(policy, resource)
+
+def encode_etag(etag: bytes) -> str:
+    """Encode a policy etag the way gcloud displays it."""
+    return base64.b64encode(etag).decode("ascii")
+
+async def get_iam_policy(client, resource: str) -> "policy_pb2.Policy":
+    """Call GetIamPolicy on a projects, folders or organizations client.
+
+    Async clients are awaited directly on the event loop; blocking clients
+    run in a worker thread. API errors are propagated to the caller.
+    """
+    from google.iam.v1 import iam_policy_pb2
+
+    request = iam_policy_pb2.GetIamPolicyRequest(resource=resource)
+    with phase("rpc GetIamPolicy"), track_rpc("GetIamPolicy"):
+        if is_async_client(client):
+            return await client.get_iam_policy(request=request)
+        return await asyncio.to_thread(client.get_iam_policy, request=request)
@@ -0,0 +1,153 @@
+"""Opt-in profiling of CLI runs.
+
+``--profile`` installs a process-wide ``Profiler`` that times named phases
+of a run: credential loading, client construction, each kind of RPC,
+record conversion, rendering. Instrumented code wraps its work in
+``phase(name)``; with profiling off that is a shared no-op context manager,
+so the hooks cost next to nothing.
+
+Phases can overlap: concurrent RPCs each add their own latency, so a
+phase's total may exceed the wall time of the run. cProfile only sees the
+main thread; blocking clients run their calls in worker threads.
+"""
+
+import contextlib
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Stack depth kept for each traced allocation
+TRACEMALLOC_FRAMES = 10
+
+# Rows shown in the function and allocation summaries
+TOP_ENTRIES = 15
+
+_NOOP = contextlib.nullcontext()
+
+
+class Profiler:
+    """Phase timings of one run, plus optional cProfile and tracemalloc data."""
+
+    def __init__(self, cpu: bool = False, memory: bool = False):
+        self.phases: Dict[str, List[float]] = {}
+        self.memory = memory
+        self.elapsed = 0.0
+        self._cpu = cProfile.Profile() if cpu else None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._started = 0.0
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the wall clock and the optional profilers."""
+        if self.memory:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        if self._cpu is not None:
+            self._cpu.enable()
+        self._started = time.perf_counter()
+
+    def stop(self) -> None:
+        """Stop the wall clock and the optional profilers."""
+        self.elapsed = time.perf_counter() - self._started
+        if self._cpu is not None:
+            self._cpu.disable()
+        if self.memory:
+            self._snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add one timed call to a phase."""
+        with self._lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                self.phases[name] = [1, seconds, seconds]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2] = max(stats[2], seconds)
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as one call of ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def summary(self) -> List[Tuple[str, int, float, float]]:
+        """``(phase, calls, total seconds, longest seconds)``, slowest phase first."""
+        return sorted(
+            ((name, int(count), total, longest) for name, (count, total, longest) in self.phases.items()),
+            key=lambda row: row[2],
+            reverse=True,
+        )
+
+    def top_functions(self, limit: int = TOP_ENTRIES) -> List[Tuple[str, int, float, float]]:
+        """``(function, calls, own seconds, cumulative seconds)`` by cumulative time."""
+        if self._cpu is None:
+            return []
+        stats = pstats.Stats(self._cpu, stream=io.StringIO())
+        rows = [
+            (f"{Path(filename).name}:{line}({function})", calls, own, cumulative)
+            for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items()
+        ]
+        return sorted(rows, key=lambda row: row[3], reverse=True)[:limit]
+
+    def top_allocations(self, limit: int = TOP_ENTRIES) -> List[Tuple[str, int, int]]:
+        """``(source line, bytes, blocks)`` still allocated at the end of the run, largest first."""
+        if self._snapshot is None:
+            return []
+        return [
+            (str(stat.traceback[0]), stat.size, stat.count)
+            for stat in self._snapshot.statistics("lineno")[:limit]
+        ]
+
+    def save(self, path: Path) -> List[Path]:
+        """Write the profile as JSON, and the cProfile data next to it; return the written files."""
+        report = {
+            "elapsed": self.elapsed,
+            "phases": [
+                {"phase": name, "calls": calls, "total": total, "longest": longest}
+                for name, calls, total, longest in self.summary()
+            ],
+            "functions": [
+                {"function": name, "calls": calls, "own": own, "cumulative": cumulative}
+                for name, calls, own, cumulative in self.top_functions()
+            ],
+            "allocations": [
+                {"line": line, "bytes": size, "blocks": count}
+                for line, size, count in self.top_allocations()
+            ],
+        }
+        path.write_text(json.dumps(report, indent=2))
+        written = [path]
+        if self._cpu is not None:
+            # Loadable with pstats, snakeviz and similar tools
+            stats_path = path.with_suffix(".pstats")
+            self._cpu.dump_stats(stats_path)
+            written.append(stats_path)
+        return written
+
+
+_profiler: Optional[Profiler] = None
+
+def enable_profiling(cpu: bool = False, memory: bool = False) -> Profiler:
+    """Install and start the process-wide profiler."""
+    global _profiler
+    _profiler = Profiler(cpu, memory)
+    _profiler.start()
+    return _profiler
+
+def get_profiler() -> Optional[Profiler]:
+    """The process-wide profiler, if profiling is on."""
+    return _profiler
+
+def phase(name: str):
+    """Time a block as a phase of the run when profiling is on."""
+    return _profiler.phase(name) if _profiler is not None else _NOOP
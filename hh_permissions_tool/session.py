@@ -0,0 +1,291 @@
+"""Shared Google Cloud credentials and API clients.
+
+Creating credentials and clients is expensive: every client opens its own
+gRPC channel and every fresh credential object performs its own token
+exchange. ``GCPSession`` does both once per process and hands the same
+clients to every audit task.
+
+The Google client libraries take a good part of a second to import, so
+they are only loaded when the first client or credential is created;
+commands that never call an API start without them.
+"""
+
+import asyncio
+import contextlib
+import datetime
+import functools
+import os
+import threading
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Optional, Tuple
+
+from loguru import logger
+
+from hh_permissions_tool.profiling import phase
+
+if TYPE_CHECKING:
+    from google.auth import credentials
+
+SCOPES = ['https://www.googleapis.com/auth/cloud-platform']
+
+# Client transports: blocking clients run in worker threads, async clients share the event loop
+TRANSPORT_SYNC = "sync"
+TRANSPORT_ASYNC = "async"
+
+# Refresh access tokens this long before they expire
+DEFAULT_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+# Environment variable pointing every client at a local server instead of Google
+ENDPOINT_ENV = "HH_PERMISSIONS_ENDPOINT"
+
+
+@functools.lru_cache(maxsize=None)
+def client_classes() -> Dict[str, Tuple[type, type, type, type]]:
+    """Client kind -> (sync client, sync transport, async client, async transport).
+
+    Importing the client libraries is deferred to the first call.
+    """
+    from google.cloud import asset_v1, resourcemanager_v3
+    from google.cloud.asset_v1.services.asset_service.transports import (
+        AssetServiceGrpcAsyncIOTransport,
+        AssetServiceGrpcTransport,
+    )
+    from google.cloud.resourcemanager_v3.services.folders.transports import (
+        FoldersGrpcAsyncIOTransport,
+        FoldersGrpcTransport,
+    )
+    from google.cloud.resourcemanager_v3.services.organizations.transports import (
+        OrganizationsGrpcAsyncIOTransport,
+        OrganizationsGrpcTransport,
+    )
+    from google.cloud.resourcemanager_v3.services.projects.transports import (
+        ProjectsGrpcAsyncIOTransport,
+        ProjectsGrpcTransport,
+    )
+
+    return {
+        "projects": (
+            resourcemanager_v3.ProjectsClient,
+            ProjectsGrpcTransport,
+            resourcemanager_v3.ProjectsAsyncClient,
+            ProjectsGrpcAsyncIOTransport,
+        ),
+        "folders": (
+            resourcemanager_v3.FoldersClient,
+            FoldersGrpcTransport,
+            resourcemanager_v3.FoldersAsyncClient,
+            FoldersGrpcAsyncIOTransport,
+        ),
+        "organizations": (
+            resourcemanager_v3.OrganizationsClient,
+            OrganizationsGrpcTransport,
+            resourcemanager_v3.OrganizationsAsyncClient,
+            OrganizationsGrpcAsyncIOTransport,
+        ),
+        "assets": (
+            asset_v1.AssetServiceClient,
+            AssetServiceGrpcTransport,
+            asset_v1.AssetServiceAsyncClient,
+            AssetServiceGrpcAsyncIOTransport,
+        ),
+    }
+
+@functools.lru_cache(maxsize=None)
+def async_client_classes() -> Tuple[type, ...]:
+    """The asyncio-native client classes."""
+    return tuple(classes[2] for classes in client_classes().values())
+
+
+def is_async_client(client) -> bool:
+    """Whether a client is one of the asyncio-native Google API clients."""
+    return isinstance(client, async_client_classes())
+
+def create_client(
+    kind: str,
+    creds: Optional["credentials.Credentials"],
+    transport: str = TRANSPORT_ASYNC,
+    endpoint: Optional[str] = None,
+):
+    """Create a Google API client of the given kind and transport.
+
+    ``endpoint`` points the client at a local plaintext server such as
+    ``FakeIamServer`` instead of the Google API; ``creds`` are then ignored.
+    Async clients must be created inside the event loop that uses them.
+    """
+    sync_cls, sync_transport_cls, async_cls, async_transport_cls = client_classes()[kind]
+    aio = transport == TRANSPORT_ASYNC
+    client_cls = async_cls if aio else sync_cls
+
+    if endpoint:
+        import grpc
+
+        transport_cls = async_transport_cls if aio else sync_transport_cls
+        channel = grpc.aio.insecure_channel(endpoint) if aio else grpc.insecure_channel(endpoint)
+        return client_cls(transport=transport_cls(channel=channel))
+    return client_cls(credentials=creds)
+
+async def close_client(client) -> None:
+    """Close the channel behind a sync or async Google API client."""
+    result = client.transport.close()
+    if asyncio.iscoroutine(result):
+        await result
+
+
+class GCPSession:
+    """Process-wide cache of credentials and Google API clients.
+
+    Credentials are loaded on first use and refreshed ``refresh_margin``
+    before they expire. Sync clients are shared by the whole process; async
+    clients are bound to the event loop that created them and are shared by
+    every task running on that loop.
+    """
+
+    def __init__(
+        self,
+        credentials_file: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        refresh_margin: datetime.timedelta = DEFAULT_REFRESH_MARGIN,
+    ):
+        self.credentials_file = credentials_file
+        self.endpoint = endpoint
+        self.refresh_margin = refresh_margin
+        self._credentials: Optional["credentials.Credentials"] = None
+        self._clients: Dict[Tuple[str, str, Optional[int]], object] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def credentials(self) -> Optional["credentials.Credentials"]:
+        """Shared credentials, loaded on first access.
+
+        Returns ``None`` when the session targets a local endpoint.
+        """
+        if self.endpoint:
+            return None
+        with self._lock:
+            if self._credentials is None:
+                creds_path = self.credentials_file or os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
+                with phase("credentials"):
+                    from google.oauth2 import service_account
+
+                    self._credentials = service_account.Credentials.from_service_account_file(
+                        creds_path,
+                        scopes=SCOPES
+                    )
+                logger.debug(f"Loaded service account credentials from {creds_path}")
+        return self._credentials
+
+    def seconds_until_refresh(self) -> float:
+        """Seconds until the access token enters the refresh margin."""
+        creds = self.credentials
+        if creds is None:
+            return float("inf")
+        if not creds.token or creds.expiry is None:
+            return 0.0
+        # google-auth stores expiry as a naive UTC datetime
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return (creds.expiry - self.refresh_margin - now).total_seconds()
+
+    def refresh_if_needed(self) -> None:
+        """Refresh the access token if it expires within the refresh margin."""
+        if self.seconds_until_refresh() > 0:
+            return
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self._credentials is not None and self.seconds_until_refresh() <= 0:
+                with phase("token refresh"):
+                    from google.auth.transport.requests import Request
+
+                    self._credentials.refresh(Request())
+                logger.debug(f"Refreshed access token, valid until {self._credentials.expiry}")
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.to_thread(self.refresh_if_needed)
+            await asyncio.sleep(max(self.seconds_until_refresh(), 1.0))
+
+    @contextlib.asynccontextmanager
+    async def keep_fresh(self) -> AsyncIterator["GCPSession"]:
+        """Refresh the access token in the background while the block runs.
+
+        Requests issued inside the block never stall on a token exchange.
+        """
+        if self.endpoint:
+            yield self
+            return
+
+        await asyncio.to_thread(self.refresh_if_needed)
+        task = asyncio.create_task(self._refresh_periodically())
+        try:
+            yield self
+        finally:
+            task.cancel()
+
+    def client(self, kind: str, transport: str = TRANSPORT_ASYNC):
+        """Return the shared client of a kind, creating it on first use."""
+        loop_id = id(asyncio.get_running_loop()) if transport == TRANSPORT_ASYNC else None
+        key = (kind, transport, loop_id)
+        client = self._clients.get(key)
+        if client is None:
+            creds = self.credentials
+            with phase("client construction"):
+                client = create_client(kind, creds, transport, self.endpoint)
+            self._clients[key] = client
+            logger.debug(f"Created {transport} {kind} client")
+        return client
+
+    def projects_client(self, transport: str = TRANSPORT_ASYNC):
+        """Return the shared Resource Manager projects client."""
+        return self.client("projects", transport)
+
+    def folders_client(self, transport: str = TRANSPORT_ASYNC):
+        """Return the shared Resource Manager folders client."""
+        return self.client("folders", transport)
+
+    def organizations_client(self, transport: str = TRANSPORT_ASYNC):
+        """Return the shared Resource Manager organizations client."""
+        return self.client("organizations", transport)
+
+    def asset_client(self, transport: str = TRANSPORT_ASYNC):
+        """Return the shared Cloud Asset Inventory client."""
+        return self.client("assets", transport)
+
+    async def aclose(self) -> None:
+        """Close the async clients bound to the running event loop."""
+        loop_id = id(asyncio.get_running_loop())
+        for key in [key for key in self._clients if key[2] == loop_id]:
+            await close_client(self._clients.pop(key))
+
+    def close(self) -> None:
+        """Close the shared sync clients."""
+        for key in [key for key in self._clients if key[2] is None]:
+            self._clients.pop(key).transport.close()
+
+
+_session: Optional[GCPSession] = None
+
+def get_session() -> GCPSession:
+    """Return the process-wide session, creating it on first use.
+
+    The session targets the endpoint in ``HH_PERMISSIONS_ENDPOINT``, if set.
+    """
+    global _session
+    if _session is None:
+        _session = GCPSession(endpoint=os.getenv(ENDPOINT_ENV) or None)
+    return _session
+
+def configure_session(endpoint: Optional[str] = None) -> GCPSession:
+    """Replace the process-wide session, e.g. to point it at a local endpoint."""
+    global _session
+    _session = GCPSession(endpoint=endpoint)
+    if endpoint:
+        logger.info(f"Sending API calls to {endpoint}")
+    return _session
+
+def run_async(coro):
+    """Run a coroutine on a new event loop, closing its async clients afterwards."""
+    async def main():
+        try:
+            return await coro
+        finally:
+            await get_session().aclose()
+
+    return asyncio.run(main())
@@ -0,0 +1,343 @@
+"""History of audit runs in an embedded SQLite database.
+
+Every audit run is recorded with one row per granted member, written in a
+single transaction with bulk inserts. Grants are clustered by run and
+resource, which doubles as the resource index, with secondary indexes on
+member and role within a run, so historical lookups are index scans
+instead of a new audit. Leading every index with the run keeps the inserts
+of a new run at the end of each index.
+
+Each run also stores content hashes of its bindings, resources and
+folders (see ``merkle``), so two runs can be compared one subtree at a
+time.
+"""
+
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+from loguru import logger
+
+from hh_permissions_tool.index import Grant
+from hh_permissions_tool.merkle import BindingKey, binding_hashes, resource_hash, roll_up
+from hh_permissions_tool.policies import PolicyResult
+from hh_permissions_tool.profiling import phase
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    scope TEXT NOT NULL,
+    resources INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    grants INTEGER NOT NULL DEFAULT 0,
+    complete INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS resources (
+    run_id INTEGER NOT NULL,
+    resource TEXT NOT NULL,
+    etag TEXT NOT NULL,
+    error TEXT,
+    hash TEXT,
+    PRIMARY KEY (run_id, resource)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bindings (
+    run_id INTEGER NOT NULL,
+    resource TEXT NOT NULL,
+    role TEXT NOT NULL,
+    inherited_from TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (run_id, resource, role, inherited_from)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS nodes (
+    run_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    parent TEXT,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (run_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS nodes_parent ON nodes (run_id, parent);
+CREATE TABLE IF NOT EXISTS grants (
+    run_id INTEGER NOT NULL,
+    resource TEXT NOT NULL,
+    role TEXT NOT NULL,
+    member TEXT NOT NULL,
+    inherited_from TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (run_id, resource, role, member, inherited_from)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS grants_member ON grants (run_id, member);
+CREATE INDEX IF NOT EXISTS grants_role ON grants (run_id, role);
+"""
+
+# Page cache for bulk inserts into the indexes, in KiB
+CACHE_SIZE_KIB = 64 * 1024
+
+
+def default_store_path() -> Path:
+    """Return the snapshot database path, honouring HH_PERMISSIONS_CACHE_DIR."""
+    cache_dir = os.getenv("HH_PERMISSIONS_CACHE_DIR")
+    if cache_dir:
+        return Path(cache_dir) / "snapshots.sqlite"
+    return Path.home() / ".cache" / "hh-permissions-tool" / "snapshots.sqlite"
+
+def _prefix_bounds(prefix: str) -> Tuple[str, str]:
+    """Lower and upper bound of the strings starting with ``prefix``."""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class RunInfo(NamedTuple):
+    """Summary of one recorded audit run."""
+
+    id: int
+    started_at: float
+    scope: str
+    resources: int
+    failed: int
+    grants: int
+    complete: bool
+
+
+class SnapshotStore:
+    """SQLite-backed history of audit runs.
+
+    A run is written between ``begin_run`` and ``finish_run`` inside one
+    transaction; ``record_run`` does all three for a finished list of
+    results. A run that is not finished is rolled back when the store is
+    closed.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else default_store_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+        self._db.executescript(SCHEMA)
+        # Databases created before content hashes lack the column; their runs have no hashes
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(resources)")}
+        if "hash" not in columns:
+            self._db.execute("ALTER TABLE resources ADD COLUMN hash TEXT")
+        logger.debug(f"Opened snapshot store at {self.path}")
+
+    def begin_run(self, scope: str) -> int:
+        """Start recording a run of ``scope`` and return its ID."""
+        cursor = self._db.execute("INSERT INTO runs (started_at, scope) VALUES (?, ?)", (time.time(), scope))
+        return cursor.lastrowid
+
+    def add(self, run_id: int, result: PolicyResult) -> None:
+        """Add the policy of one resource to an open run."""
+        error = str(result.error) if result.error is not None else None
+        with phase("snapshot store"):
+            hashes = binding_hashes(result.bindings)
+            self._db.execute(
+                "INSERT OR REPLACE INTO resources (run_id, resource, etag, error, hash) VALUES (?, ?, ?, ?, ?)",
+                (run_id, result.resource, result.etag, error, resource_hash(hashes)),
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO bindings (run_id, resource, role, inherited_from, hash) VALUES (?, ?, ?, ?, ?)",
+                ((run_id, result.resource, role, inherited_from, digest) for (role, inherited_from), digest in hashes.items()),
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO grants (run_id, resource, role, member, inherited_from) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (run_id, record["resource"], record["role"], member, record.get("inherited_from", ""))
+                    for record in result.bindings
+                    for member in record["members"]
+                ),
+            )
+
+    def failed_resources(self, run_id: int) -> Set[str]:
+        """Resources of a run whose policy could not be fetched."""
+        return {
+            row[0]
+            for row in self._db.execute(
+                "SELECT resource FROM resources WHERE run_id = ? AND error IS NOT NULL", (run_id,)
+            )
+        }
+
+    def finish_run(self, run_id: int, parents: Optional[Mapping[str, str]] = None) -> RunInfo:
+        """Store the totals and subtree hashes of a run and commit it.
+
+        ``parents`` maps resources and folders to their parent, as
+        ``merkle.hierarchy_parents`` returns it; without it, every resource
+        hangs directly below the run's scope.
+        """
+        scope = self._db.execute("SELECT scope FROM runs WHERE id = ?", (run_id,)).fetchone()[0]
+        resource_hashes = dict(self._db.execute("SELECT resource, hash FROM resources WHERE run_id = ?", (run_id,)))
+        nodes = roll_up(scope, parents or {}, resource_hashes)
+        self._db.executemany(
+            "INSERT OR REPLACE INTO nodes (run_id, name, parent, hash) VALUES (?, ?, ?, ?)",
+            ((run_id, name, parent, digest) for name, (parent, digest) in nodes.items()),
+        )
+        self._db.execute(
+            """
+            UPDATE runs SET
+                resources = (SELECT COUNT(*) FROM resources WHERE run_id = :id),
+                failed = (SELECT COUNT(*) FROM resources WHERE run_id = :id AND error IS NOT NULL),
+                grants = (SELECT COUNT(*) FROM grants WHERE run_id = :id),
+                complete = 1
+            WHERE id = :id
+            """,
+            {"id": run_id},
+        )
+        self._db.commit()
+        run = self.get_run(run_id)
+        logger.info(f"Recorded run {run_id} with {run.grants} grants on {run.resources} resources")
+        return run
+
+    def record_run(
+        self,
+        scope: str,
+        results: Iterable[PolicyResult],
+        parents: Optional[Mapping[str, str]] = None,
+    ) -> RunInfo:
+        """Record a complete run in one transaction."""
+        run_id = self.begin_run(scope)
+        try:
+            for result in results:
+                self.add(run_id, result)
+        except BaseException:
+            self._db.rollback()
+            raise
+        return self.finish_run(run_id, parents)
+
+    def _run_info(self, row) -> RunInfo:
+        return RunInfo(row[0], row[1], row[2], row[3], row[4], row[5], bool(row[6]))
+
+    def get_run(self, run_id: int) -> Optional[RunInfo]:
+        """Return a run by ID."""
+        row = self._db.execute(
+            "SELECT id, started_at, scope, resources, failed, grants, complete FROM runs WHERE id = ?",
+            (run_id,),
+        ).fetchone()
+        return self._run_info(row) if row else None
+
+    def runs(self, scope: Optional[str] = None) -> List[RunInfo]:
+        """Finished runs, newest first, optionally of one scope only."""
+        sql = "SELECT id, started_at, scope, resources, failed, grants, complete FROM runs WHERE complete = 1"
+        params: tuple = ()
+        if scope:
+            sql += " AND scope = ?"
+            params = (scope,)
+        return [self._run_info(row) for row in self._db.execute(sql + " ORDER BY id DESC", params)]
+
+    def latest_run(self, scope: Optional[str] = None) -> Optional[RunInfo]:
+        """The newest finished run, optionally of one scope only."""
+        runs = self.runs(scope)
+        return runs[0] if runs else None
+
+    def query(
+        self,
+        run_id: int,
+        member: Optional[str] = None,
+        role: Optional[str] = None,
+        resource: Optional[str] = None,
+    ) -> List[Grant]:
+        """Grants of a run, filtered by member, role and resource prefix."""
+        conditions = ["run_id = ?"]
+        params: list = [run_id]
+        if member:
+            conditions.append("member = ?")
+            params.append(member)
+        if role:
+            conditions.append("role = ?")
+            params.append(role)
+        if resource:
+            conditions.append("resource >= ? AND resource < ?")
+            params.extend(_prefix_bounds(resource))
+        sql = (
+            "SELECT member, role, resource, inherited_from FROM grants WHERE "
+            + " AND ".join(conditions)
+            + " ORDER BY resource, role, member"
+        )
+        return [Grant(*row) for row in self._db.execute(sql, params)]
+
+    def iter_grant_keys(
+        self,
+        run_id: int,
+        resource: Optional[str] = None,
+        role: Optional[str] = None,
+    ) -> Iterator[Tuple[str, str, str, str]]:
+        """``(resource, role, member, inherited_from)`` of the grants of a run, in that order.
+
+        ``resource`` and ``role`` narrow the rows to one resource, or one
+        role on it. The order matches the primary key, so the rows are read
+        straight from the table without sorting.
+        """
+        conditions = ["run_id = ?"]
+        params: list = [run_id]
+        if resource is not None:
+            conditions.append("resource = ?")
+            params.append(resource)
+            if role is not None:
+                conditions.append("role = ?")
+                params.append(role)
+        return self._db.cursor().execute(
+            "SELECT resource, role, member, inherited_from FROM grants WHERE "
+            + " AND ".join(conditions)
+            + " ORDER BY resource, role, member, inherited_from",
+            params,
+        )
+
+    def root_node(self, run_id: int) -> Optional[Tuple[str, str]]:
+        """``(name, hash)`` of the top of a run's hash tree, if it has one."""
+        return self._db.execute(
+            "SELECT name, hash FROM nodes WHERE run_id = ? AND parent IS NULL", (run_id,)
+        ).fetchone()
+
+    def child_nodes(self, run_id: int, name: str) -> Dict[str, str]:
+        """Hashes of the nodes directly below ``name`` in a run's hash tree."""
+        return dict(self._db.execute("SELECT name, hash FROM nodes WHERE run_id = ? AND parent = ?", (run_id, name)))
+
+    def resource_hash(self, run_id: int, resource: str) -> Optional[str]:
+        """Content hash of a resource's own grants in a run."""
+        row = self._db.execute(
+            "SELECT hash FROM resources WHERE run_id = ? AND resource = ?", (run_id, resource)
+        ).fetchone()
+        return row[0] if row else None
+
+    def binding_hashes(self, run_id: int, resource: str) -> Dict[BindingKey, str]:
+        """Hashes of each ``(role, inherited_from)`` pair on a resource in a run."""
+        return {
+            (role, inherited_from): digest
+            for role, inherited_from, digest in self._db.execute(
+                "SELECT role, inherited_from, hash FROM bindings WHERE run_id = ? AND resource = ?",
+                (run_id, resource),
+            )
+        }
+
+    def prune(self, keep: Optional[int] = None, older_than: Optional[float] = None) -> int:
+        """Delete all but the newest ``keep`` runs and runs older than ``older_than`` seconds.
+
+        Runs left unfinished by a crashed process are always deleted.
+        Returns the number of deleted runs.
+        """
+        doomed = {row[0] for row in self._db.execute("SELECT id FROM runs WHERE complete = 0")}
+        if keep is not None:
+            doomed.update(run.id for run in self.runs()[keep:])
+        if older_than is not None:
+            cutoff = time.time() - older_than
+            doomed.update(row[0] for row in self._db.execute("SELECT id FROM runs WHERE started_at < ?", (cutoff,)))
+
+        with self._db:
+            for run_id in doomed:
+                self._db.execute("DELETE FROM grants WHERE run_id = ?", (run_id,))
+                self._db.execute("DELETE FROM bindings WHERE run_id = ?", (run_id,))
+                self._db.execute("DELETE FROM nodes WHERE run_id = ?", (run_id,))
+                self._db.execute("DELETE FROM resources WHERE run_id = ?", (run_id,))
+                self._db.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+        if doomed:
+            self._db.execute("VACUUM")
+            logger.info(f"Pruned {len(doomed)} runs from the snapshot store")
+        return len(doomed)
+
+    def close(self) -> None:
+        """Close the database, rolling back an unfinished run."""
+        self._db.close()
+
+    def __enter__(self) -> "SnapshotStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,76 @@
+"""Shared fixtures: a synthetic organization served by FakeIamServer and isolated local state."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from hh_permissions_tool.fake_server import FakeIamServer, generate_org
+from hh_permissions_tool.cli import stream_project_permissions
+from hh_permissions_tool.session import TRANSPORT_ASYNC, GCPSession, configure_session, run_async
+
+# Projects in the fake organization; 30 fills the organization and two folders
+ORG_PROJECTS = 30
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(scope="session")
+def fake_org():
+    return generate_org(ORG_PROJECTS)
+
+
+@pytest.fixture(scope="session")
+def fake_server(fake_org):
+    with FakeIamServer(hierarchy=fake_org) as server:
+        yield server
+
+
+@pytest.fixture
+def session(fake_server) -> GCPSession:
+    """The process-wide session, pointed at the fake server."""
+    session = configure_session(fake_server.endpoint)
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def fetch_policies(session):
+    """Fetch project policies through ``stream_project_permissions``, keyed by resource name."""
+
+    def fetch(project_ids, concurrency: int = 4, transport: str = TRANSPORT_ASYNC) -> dict:
+        async def main():
+            client = session.projects_client(transport)
+            return [result async for result in stream_project_permissions(client, project_ids, concurrency)]
+
+        return {result.resource: result for result in run_async(main())}
+
+    return fetch
+
+
+@pytest.fixture(autouse=True)
+def local_state(tmp_path, monkeypatch):
+    """Keep the cache, snapshot store and role catalog of every test in its own directory."""
+    monkeypatch.setenv("HH_PERMISSIONS_CACHE_DIR", str(tmp_path / "state"))
+    monkeypatch.delenv("HH_PERMISSIONS_ENDPOINT", raising=False)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path / "state"
+
+
+@pytest.fixture
+def run_cli(fake_server):
+    """Run the CLI against the fake server in a new interpreter, with ``input`` piped to stdin."""
+
+    def run(*args: str, input: str = "") -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, "-m", "hh_permissions_tool.cli", "--endpoint", fake_server.endpoint, *args],
+            input=input,
+            capture_output=True,
+            text=True,
+            env={**os.environ, "PYTHONPATH": str(ROOT)},
+            timeout=60,
+        )
+
+    return run
@@ -0,0 +1,35 @@
+import pytest
+
+from hh_permissions_tool.bitsets import RoleBitsets
+from hh_permissions_tool.catalog import RoleCatalog
+
+ROLES = {
+    "roles/viewer": ("compute.instances.get", "storage.buckets.get"),
+    "roles/editor": ("compute.instances.delete", "compute.instances.get", "storage.buckets.get"),
+    "roles/compute.admin": ("compute.instances.delete", "compute.instances.get"),
+}
+
+
+@pytest.fixture
+def bitsets() -> RoleBitsets:
+    return RoleBitsets.from_catalog(RoleCatalog(dict(ROLES)))
+
+
+def test_role_comparisons(bitsets):
+    assert bitsets.size("roles/editor") == 3
+    assert bitsets.is_subset("roles/viewer", "roles/editor")
+    assert not bitsets.is_superset("roles/viewer", "roles/compute.admin")
+    assert bitsets.overlap("roles/viewer", "roles/compute.admin") == 1
+    assert bitsets.difference("roles/editor", "roles/viewer") == ["compute.instances.delete"]
+    assert bitsets.subsets_of("roles/editor") == ["roles/compute.admin", "roles/viewer"]
+    assert bitsets.supersets_of("roles/compute.admin") == ["roles/editor"]
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_roles_granting(bitsets, indexed):
+    if indexed:
+        bitsets.build_grant_index()
+
+    assert bitsets.roles_granting("compute.instances.delete") == ["roles/compute.admin", "roles/editor"]
+    assert bitsets.roles_granting("storage.buckets.get") == ["roles/editor", "roles/viewer"]
+    assert bitsets.roles_granting("unknown.permission") == []
@@ -0,0 +1,46 @@
+from hh_permissions_tool.cache import PolicyCache
+from hh_permissions_tool.cli import fetch_project_policy
+from hh_permissions_tool.metrics import CACHE_LOOKUPS
+from hh_permissions_tool.session import run_async
+
+
+def fetch(session, project_id, cache):
+    async def main():
+        return await fetch_project_policy(session.projects_client(), project_id, cache)
+
+    return run_async(main())
+
+
+def test_miss_then_hit(session, fake_server):
+    hits = CACHE_LOOKUPS.labels("hit").value
+    with PolicyCache(ttl=3600) as cache:
+        first = fetch(session, "fake-project-1", cache)
+        requests = fake_server.request_count
+        second = fetch(session, "fake-project-1", cache)
+
+        assert (cache.misses, cache.hits, cache.revalidated) == (1, 1, 0)
+    assert fake_server.request_count == requests
+    assert [record.to_dict() for record in second.bindings] == [record.to_dict() for record in first.bindings]
+    assert second.etag == first.etag
+    assert CACHE_LOOKUPS.labels("hit").value == hits + 1
+
+
+def test_expired_entry_is_revalidated(session, fake_server):
+    with PolicyCache(ttl=0) as cache:
+        fetch(session, "fake-project-2", cache)
+        requests = fake_server.request_count
+        result = fetch(session, "fake-project-2", cache)
+
+        assert (cache.misses, cache.hits, cache.revalidated) == (1, 0, 1)
+    assert fake_server.request_count == requests + 1
+    assert len(result.bindings) == fake_server.bindings_per_policy
+
+
+def test_changed_etag_is_a_miss(session):
+    with PolicyCache(ttl=0) as cache:
+        fetch(session, "fake-project-3", cache)
+        cache.put("projects/fake-project-3", "stale", [])
+        result = fetch(session, "fake-project-3", cache)
+
+        assert (cache.misses, cache.revalidated) == (2, 0)
+        assert cache.lookup("projects/fake-project-3").etag == result.etag
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from hh_permissions_tool.catalog import RoleCatalog
+
+ROLES = [
+    {"name": "roles/viewer", "includedPermissions": ["compute.instances.get", "storage.buckets.get"]},
+    {"name": "roles/editor", "includedPermissions": ["compute.instances.delete", "compute.instances.get"]},
+    {"name": "projects/p/roles/custom"},
+]
+
+
+@pytest.fixture
+def catalog(tmp_path) -> RoleCatalog:
+    fixture = tmp_path / "roles.json"
+    fixture.write_text(json.dumps(ROLES))
+    return RoleCatalog.from_fixture(fixture)
+
+
+def test_fixture_roles(catalog):
+    assert len(catalog) == 3
+    assert catalog.permissions("roles/viewer") == ("compute.instances.get", "storage.buckets.get")
+    assert catalog.permissions("projects/p/roles/custom") == ()
+    assert catalog.expand(["roles/viewer", "roles/editor", "roles/unknown"]) == {
+        "compute.instances.delete",
+        "compute.instances.get",
+        "storage.buckets.get",
+    }
+
+
+def test_save_and_load(catalog):
+    path = catalog.save()
+    loaded = RoleCatalog.load(path)
+
+    assert loaded.roles == catalog.roles
+    assert loaded.synced_at == catalog.synced_at
+
+
+def test_sync_from_fixture(run_cli, tmp_path):
+    fixture = tmp_path / "roles.json"
+    fixture.write_text(json.dumps(ROLES))
+
+    result = run_cli("catalog", "sync", "--fixture", str(fixture))
+
+    assert result.returncode == 0, result.stderr
+    assert RoleCatalog.load().permissions("roles/editor") == ("compute.instances.delete", "compute.instances.get")
@@ -0,0 +1,60 @@
+import json
+
+from loguru import logger
+
+from hh_permissions_tool.cli import setup_logging
+
+
+def test_log_lines_go_to_stderr(capsys):
+    setup_logging("INFO")
+    logger.info("Audit started")
+
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "Audit started" in captured.err
+
+
+def test_audit_without_terminal_needs_yes(run_cli, fake_org):
+    result = run_cli("audit-org", "--organization-id", fake_org.organization.split("/")[1])
+
+    assert result.returncode == 1
+    assert "--yes" in result.stderr
+    assert result.stdout == ""
+
+
+def test_audit_with_yes_runs(run_cli, fake_server):
+    result = run_cli("audit-gcp", "--project-id", "fake-project-1", "--yes", "--format", "ndjson", "--output", "-")
+
+    assert result.returncode == 0
+    assert [json.loads(line)["resource"] for line in result.stdout.splitlines()] == ["projects/fake-project-1"] * fake_server.bindings_per_policy
+
+
+def test_invalid_batch_options_exit_1(run_cli):
+    result = run_cli("audit-gcp", "--project-file", "-", "--label", "env=prod")
+
+    assert result.returncode == 1
+    assert "not both" in result.stdout
+
+
+def test_org_ndjson_keeps_stdout_clean(run_cli, fake_org, fake_server):
+    organization_id = fake_org.organization.split("/")[1]
+    result = run_cli("--log-level", "DEBUG", "audit-org", "--organization-id", organization_id, "--yes", "--format", "ndjson")
+
+    assert result.returncode == 0, result.stderr
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert len(records) == fake_org.project_count * fake_server.bindings_per_policy
+    assert {record["resource"] for record in records} == {
+        f"projects/{project.project_id}" for children in fake_org.projects.values() for project in children
+    }
+    assert "HH Permissions Tool started" in result.stderr
+
+
+def test_query_reads_the_recorded_run(run_cli, fake_org, fake_server):
+    organization_id = fake_org.organization.split("/")[1]
+    assert run_cli("audit-org", "--organization-id", organization_id, "--yes", "--format", "ndjson").returncode == 0
+
+    result = run_cli("query", "--role", "roles/fake.role0")
+
+    assert result.returncode == 0, result.stderr
+    grants = fake_org.project_count * fake_server.members_per_binding
+    assert f"{grants} grants found in" in result.stdout
@@ -0,0 +1,50 @@
+import pytest
+
+from hh_permissions_tool.bitsets import RoleBitsets
+from hh_permissions_tool.catalog import RoleCatalog
+from hh_permissions_tool.cover import solve_cover
+
+# Greedy takes roles/wide first and needs three roles; roles/left and roles/right cover everything in two
+ROLES = {
+    "roles/wide": ["p1", "p2", "p3", "p4", "p8", "p9", "p10", "p11"],
+    "roles/middle": ["p5", "p6", "p12", "p13"],
+    "roles/narrow": ["p7", "p14"],
+    "roles/left": ["p1", "p2", "p3", "p4", "p5", "p6", "p7"],
+    "roles/right": ["p8", "p9", "p10", "p11", "p12", "p13", "p14"],
+    "roles/p1": ["p1"],
+    "projects/p/roles/custom": ["p1", "p2", "p3", "p4", "p5", "p6", "p7", "p8", "p9", "p10", "p11", "p12", "p13", "p14"],
+}
+REQUIRED = [f"p{number}" for number in range(1, 15)]
+
+
+@pytest.fixture
+def bitsets() -> RoleBitsets:
+    return RoleBitsets.from_catalog(RoleCatalog({role: tuple(permissions) for role, permissions in ROLES.items()}))
+
+
+def test_greedy_cover(bitsets):
+    cover = solve_cover(bitsets, REQUIRED)
+
+    assert cover.roles == ["roles/middle", "roles/narrow", "roles/wide"]
+    assert (cover.uncovered, cover.excess, cover.exact) == ([], 0, False)
+
+
+def test_exact_cover_is_minimal(bitsets):
+    cover = solve_cover(bitsets, REQUIRED, exact=True)
+
+    assert cover.roles == ["roles/left", "roles/right"]
+    assert cover.exact
+
+
+def test_uncovered_and_excess(bitsets):
+    cover = solve_cover(bitsets, ["p7", "unknown.permission"], exact=True)
+
+    assert cover.roles == ["roles/narrow"]
+    assert cover.uncovered == ["unknown.permission"]
+    assert cover.excess == 1
+
+
+def test_custom_roles_on_request(bitsets):
+    cover = solve_cover(bitsets, REQUIRED, predefined_only=False)
+
+    assert cover.roles == ["projects/p/roles/custom"]
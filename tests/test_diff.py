@@ -0,0 +1,52 @@
+from hh_permissions_tool.diff import ADDED, REMOVED, diff_runs, unreadable_resources
+from hh_permissions_tool.policies import Binding, PolicyResult
+from hh_permissions_tool.store import SnapshotStore
+
+SCOPE = "organizations/1000"
+PARENTS = {"projects/a": "folders/1", "projects/b": "folders/1", "folders/1": SCOPE}
+
+
+def owners(resource, *members):
+    return PolicyResult(resource, [Binding("roles/owner", list(members), resource)], etag=",".join(members))
+
+
+def record(store, *results, parents=PARENTS):
+    return store.record_run(SCOPE, results, parents).id
+
+
+def changes(store, old, new):
+    return sorted((change.change, change.grant.resource, change.grant.member) for change in diff_runs(store, old, new))
+
+
+def test_added_and_removed_grants():
+    with SnapshotStore() as store:
+        old = record(store, owners("projects/a", "user:a", "user:b"), owners("projects/b", "user:c"))
+        new = record(store, owners("projects/a", "user:a", "user:d"), owners("projects/b", "user:c"))
+
+        assert changes(store, old, new) == [
+            (ADDED, "projects/a", "user:d"),
+            (REMOVED, "projects/a", "user:b"),
+        ]
+
+
+def test_failed_fetch_is_not_a_revocation():
+    with SnapshotStore() as store:
+        old = record(store, owners("projects/a", "user:a", "user:b"), owners("projects/b", "user:c"))
+        failed = PolicyResult("projects/a", [], error=RuntimeError("503 UNAVAILABLE"))
+        new = record(store, failed, owners("projects/b", "user:c", "user:d"))
+
+        assert changes(store, old, new) == [(ADDED, "projects/b", "user:d")]
+        assert unreadable_resources(store, old, new) == ["projects/a"]
+        # Nor is recovering from the failure a grant
+        assert changes(store, new, old) == [(REMOVED, "projects/b", "user:d")]
+
+
+def test_runs_without_hierarchy_match_hashed_diff():
+    with SnapshotStore() as store:
+        old = record(store, owners("projects/a", "user:a"), owners("projects/b", "user:b"), parents=None)
+        new = record(store, owners("projects/a", "user:a", "user:x"), parents=None)
+
+        assert changes(store, old, new) == [
+            (ADDED, "projects/a", "user:x"),
+            (REMOVED, "projects/b", "user:b"),
+        ]
@@ -0,0 +1,86 @@
+import pytest
+from google.api_core import exceptions
+
+from hh_permissions_tool.cli import (
+    BACKEND_ASSET_INVENTORY,
+    BACKEND_RESOURCE_MANAGER,
+    get_org_permissions,
+    stream_project_permissions,
+)
+from hh_permissions_tool.fake_server import FakeIamServer
+from hh_permissions_tool.session import TRANSPORT_ASYNC, TRANSPORT_SYNC, run_async
+
+
+def project_ids(fake_org):
+    return [project.project_id for children in fake_org.projects.values() for project in children]
+
+
+@pytest.mark.parametrize("transport", [TRANSPORT_ASYNC, TRANSPORT_SYNC])
+def test_stream_fetches_every_project(fetch_policies, fake_org, fake_server, transport):
+    results = fetch_policies(project_ids(fake_org), transport=transport)
+
+    assert len(results) == fake_org.project_count
+    assert all(result.error is None for result in results.values())
+    result = results["projects/fake-project-1"]
+    assert len(result.bindings) == fake_server.bindings_per_policy
+    assert {binding.resource for binding in result.bindings} == {"projects/fake-project-1"}
+    assert result.etag
+
+
+def test_stream_reads_async_ids(fetch_policies):
+    async def ids():
+        for number in range(1, 4):
+            yield f"fake-project-{number}"
+
+    assert sorted(fetch_policies(ids())) == [f"projects/fake-project-{number}" for number in range(1, 4)]
+
+
+def test_stream_reraises_feed_errors_after_draining(session):
+    async def ids():
+        yield "fake-project-1"
+        raise OSError("input closed")
+
+    fetched = []
+
+    async def main():
+        client = session.projects_client()
+        async for result in stream_project_permissions(client, ids(), concurrency=2):
+            fetched.append(result.resource)
+
+    with pytest.raises(OSError, match="input closed"):
+        run_async(main())
+    assert fetched == ["projects/fake-project-1"]
+
+
+def test_unknown_project_is_not_found(fetch_policies):
+    results = fetch_policies(["fake-project-1", "no-such-project"])
+
+    assert results["projects/fake-project-1"].error is None
+    assert isinstance(results["projects/no-such-project"].error, exceptions.NotFound)
+    assert results["projects/no-such-project"].bindings == []
+
+
+def test_server_start_raises_bind_errors():
+    with pytest.raises(RuntimeError, match="Failed to bind"):
+        FakeIamServer(host="256.0.0.1").start()
+
+
+@pytest.mark.parametrize("backend", [BACKEND_RESOURCE_MANAGER, BACKEND_ASSET_INVENTORY])
+def test_org_permissions(session, fake_org, backend):
+    results = run_async(get_org_permissions(fake_org.organization, concurrency=8, backend=backend))
+
+    assert sorted(result.resource for result in results) == sorted(
+        f"projects/{project_id}" for project_id in project_ids(fake_org)
+    )
+    assert all(result.error is None and result.bindings for result in results)
+
+
+def test_effective_org_permissions(session, fake_org, fake_server):
+    results = run_async(get_org_permissions(fake_org.organization, concurrency=8, effective=True))
+
+    folder = fake_org.folders[fake_org.organization][0]
+    project = fake_org.projects[folder.name][0]
+    result = next(result for result in results if result.resource == f"projects/{project.project_id}")
+    inherited = {binding.inherited_from for binding in result.bindings if binding.inherited_from}
+    assert inherited == {folder.name, fake_org.organization}
+    assert len(result.bindings) == 3 * fake_server.bindings_per_policy
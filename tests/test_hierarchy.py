@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from hh_permissions_tool.fake_server import FakeIamServer, generate_hierarchy
+from hh_permissions_tool.hierarchy import KIND_FOLDER, ResourceHierarchy, ResourceNode, crawl_hierarchy, resolve_project_ancestry
+from hh_permissions_tool.metrics import RPC_REQUESTS
+from hh_permissions_tool.session import TRANSPORT_ASYNC, TRANSPORT_SYNC, configure_session, run_async
+
+
+def test_crawl(session, fake_org):
+    hierarchy = run_async(crawl_hierarchy(session, fake_org.organization))
+
+    assert len(hierarchy.projects()) == fake_org.project_count
+    assert len(hierarchy.folders()) == fake_org.folder_count
+    folder = fake_org.folders[fake_org.organization][0]
+    project = fake_org.projects[folder.name][0]
+    assert hierarchy.project_ancestors(project.project_id) == (folder.name, fake_org.organization)
+
+
+def test_crawl_from_folder_resolves_its_ancestors(session, fake_org):
+    folder = fake_org.folders[fake_org.organization][1]
+    project = fake_org.projects[folder.name][0]
+    hierarchy = run_async(crawl_hierarchy(session, folder.name))
+
+    assert len(hierarchy.projects()) == len(fake_org.projects[folder.name])
+    assert hierarchy.project_ancestors(project.project_id) == (folder.name, fake_org.organization)
+
+
+def test_project_ancestry(session, fake_org):
+    folder = fake_org.folders[fake_org.organization][1]
+    project = fake_org.projects[folder.name][0]
+    hierarchy = run_async(resolve_project_ancestry(session, project.project_id))
+
+    assert hierarchy.project_ancestors(project.project_id) == (folder.name, fake_org.organization)
+
+
+def test_adding_a_node_twice_keeps_one_child():
+    hierarchy = ResourceHierarchy()
+    hierarchy.add(ResourceNode("folders/1", KIND_FOLDER))
+    hierarchy.add(ResourceNode("folders/2", KIND_FOLDER, "folders/1"))
+    hierarchy.add(ResourceNode("folders/2", KIND_FOLDER, "folders/1"))
+
+    assert hierarchy.children["folders/1"] == ["folders/2"]
+    assert hierarchy.descendants("folders/1") == ["folders/2"]
+
+
+@pytest.mark.parametrize("transport", [TRANSPORT_ASYNC, TRANSPORT_SYNC])
+def test_each_page_is_one_rpc(transport):
+    # One parent holding 250 projects takes three pages of 100
+    fake_org = generate_hierarchy(depth=0, projects_per_folder=250)
+    with FakeIamServer(hierarchy=fake_org) as server:
+        session = configure_session(server.endpoint)
+        try:
+            listed = RPC_REQUESTS.labels("ListProjects").value
+            hierarchy = run_async(crawl_hierarchy(session, fake_org.organization, transport))
+        finally:
+            session.close()
+
+    assert len(hierarchy.projects()) == 250
+    assert RPC_REQUESTS.labels("ListProjects").value == listed + 3
+
+
+def test_concurrent_ancestry_lookups_share_calls(session, fake_org):
+    folder = fake_org.folders[fake_org.organization][1]
+    hierarchy = ResourceHierarchy()
+
+    async def resolve_all():
+        await asyncio.gather(*(
+            resolve_project_ancestry(session, project.project_id, hierarchy=hierarchy)
+            for project in fake_org.projects[folder.name]
+        ))
+
+    looked_up = RPC_REQUESTS.labels("GetFolder").value
+    run_async(resolve_all())
+
+    assert RPC_REQUESTS.labels("GetFolder").value == looked_up + 1
+    assert all(
+        hierarchy.project_ancestors(project.project_id) == (folder.name, fake_org.organization)
+        for project in fake_org.projects[folder.name]
+    )
@@ -0,0 +1,45 @@
+from hh_permissions_tool.incremental import PolicySnapshot
+from hh_permissions_tool.policies import PolicyResult
+
+PROJECTS = ["fake-project-1", "fake-project-2", "fake-project-3"]
+
+
+def test_first_run_records_every_policy(fetch_policies, tmp_path):
+    snapshot = PolicySnapshot()
+    changes = snapshot.merge(fetch_policies(PROJECTS).values())
+
+    assert sorted(result.resource for result in changes.changed) == [f"projects/{project}" for project in PROJECTS]
+    assert (changes.removed, changes.unchanged) == ([], 0)
+
+    path = tmp_path / "snapshot.json"
+    snapshot.save(path)
+    loaded = PolicySnapshot.load(path)
+    assert loaded.policies.keys() == snapshot.policies.keys()
+    assert loaded.bindings() == snapshot.bindings()
+
+
+def test_unchanged_etags_are_skipped(fetch_policies, tmp_path):
+    path = tmp_path / "snapshot.json"
+    snapshot = PolicySnapshot.load(path)
+    snapshot.merge(fetch_policies(PROJECTS).values())
+    snapshot.save(path)
+
+    snapshot = PolicySnapshot.load(path)
+    changes = snapshot.merge(fetch_policies(PROJECTS[:2]).values(), prune=True)
+
+    assert changes.changed == []
+    assert changes.unchanged == 2
+    assert changes.removed == ["projects/fake-project-3"]
+
+
+def test_failed_fetch_keeps_the_recorded_policy(fetch_policies):
+    snapshot = PolicySnapshot()
+    snapshot.merge(fetch_policies(PROJECTS).values())
+    recorded = snapshot.policies["projects/fake-project-1"]
+
+    failed = PolicyResult("projects/fake-project-1", [], error=RuntimeError("unavailable"))
+    changes = snapshot.merge([failed], prune=True)
+
+    assert changes.changed == []
+    assert changes.unchanged == 0
+    assert snapshot.policies["projects/fake-project-1"] == recorded
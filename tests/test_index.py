@@ -0,0 +1,25 @@
+from hh_permissions_tool.index import Grant, PermissionIndex
+
+RECORDS = [
+    {"role": "roles/owner", "members": ["user:a", "user:b"], "resource": "projects/p"},
+    {"role": "roles/viewer", "members": ["user:a"], "resource": "projects/q", "inherited_from": "folders/1"},
+]
+
+
+def test_member_access():
+    index = PermissionIndex.from_records(RECORDS)
+
+    assert len(index) == 3
+    assert index.member_access("user:a") == [
+        Grant("user:a", "roles/owner", "projects/p"),
+        Grant("user:a", "roles/viewer", "projects/q", "folders/1"),
+    ]
+    assert index.member_access("user:a", role="roles/viewer", resource="projects/p") == []
+
+
+def test_who_has():
+    index = PermissionIndex.from_records(RECORDS)
+
+    assert [grant.member for grant in index.who_has("roles/owner")] == ["user:a", "user:b"]
+    assert index.who_has("roles/owner", resource="projects/q") == []
+    assert index.who_has("roles/editor") == []
@@ -0,0 +1,38 @@
+import io
+import json
+
+import pytest
+
+from hh_permissions_tool.output import NDJSONWriter, ParquetWriter
+from hh_permissions_tool.policies import Binding
+
+RECORDS = [
+    Binding("roles/owner", ["user:a", "user:b"], "projects/p"),
+    Binding("roles/viewer", ["group:g"], "projects/p", "folders/1"),
+]
+
+
+def test_ndjson_writes_one_line_per_binding():
+    stream = io.StringIO()
+    writer = NDJSONWriter(stream)
+
+    assert writer.write(RECORDS) == 2
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert lines == [
+        {"role": "roles/owner", "members": ["user:a", "user:b"], "resource": "projects/p"},
+        {"role": "roles/viewer", "members": ["group:g"], "resource": "projects/p", "inherited_from": "folders/1"},
+    ]
+
+
+def test_parquet_keeps_inherited_from(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "bindings.parquet"
+    writer = ParquetWriter(path)
+    writer.write(RECORDS)
+    writer.close()
+
+    table = pq.read_table(path)
+    assert table.column_names == ["role", "member", "resource", "inherited_from"]
+    assert table.column("inherited_from").to_pylist() == ["", "", "folders/1"]
+    assert table.column("member").to_pylist() == ["user:a", "user:b", "group:g"]
+    assert table.column("role").to_pylist() == ["roles/owner", "roles/owner", "roles/viewer"]
@@ -0,0 +1,54 @@
+from google.iam.v1 import policy_pb2
+
+from hh_permissions_tool.policies import Binding, filter_bindings, policy_to_records
+
+
+def test_binding_reads_like_a_record():
+    binding = Binding("roles/viewer", ["user:a", "user:b"], "projects/p", "folders/1")
+
+    assert binding["role"] == "roles/viewer"
+    assert dict(binding) == {
+        "role": "roles/viewer",
+        "members": ("user:a", "user:b"),
+        "resource": "projects/p",
+        "inherited_from": "folders/1",
+    }
+    assert Binding.from_dict(binding.to_dict()) == binding
+
+
+def test_bindings_share_member_tuples():
+    first = Binding("roles/owner", ["user:a"], "projects/p")
+    second = Binding("roles/viewer", ["user:a"], "projects/q")
+
+    assert first.members is second.members
+    assert "inherited_from" not in first
+    assert first.get("inherited_from") is None
+
+
+def make_view():
+    policy = policy_pb2.Policy(etag=b"etag")
+    policy.bindings.add(role="roles/owner", members=["user:alice@example.com"])
+    policy.bindings.add(role="roles/viewer", members=["user:alice@example.com", "user:bob@example.com"])
+    return policy_to_records(policy, "projects/p")
+
+
+def test_view_reads_the_message_until_iterated():
+    view = make_view()
+
+    assert len(view) == 2
+    assert view[1] == Binding("roles/viewer", ["user:alice@example.com", "user:bob@example.com"], "projects/p")
+    assert view.policy is not None
+
+
+def test_iteration_drops_the_message():
+    view = make_view()
+    records = list(view)
+
+    assert view.policy is None
+    assert list(view) == records
+    assert len(view) == 2
+    assert view[0]["role"] == "roles/owner"
+    assert view.member_count() == 3
+    assert view.roles() == ["roles/owner", "roles/viewer"]
+    assert filter_bindings(view, member="user:bob@example.com") == [records[1]]
+    assert view.filter(role="roles/owner") == [records[0]]
@@ -0,0 +1,34 @@
+from hh_permissions_tool.index import Grant
+from hh_permissions_tool.policies import Binding, PolicyResult
+from hh_permissions_tool.store import SnapshotStore
+
+SCOPE = "organizations/1000"
+
+RESULTS = [
+    PolicyResult("projects/a", [Binding("roles/owner", ["user:a", "user:b"], "projects/a")], etag="a"),
+    PolicyResult("projects/b", [Binding("roles/viewer", ["user:a"], "projects/b", "folders/1")], etag="b"),
+    PolicyResult("projects/c", [], error=RuntimeError("403 PERMISSION_DENIED")),
+]
+
+
+def test_record_and_query_run():
+    with SnapshotStore() as store:
+        run = store.record_run(SCOPE, RESULTS)
+
+        assert (run.resources, run.failed, run.grants, run.complete) == (3, 1, 3, True)
+        assert store.latest_run(SCOPE) == run
+        assert store.query(run.id, member="user:a") == [
+            Grant("user:a", "roles/owner", "projects/a"),
+            Grant("user:a", "roles/viewer", "projects/b", "folders/1"),
+        ]
+        assert store.query(run.id, role="roles/owner", resource="projects/b") == []
+
+
+def test_prune_keeps_the_newest_runs():
+    with SnapshotStore() as store:
+        first = store.record_run(SCOPE, RESULTS)
+        second = store.record_run(SCOPE, RESULTS[:1])
+
+        assert store.prune(keep=1) == 1
+        assert store.get_run(first.id) is None
+        assert [run.id for run in store.runs()] == [second.id]